@@ -1,6 +1,13 @@
 # boot.py - Démarrage automatique DD avec possibilité d'interruption
-# Version : 1.0
-# 
+# Version : 1.2
+# Changelog v1.2:
+#   - Démarrage rapide (strap ou drapeau NVS) : pas de délai d'interruption
+#   - Mode maintenance forcé par bouton maintenu à la mise sous tension
+# Changelog v1.1:
+#   - Installation atomique d'une mise à jour OTA reçue par dd_main
+#   - Démarrage d'essai de la nouvelle image (drapeau NVS) : retour à la
+#     version .bak si dd_main n'atteint pas sa boucle principale
+#
 # Ce fichier est exécuté automatiquement au démarrage de l'ESP32
 # Il offre un délai pour permettre l'interruption (Ctrl+C) avant
 # de lancer automatiquement dd_main.py
@@ -16,6 +23,22 @@ LED_PIN = 2                  # LED pour feedback visuel
 BLINK_FAST_MS = 100         # Clignotement rapide pendant délai
 MAIN_SCRIPT = "dd_main"      # Script à lancer (sans .py)
 
+# Démarrage rapide : saute le délai d'interruption et lance directement
+# dd_main (dd_main.mpy précompilé s'il est seul présent)
+FAST_BOOT_PIN = 22           # Strap à GND = démarrage rapide
+FAST_BOOT_NVS_KEY = "fastboot"  # Ou drapeau NVS("dd") != 0
+MAINT_BUTTON_PIN = 23        # Bouton à GND maintenu au boot = maintenance
+
+# Mise à jour OTA (fichiers écrits par dd_main)
+OTA_TMP_FILE = "ota.tmp"
+OTA_META_FILE = "ota.meta"
+OTA_PENDING_FILE = "ota.pending"
+# Démarrage d'essai : 1 = image installée, 2 = lancée ; dd_main remet 0
+# après sa première boucle. Encore à 2 au boot suivant = retour au .bak
+OTA_TRIAL_NVS_KEY = "ota_trial"
+OTA_TRIAL_INSTALLED = 1
+OTA_TRIAL_STARTED = 2
+
 # ======================== INITIALISATION ========================
 print("\n" + "="*60)
 print("BOOT DD - Démarrage automatique avec délai d'interruption")
@@ -108,6 +131,7 @@ def auto_start():
         
         try:
             # Import et exécution du script principal
+            ota_trial_start()
             __import__(MAIN_SCRIPT)
             return True
             
@@ -117,6 +141,7 @@ def auto_start():
             
             # Afficher traceback complet
             sys.print_exception(e)
+            ota_trial_failed()
             
             print("\n[BOOT] Le script n'a pas pu démarrer")
             print("[BOOT] Vous êtes en mode REPL pour debug")
@@ -131,6 +156,166 @@ def auto_start():
     
     return False
 
+# ======================= SÉLECTION DU MODE ======================
+def _pin_low(num):
+    try:
+        return Pin(num, Pin.IN, Pin.PULL_UP).value() == 0
+    except Exception:
+        return False
+
+def maintenance_requested():
+    """Bouton maintenance maintenu à la mise sous tension"""
+    return _pin_low(MAINT_BUTTON_PIN)
+
+def fast_boot_enabled():
+    """Démarrage rapide sélectionné par strap ou drapeau NVS"""
+    if _pin_low(FAST_BOOT_PIN):
+        return True
+    try:
+        import esp32
+        return esp32.NVS("dd").get_i32(FAST_BOOT_NVS_KEY) != 0
+    except Exception:
+        return False
+
+def set_fast_boot(enabled):
+    """Active/désactive le démarrage rapide en NVS (depuis le REPL)"""
+    import esp32
+    n = esp32.NVS("dd")
+    n.set_i32(FAST_BOOT_NVS_KEY, 1 if enabled else 0)
+    n.commit()
+
+def fast_start():
+    """Lance le script principal sans délai ni diagnostic"""
+    print("[BOOT] Démarrage rapide -> {}".format(MAIN_SCRIPT))
+    try:
+        ota_trial_start()
+        __import__(MAIN_SCRIPT)
+        return True
+    except Exception as e:
+        print("[BOOT] ERREUR lors du lancement de {}:".format(MAIN_SCRIPT))
+        sys.print_exception(e)
+        ota_trial_failed()
+        led_blink(10, 100, 100)
+        if led_available:
+            led.value(0)
+        return False
+
+# ==================== INSTALLATION MISE À JOUR OTA ==============
+def apply_pending_ota():
+    """
+    Installe l'image OTA vérifiée par dd_main (ota.pending -> nom cible).
+    L'ancienne version est conservée en .bak ; os.rename est atomique sur
+    le système de fichiers, une coupure laisse l'ancienne ou la nouvelle.
+    """
+    import os
+    try:
+        with open(OTA_PENDING_FILE) as f:
+            target = f.read().strip()
+        os.stat(OTA_TMP_FILE)
+    except OSError:
+        return False
+
+    print("[BOOT] Installation mise à jour OTA: {}".format(target))
+    try:
+        # Sauvegarde de la version courante (.py et .mpy) ; les anciens
+        # .bak sont effacés : après installation, seule la cible n'en a pas
+        for name in (MAIN_SCRIPT + ".py", MAIN_SCRIPT + ".mpy"):
+            try:
+                os.remove(name + ".bak")
+            except OSError:
+                pass
+            try:
+                os.stat(name)
+            except OSError:
+                continue
+            os.rename(name, name + ".bak")
+
+        os.rename(OTA_TMP_FILE, target)
+        for name in (OTA_PENDING_FILE, OTA_META_FILE):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+        _set_ota_trial(OTA_TRIAL_INSTALLED)
+        print("[BOOT] Mise à jour installée (ancienne version en .bak)")
+        return True
+    except Exception as e:
+        print("[BOOT] ERREUR installation OTA: {}".format(e))
+        # Restaurer la version précédente si la cible est absente
+        for name in (MAIN_SCRIPT + ".py", MAIN_SCRIPT + ".mpy"):
+            try:
+                os.stat(name)
+            except OSError:
+                try:
+                    os.rename(name + ".bak", name)
+                except OSError:
+                    pass
+        return False
+
+def _ota_trial():
+    try:
+        import esp32
+        return esp32.NVS("dd").get_i32(OTA_TRIAL_NVS_KEY)
+    except Exception:
+        return 0
+
+def _set_ota_trial(value):
+    try:
+        import esp32
+        n = esp32.NVS("dd")
+        n.set_i32(OTA_TRIAL_NVS_KEY, value)
+        n.commit()
+    except Exception as e:
+        print("[BOOT] Erreur drapeau OTA: {}".format(e))
+
+def ota_rollback():
+    """
+    Remet la version précédente : l'image OTA (seule sans .bak) est
+    effacée puis chaque .bak reprend son nom
+    """
+    import os
+    names = (MAIN_SCRIPT + ".py", MAIN_SCRIPT + ".mpy")
+    backups = []
+    for name in names:
+        try:
+            os.stat(name + ".bak")
+            backups.append(name)
+        except OSError:
+            pass
+    _set_ota_trial(0)
+    if not backups:
+        print("[BOOT] Pas de version .bak : retour impossible")
+        return False
+    for name in names:
+        try:
+            os.remove(name)
+        except OSError:
+            pass
+    for name in backups:
+        os.rename(name + ".bak", name)
+    print("[BOOT] Mise à jour OTA abandonnée, version précédente restaurée")
+    return True
+
+def ota_trial_start():
+    """
+    Avant de lancer dd_main : marque le premier lancement d'une image
+    OTA, ou restaure le .bak si le lancement précédent n'a jamais
+    atteint la boucle principale (exception, boucle de resets watchdog)
+    """
+    trial = _ota_trial()
+    if trial == OTA_TRIAL_INSTALLED:
+        print("[BOOT] Premier démarrage de la mise à jour OTA (essai)")
+        _set_ota_trial(OTA_TRIAL_STARTED)
+    elif trial == OTA_TRIAL_STARTED:
+        ota_rollback()
+
+def ota_trial_failed():
+    """dd_main a échoué pendant l'essai : retour immédiat au .bak et reset"""
+    if _ota_trial() == OTA_TRIAL_STARTED and ota_rollback():
+        import machine
+        time.sleep_ms(200)
+        machine.reset()
+
 # ==================== FONCTION INFO SYSTÈME ====================
 def print_system_info():
     """Affiche informations système"""
@@ -149,7 +334,7 @@ def print_system_info():
         # Vérifier présence des fichiers essentiels
         essential_files = ["dd_main.py", "config.py"]
         for f in essential_files:
-            if f in files:
+            if f in files or (f == "dd_main.py" and "dd_main.mpy" in files):
                 print("[BOOT]   ✓ {} présent".format(f))
             else:
                 print("[BOOT]   ✗ {} MANQUANT".format(f))
@@ -169,14 +354,33 @@ def print_system_info():
 
 # ====================== POINT D'ENTRÉE ==========================
 
-# Afficher info système
-print_system_info()
+# Installer une mise à jour OTA en attente
+apply_pending_ota()
+
+# Mode maintenance : bouton maintenu, pas de lancement automatique
+if maintenance_requested():
+    print("[BOOT] MODE MAINTENANCE (bouton GPIO{})".format(MAINT_BUTTON_PIN))
+    print_system_info()
+    print("[BOOT] Vous êtes en mode REPL")
+    print("[BOOT] Pour lancer manuellement: import dd_main")
+    print("="*60 + "\n")
+    led_pattern_interrupted()
+    if led_available:
+        led.value(0)
+
+# Démarrage rapide : directement dd_main, sans délai de 3s
+elif AUTO_START_ENABLED and fast_boot_enabled():
+    fast_start()
 
 # Vérifier si auto-start activé
-if AUTO_START_ENABLED:
+elif AUTO_START_ENABLED:
+    # Afficher info système
+    print_system_info()
+    
     # Lancer avec délai d'interruption
     auto_start()
 else:
+    print_system_info()
     print("[BOOT] Démarrage automatique DÉSACTIVÉ")
     print("[BOOT] Mode debug - Vous êtes en mode REPL")
     print("[BOOT] Pour lancer manuellement: import dd_main")
@@ -0,0 +1,178 @@
+# build_dd.py - Build allégé du firmware DD (exécuté sur le PC, CPython)
+# Version : 1.0
+#
+# Retire de dd_main.py les fonctionnalités désactivées, précompile le
+# résultat avec mpy-cross et peut générer un manifest de module figé.
+#
+# Marqueurs reconnus dans dd_main.py :
+#   #@if NOM ... #@endif NOM   bloc conservé seulement si NOM est actif
+#   <ligne>  #@NOM             ligne conservée seulement si NOM est actif
+#
+# Usage :
+#   python build_dd.py                       # toutes fonctionnalités
+#   python build_dd.py --disable OTA STATS   # build allégé
+#   python build_dd.py --no-mpy --manifest   # source + manifest figé
+#
+# Sortie dans dd/build/ : dd_main.py (source filtrée), dd_main.mpy
+# (si mpy-cross est disponible), manifest.py (option --manifest).
+# Copier dd_main.mpy sur la carte sans dd_main.py : boot.py l'importe.
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+# ============================ CONFIG ============================
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(HERE, "dd_main.py")
+BUILD_DIR = os.path.join(HERE, "build")
+MPY_CROSS = "mpy-cross"
+MPY_ARCH = "xtensawin"  # ESP32 : code natif/viper émis pour Xtensa
+
+# Fonctionnalités et état par défaut (True = incluse dans le build)
+FEATURES = {
+    "OTA": True,          # Mise à jour radio (OTAS/OTAB/OTAE)
+    "STATS": True,        # Requête de statistiques STATQ -> STATS
+    "HIST_QUERY": True,   # Requête d'historique HISTQ -> HIST/HISTEND
+    "ID_FALLBACK": True,  # Migration de l'ID depuis config.py / clé "id"
+    "DEV_MODE": True,     # Traces de debug de la boucle principale
+}
+
+_RE_IF = re.compile(r"^\s*#@if\s+(\w+)\s*$")
+_RE_ENDIF = re.compile(r"^\s*#@endif\s+(\w+)\s*$")
+_RE_TAG = re.compile(r"\s+#@(\w+)\s*$")
+
+
+class BuildError(Exception):
+    pass
+
+
+# ======================== FILTRAGE SOURCE =======================
+def strip_features(text, features):
+    """Retourne text sans les blocs/lignes des fonctionnalités inactives.
+
+    Les lignes de marqueurs sont toujours retirées. Un nom inconnu ou un
+    bloc mal imbriqué lève BuildError plutôt que de produire un firmware
+    incohérent.
+    """
+    out = []
+    stack = []   # Noms des blocs ouverts
+    skip = 0     # Profondeur de blocs inactifs englobants
+    for num, line in enumerate(text.splitlines(True), 1):
+        m = _RE_IF.match(line)
+        if m:
+            name = _check_name(m.group(1), features, num)
+            stack.append(name)
+            if skip or not features[name]:
+                skip += 1
+            continue
+        m = _RE_ENDIF.match(line)
+        if m:
+            name = _check_name(m.group(1), features, num)
+            if not stack or stack[-1] != name:
+                raise BuildError("ligne {}: #@endif {} inattendu".format(num, name))
+            stack.pop()
+            if skip:
+                skip -= 1
+            continue
+        if skip:
+            continue
+        m = _RE_TAG.search(line)
+        if m and m.group(1) in features:
+            if not features[m.group(1)]:
+                continue
+            line = line[:m.start()] + "\n"
+        out.append(line)
+    if stack:
+        raise BuildError("#@if {} non fermé".format(stack[-1]))
+    return "".join(out)
+
+
+def _check_name(name, features, num):
+    if name not in features:
+        raise BuildError("ligne {}: fonctionnalité inconnue {}".format(num, name))
+    return name
+
+
+# ======================== BUILD =================================
+def build(features, out_dir=BUILD_DIR, mpy=True, manifest=False):
+    """Écrit la source filtrée (+ .mpy, + manifest) et retourne les chemins."""
+    with open(SOURCE, encoding="utf-8") as f:
+        text = strip_features(f.read(), features)
+    # Erreur de syntaxe détectée ici plutôt qu'au boot du DD
+    compile(text, "dd_main.py", "exec")
+
+    os.makedirs(out_dir, exist_ok=True)
+    src = os.path.join(out_dir, "dd_main.py")
+    with open(src, "w", encoding="utf-8") as f:
+        f.write(text)
+    outputs = [src]
+
+    if mpy:
+        outputs.append(_mpy_cross(src, out_dir))
+    if manifest:
+        outputs.append(_write_manifest(out_dir))
+    return outputs
+
+
+def _mpy_cross(src, out_dir):
+    exe = shutil.which(MPY_CROSS)
+    if exe is None:
+        raise BuildError("{} introuvable (pip install mpy-cross)".format(MPY_CROSS))
+    dst = os.path.join(out_dir, "dd_main.mpy")
+    cmd = [exe, "-march=" + MPY_ARCH, "-O2", "-o", dst, src]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise BuildError("mpy-cross: " + (res.stderr or res.stdout).strip())
+    return dst
+
+
+def _write_manifest(out_dir):
+    # À inclure depuis le manifest de la carte (FROZEN_MANIFEST) : dd_main
+    # est alors figé en flash et s'exécute sans copie en RAM
+    path = os.path.join(out_dir, "manifest.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Généré par build_dd.py - ne pas modifier\n")
+        f.write('module("dd_main.py", base_path="{}")\n'.format(
+            out_dir.replace("\\", "/")))
+    return path
+
+
+def parse_features(enable=(), disable=()):
+    features = dict(FEATURES)
+    for name, state in [(n, True) for n in enable] + [(n, False) for n in disable]:
+        name = name.upper()
+        if name not in features:
+            raise BuildError("fonctionnalité inconnue {}".format(name))
+        features[name] = state
+    return features
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build allégé du firmware DD")
+    ap.add_argument("--enable", nargs="*", default=[], metavar="NOM")
+    ap.add_argument("--disable", nargs="*", default=[], metavar="NOM")
+    ap.add_argument("--out", default=BUILD_DIR)
+    ap.add_argument("--no-mpy", action="store_true", help="pas de mpy-cross")
+    ap.add_argument("--manifest", action="store_true",
+                    help="génère manifest.py pour un module figé")
+    args = ap.parse_args(argv)
+
+    try:
+        features = parse_features(args.enable, args.disable)
+        outputs = build(features, args.out, not args.no_mpy, args.manifest)
+    except BuildError as e:
+        print("[BUILD] Erreur: {}".format(e))
+        return 1
+
+    actives = [n for n in features if features[n]]
+    print("[BUILD] Fonctionnalités: {}".format(", ".join(actives) or "aucune"))
+    for path in outputs:
+        print("[BUILD] {} ({} octets)".format(path, os.path.getsize(path)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,56 @@
 # dd_main.py - Détecteur Distant (DD) pour ESP32 + GT38 (MicroPython)
-# Version : 1.7.0 - PRODUCTION READY
+# Version : 1.18.0 - PRODUCTION READY
+# Changelog v1.18.0:
+#   - Marqueurs de fonctionnalités (blocs if/endif, suffixe de ligne)
+#     exploités par build_dd.py (build allégé + .mpy + manifest figé)
+# Changelog v1.17.0:
+#   - Filtrage des trames sur les octets bruts (préfixe + ID) avant décodage :
+#     trames des autres DD sautées par longueur, sans decode()/split()
+#   - Buffer RX compacté une fois par lecture (plus de copie par ligne)
+# Changelog v1.16.0:
+#   - Détection d'ID en double (ACK/ACKM/BOOT d'un autre DD avec notre ID)
+#     -> DUPID:<id>:<uid> après un délai aléatoire
+#   - Arbitrage : ARB:<id> -> ARBR:<id>:<uid> (back-off aléatoire),
+#     SETIDU:<uid>:<nouvel id> change l'ID d'un seul DD
+# Changelog v1.15.0:
+#   - Trame STATS v2 : compteurs, temps de réponse, uptime, heap libre,
+#     cause du reset, délai du premier ACK, en plus des temps par étape
+#   - Uptime cumulé par ticks_diff (insensible au rebouclage de ticks_ms)
+#   - Temps par étape remis à zéro à chaque trame STATS, cumuls saturés
+# Changelog v1.14.0:
+#   - Instrumentation ticks_us : trame filtrée -> parse terminé -> TX en file
+#     (horodatage pris pour chaque trame du buffer, pas par lecture UART)
+#   - Cumuls par étape, commande STATQ:<id> -> STATS:<id>:<hex>
+#   - Temps de réponse en microsecondes
+# Changelog v1.13.0:
+#   - Multi-canaux : N entrées opto (CHANNEL_PINS) lues en une passe
+#     (registres GPIO_IN), réponse ACKM:<id>:<n>:<masque hex>
+#   - GPIO34-39 (entrée seule, sans pull-up interne) signalés au boot
+# Changelog v1.12.0:
+#   - BOOT:<id>:<cause>:<ms> : délai mise sous tension -> prêt à répondre
+#   - Délai mise sous tension -> premier ACK mémorisé (stats first_ack_ms)
+# Changelog v1.11.0:
+#   - Mise à jour OTA par radio (blocs numérotés + CRC32, ACK fenêtrés)
+#   - Reprise d'un transfert interrompu, vérification SHA-256
+#   - Remplacement atomique du firmware par boot.py (ota.pending)
+#   - Drapeau d'essai NVS remis à zéro après la première boucle (sinon
+#     boot.py restaure la version précédente)
+#   - Buffer RX UART dimensionné pour une fenêtre de blocs, boucle sans
+#     attente pendant un transfert (fenêtre trop grande refusée)
+# Changelog v1.10.0:
+#   - Enregistrement NVS binaire versionné unique (ID, compteurs)
+#   - Chargé une fois au boot, écrit paresseusement (NVS_SAVE_MS)
+#   - Statistiques cumulées conservées après coupure
+# Changelog v1.9.0:
+#   - Watchdog matériel machine.WDT (remplace Timer(0) + callback)
+#   - Feed uniquement si une trame a été lue, ou après RX_IDLE_FEED_MS
+#     sans trame si la lecture UART reste saine
+#   - Cause du reset mémorisée en NVS et envoyée dans BOOT:<id>:<cause>
+# Changelog v1.8.0:
+#   - Historique des transitions d'état (ring buffer array)
+#   - Commande HISTQ:<id>:<n> -> HIST:<id>:<n>:<tick>:<state> ...
+#     HISTEND:<id>:<now>:<suivant> (transitions numérotées depuis le boot,
+#     filtrage par numéro : insensible au rebouclage de ticks_ms)
 # Changelog v1.7.0:
 #   - Fusion des optimisations v1.6.x
 #   - Ignorer messages ACK/BOOT/ACKSETID (echo/broadcast)
@@ -9,20 +60,30 @@
 #   - Logs production (moins verbeux)
 #   - Parse errors : 0
 
-from machine import Pin, UART, Timer, reset
+from machine import Pin, UART, WDT, reset, reset_cause, WDT_RESET, mem32, unique_id
+from array import array
+from micropython import const
+import struct
 import time
+import os
+import gc
+from binascii import hexlify
+from binascii import a2b_base64, crc32  #@OTA
+from hashlib import sha256  #@OTA
 
 # ============================ CONFIG ============================
 UART_PORT = 1
 UART_BAUD = 9600
 UART_TX_PIN = 17         # ESP32 → GT38 RX
 UART_RX_PIN = 16         # ESP32 ← GT38 TX
+UART_RXBUF = 2048        # Contient une fenêtre OTA complète (8 blocs de 96 o)
 GT38_SET_PIN = 5         # Pin SET du GT38
 LED_PIN = 2              # LED de statut
 
-# Watchdog
+# Watchdog matériel (machine.WDT - ne peut plus être désactivé une fois lancé)
 WATCHDOG_ENABLED = False  # Activer en production si désiré
-WATCHDOG_MS = 30000       # 30s
+WATCHDOG_MS = 30000       # 30s sans progrès RX -> reset
+RX_IDLE_FEED_MS = 20000   # Sans trame reçue : feed si l'UART répond (< WATCHDOG_MS)
 
 # Mode développement
 DEV_MODE = False          # False en production
@@ -31,7 +92,131 @@ DEV_MODE = False          # False en production
 LOOP_DELAY_MS = 50        # 50ms - équilibre réactivité/CPU
 LED_BLINK_MS = 20         # LED ultra-rapide
 
+# Multi-canaux : une entrée opto par circuit surveillé (max 8).
+# Liste vide = détecteur mono-canal (réponse ACK classique)
+# GPIO34-39 : entrée seule sans pull-up interne, pull-up externe obligatoire
+# (sinon le canal flotte) ; éviter aussi UART, SET, LED et broches de strap
+CHANNEL_PINS = []         # ex: [25, 26, 27, 32, 33, 13, 14, 18]
+OPTO_ACTIVE_LEVEL = 0     # H11AA1 : sortie tirée à GND si tension présente
+
+# Historique des transitions d'état
+HIST_SIZE = 32            # Nombre de transitions mémorisées
+
+# Détection / arbitrage d'ID en double
+DUPID_MIN_INTERVAL_MS = 10000   # Au plus un DUPID toutes les 10s
+ARB_SLOTS = 8                   # Créneaux de back-off aléatoire
+ARB_SLOT_MS = 60                # Durée d'un créneau (> trame ARBR à 9600 bauds)
+
+# Persistance NVS
+NVS_SAVE_MS = 600000      # 10 min entre deux écritures (usure flash)
+
+#@if OTA
+# Mise à jour OTA (fichiers partagés avec boot.py)
+OTA_TMP_FILE = "ota.tmp"          # Image en cours de réception
+OTA_META_FILE = "ota.meta"        # Paramètres du transfert (reprise)
+OTA_PENDING_FILE = "ota.pending"  # Image vérifiée, à installer au boot
+OTA_TARGETS = ("dd_main.py", "dd_main.mpy")
+OTA_MAX_SIZE = 65536
+OTA_LOOP_DELAY_MS = 5             # Délai de boucle pendant un transfert
+OTA_IDLE_MS = 5000                # Sans bloc depuis : délai normal
+OTA_TRIAL_KEY = "ota_trial"       # Drapeau NVS("dd") d'essai posé par boot.py
+#@endif OTA
+
+# ==================== ENREGISTREMENT NVS UNIQUE ==================
+# Un seul blob binaire versionné dans esp32.NVS("dd") regroupe la
+# configuration et les compteurs cumulés. Lu une fois au boot, réécrit
+# paresseusement (au plus toutes les NVS_SAVE_MS, seulement si modifié).
+REC_KEY = "rec"
+REC_VERSION = 2           # v2 : min_rt/max_rt en µs (v1 : ms), sans réseau
+# ver, id_len, id, boots, ok, nok, setid_ok, setid_err,
+# min_rt, max_rt (µs, saturés à 65535), rst_cause, wdt_cnt
+# (canal et débit du GT38 restent dans le module, cf. config_gt38_dd.py)
+REC_FMT = "<BB8sIIIHHHHBH"
+REC_SIZE = struct.calcsize(REC_FMT)
+# v1 : net_id et air_rate (jamais relus) après l'ID
+REC_FMT_V1 = "<BB8sHHIIIHHHHBH"
+REC_SIZE_V1 = struct.calcsize(REC_FMT_V1)
+
+rec = {
+    "id": None,
+    "boots": 0,
+    "ok": 0,
+    "nok": 0,
+    "setid_ok": 0,
+    "setid_err": 0,
+    "min_rt": 0xFFFF,
+    "max_rt": 0,
+    "rst_cause": 0,
+    "wdt_cnt": 0,
+}
+_rec_nvs = None
+_rec_last = None          # Dernière image écrite (évite les écritures identiques)
+_rec_saved_ts = 0
+
+def _rec_pack():
+    did = (rec["id"] or "").encode()
+    return struct.pack(
+        REC_FMT, REC_VERSION, len(did), did, rec["boots"], rec["ok"], rec["nok"],
+        min(rec["setid_ok"], 0xFFFF), min(rec["setid_err"], 0xFFFF),
+        min(rec["min_rt"], 0xFFFF), min(rec["max_rt"], 0xFFFF),
+        rec["rst_cause"] & 0xFF, min(rec["wdt_cnt"], 0xFFFF))
+
+def rec_load():
+    """Charge l'enregistrement NVS (une seule lecture au boot)"""
+    global _rec_nvs, _rec_last
+    try:
+        import esp32
+        _rec_nvs = esp32.NVS("dd")
+        raw = bytearray(max(REC_SIZE, REC_SIZE_V1))
+        ln = _rec_nvs.get_blob(REC_KEY, raw)
+    except Exception:
+        return False
+    if raw[0] == REC_VERSION and ln == REC_SIZE:
+        fields = struct.unpack(REC_FMT, raw[:REC_SIZE])
+    elif raw[0] == 1 and ln == REC_SIZE_V1:
+        fields = struct.unpack(REC_FMT_V1, raw[:REC_SIZE_V1])
+        fields = fields[:3] + fields[5:]
+    else:
+        return False
+    (_, id_len, did, rec["boots"],
+     rec["ok"], rec["nok"], rec["setid_ok"], rec["setid_err"],
+     rec["min_rt"], rec["max_rt"], rec["rst_cause"],
+     rec["wdt_cnt"]) = fields
+    if 1 <= id_len <= 8:
+        rec["id"] = did[:id_len].decode()
+    if raw[0] == 1:
+        # Temps de réponse v1 en ms : incompatibles, on repart de zéro
+        rec["min_rt"] = 0xFFFF
+        rec["max_rt"] = 0
+        return True
+    _rec_last = bytes(raw[:REC_SIZE])
+    return True
+
+def rec_save(force=False):
+    """
+    Écrit l'enregistrement si modifié et si l'intervalle d'usure est écoulé.
+    Retourne True si l'image en NVS est à jour.
+    """
+    global _rec_last, _rec_saved_ts
+    if _rec_nvs is None:
+        return False
+    now = time.ticks_ms()
+    if not force and time.ticks_diff(now, _rec_saved_ts) < NVS_SAVE_MS:
+        return False
+    data = _rec_pack()
+    _rec_saved_ts = now
+    if data == _rec_last:
+        return True
+    try:
+        _rec_nvs.set_blob(REC_KEY, data)
+        _rec_nvs.commit()
+        _rec_last = data
+        return True
+    except Exception:
+        return False
+
 # ====================== ID UNIQUE DU DETECTEUR ==================
+#@if ID_FALLBACK
 def _get_id_from_config():
     try:
         import config
@@ -43,6 +228,7 @@ def _get_id_from_config():
     return None
 
 def _get_id_from_nvs():
+    """Ancien emplacement de l'ID (clé "id"), lu pour migration"""
     try:
         import esp32
         n = esp32.NVS("dd")
@@ -54,6 +240,8 @@ def _get_id_from_nvs():
         pass
     return None
 
+#@endif ID_FALLBACK
+
 def _get_id_from_straps():
     try:
         pA = Pin(18, Pin.IN, Pin.PULL_UP)
@@ -69,26 +257,35 @@ def _get_id_from_straps():
         return None
 
 def _persist_id_to_nvs(new_id):
-    try:
-        import esp32
-        n = esp32.NVS("dd")
-        b = new_id.encode()
-        n.set_blob("id", b)
-        n.commit()
+    old_id = rec["id"]
+    rec["id"] = new_id
+    if rec_save(force=True):
         return True
-    except Exception:
-        return False
+    rec["id"] = old_id
+    return False
 
+# Straps (matériel) prioritaires, puis enregistrement NVS ; config.py et
+# l'ancienne clé "id" ne sont consultés qu'au premier boot (migration)
+rec_load()
 DETECTOR_ID = (
     _get_id_from_straps()
-    or _get_id_from_config()
-    or _get_id_from_nvs()
+    or rec["id"]
+    or _get_id_from_config()  #@ID_FALLBACK
+    or _get_id_from_nvs()  #@ID_FALLBACK
     or "01"
 )
+rec["id"] = DETECTOR_ID
+rec["boots"] += 1
 
 # ======================== INITIALISATION ========================
-print("[DD] Démarrage v1.7.0 PRODUCTION")
+print("[DD] Démarrage v1.18.0 PRODUCTION")
 print("[DD] ID: {}".format(DETECTOR_ID))
+if CHANNEL_PINS:
+    print("[DD] Multi-canaux: {} entrées {}".format(len(CHANNEL_PINS[:8]), CHANNEL_PINS[:8]))
+    _no_pull = [p for p in CHANNEL_PINS[:8] if 34 <= p <= 39]
+    if _no_pull:
+        print("[DD] ATTENTION: GPIO {} sans pull-up interne, pull-up externe requis".format(
+            ", ".join(str(p) for p in _no_pull)))
 
 # LED
 led = Pin(LED_PIN, Pin.OUT)
@@ -134,49 +331,57 @@ try:
         tx=Pin(UART_TX_PIN), 
         rx=Pin(UART_RX_PIN),
         timeout=100,
-        rxbuf=256
+        rxbuf=UART_RXBUF
     )
-    print("[DD] UART OK (timeout=100ms, rxbuf=256)")
+    print("[DD] UART OK (timeout=100ms, rxbuf={})".format(UART_RXBUF))
 except Exception as e:
     print("[DD] Erreur UART: {}".format(e))
     uart = UART(UART_PORT, baudrate=UART_BAUD, tx=Pin(UART_TX_PIN), rx=Pin(UART_RX_PIN))
 
 # ========================== WATCHDOG ============================
-last_loop_ts = time.ticks_ms()
-_wdt_triggered = False
-wdt_timer = None
-
-def _blink_led(times, on_ms=80, off_ms=80):
-    for _ in range(times):
-        led.value(1)
-        time.sleep_ms(on_ms)
-        led.value(0)
-        time.sleep_ms(off_ms)
-
-def wdt_cb(t):
-    global last_loop_ts, _wdt_triggered
-    if _wdt_triggered:
-        return
-    if time.ticks_diff(time.ticks_ms(), last_loop_ts) > WATCHDOG_MS:
-        _wdt_triggered = True
-        print("[DD] WATCHDOG TIMEOUT - RESET")
-        try:
-            _blink_led(4, 80, 80)
-        except Exception:
-            pass
-        reset()
+# Watchdog matériel (machine.WDT) alimenté uniquement sur progrès du
+# chemin RX : une trame lue et filtrée, ou, en l'absence de trafic, une
+# passe de lecture UART sans erreur toutes les RX_IDLE_FEED_MS. Un
+# blocage dur ou une lecture UART en erreur permanente provoque un reset.
+wdt = None
+_wdt_fed = time.ticks_ms()  # Dernier feed
+
+# Cause du reset précédent, mémorisée en NVS et annoncée dans BOOT
+RESET_CAUSE = reset_cause()
+
+def _record_reset_cause(cause):
+    """Mémorise la cause du reset et compte les resets watchdog (enregistrement NVS)"""
+    rec["rst_cause"] = cause
+    if cause == WDT_RESET:
+        rec["wdt_cnt"] += 1
+    return rec_save(force=True)
+
+_record_reset_cause(RESET_CAUSE)
+print("[DD] Cause reset: {}".format(RESET_CAUSE))
 
 if WATCHDOG_ENABLED:
     try:
-        wdt_timer = Timer(0)
-        wdt_timer.init(period=max(100, WATCHDOG_MS // 2), mode=Timer.PERIODIC, callback=wdt_cb)
-        print("[DD] Watchdog activé ({}s)".format(WATCHDOG_MS // 1000))
+        wdt = WDT(timeout=WATCHDOG_MS)
+        print("[DD] Watchdog matériel activé ({}s)".format(WATCHDOG_MS // 1000))
     except Exception as e:
         print("[DD] Erreur watchdog: {}".format(e))
-        wdt_timer = None
+        wdt = None
 else:
     print("[DD] Watchdog désactivé")
 
+def wdt_feed(rx_progress, uart_ok):
+    """
+    Alimente le watchdog si une trame a été lue, ou si la lecture UART
+    est saine et qu'aucun feed n'a eu lieu depuis RX_IDLE_FEED_MS
+    """
+    global _wdt_fed
+    if not wdt:
+        return
+    now = time.ticks_ms()
+    if rx_progress or (uart_ok and time.ticks_diff(now, _wdt_fed) >= RX_IDLE_FEED_MS):
+        wdt.feed()
+        _wdt_fed = now
+
 # ======================= OUTILS / PROTOCOLE =====================
 def parse_line(line):
     """Parse une ligne de commande reçue"""
@@ -185,10 +390,47 @@ def parse_line(line):
     except Exception:
         return None
 
-    # Ignorer messages echo/broadcast (ACK, BOOT, ACKSETID)
-    if s.startswith(("ACK:", "BOOT:", "ACKSETID:")):
+    # Ignorer messages echo/broadcast (ACKSETID, HIST, OTA, STATS, arbitrage)
+    if s.startswith(("ACKSETID:", "HIST:", "HISTEND:", "OTAR:", "OTAK:", "OTAD:",
+                     "STATS:", "DUPID:", "ARBR:")):
         return ("IGNORE", None, None)
 
+    #@if OTA
+    # OTAB:<id>:<seq>:<crc32>:<base64>
+    if s.startswith("OTAB:"):
+        parts = s.split(":", 4)
+        if len(parts) == 5:
+            try:
+                return ("OTAB", parts[1], (int(parts[2]), int(parts[3], 16), parts[4]))
+            except ValueError:
+                return None
+
+    # OTAS:<id>:<size>:<block>:<window>:<sha256>:<name>
+    if s.startswith("OTAS:"):
+        parts = s.split(":")
+        if len(parts) == 7:
+            try:
+                return ("OTAS", parts[1], (int(parts[2]), int(parts[3]),
+                                           int(parts[4]), parts[5], parts[6]))
+            except ValueError:
+                return None
+
+    #@endif OTA
+
+    #@if STATS
+    if s.startswith("STATQ:"):
+        parts = s.split(":")
+        if len(parts) == 2:
+            return ("STATQ", parts[1].strip(), None)
+    #@endif STATS
+
+    #@if OTA
+    if s.startswith("OTAE:"):
+        parts = s.split(":")
+        if len(parts) == 2:
+            return ("OTAE", parts[1].strip(), None)
+    #@endif OTA
+
     if s.startswith("POLL:"):
         parts = s.split(":", 1)
         if len(parts) >= 2:
@@ -200,14 +442,182 @@ def parse_line(line):
             candidate = parts[1].strip()
             if 1 <= len(candidate) <= 8:
                 return ("SETID", candidate, None)
+
+    if s.startswith("ARB:"):
+        parts = s.split(":")
+        if len(parts) == 2:
+            return ("ARB", parts[1].strip(), None)
+
+    # SETIDU:<uid>:<nouvel id> - changement d'ID ciblé par identifiant unique
+    if s.startswith("SETIDU:"):
+        parts = s.split(":")
+        if len(parts) == 3:
+            candidate = parts[2].strip()
+            if 1 <= len(candidate) <= 8:
+                return ("SETIDU", candidate, parts[1].strip())
+
+    #@if HIST_QUERY
+    if s.startswith("HISTQ:"):
+        parts = s.split(":")
+        if len(parts) == 3:
+            try:
+                since = int(parts[2])
+            except ValueError:
+                return None
+            return ("HIST", parts[1].strip(), since)
+    #@endif HIST_QUERY
     
     return None
 
+# ================ FILTRAGE DES TRAMES (OCTETS BRUTS) ================
+# Sur un canal partagé, l'essentiel du trafic entendu concerne d'autres DD.
+# Le préfixe et le champ ID sont comparés directement dans le buffer RX :
+# seules les trames qui nous concernent passent par decode()/parse_line().
+SCR_SKIP = const(0)        # Trame ignorée
+SCR_PARSE = const(1)       # Trame à décoder
+SCR_OTHER_POLL = const(2)  # POLL pour un autre DD (statistique nok)
+SCR_ECHO_MINE = const(3)   # Réponse d'un autre DD avec notre ID
+
+_K_ADDR = const(0)         # Commande adressée par ID (champ 1)
+_K_ECHO = const(1)         # Réponse d'un DD (champ 1 = ID)
+_K_PASS = const(2)         # Toujours décodée (diffusion)
+_K_SKIP = const(3)         # Jamais pour nous
+
+_SCREEN_PREFIXES = (
+    (b"POLL:", _K_ADDR), (b"ARB:", _K_ADDR),
+    (b"OTAB:", _K_ADDR), (b"OTAS:", _K_ADDR), (b"OTAE:", _K_ADDR),  #@OTA
+    (b"STATQ:", _K_ADDR),  #@STATS
+    (b"HISTQ:", _K_ADDR),  #@HIST_QUERY
+    (b"ACK:", _K_ECHO), (b"ACKM:", _K_ECHO), (b"BOOT:", _K_ECHO),
+    (b"SETID:", _K_PASS), (b"SETIDU:", _K_PASS),
+    (b"ACKSETID:", _K_SKIP), (b"HIST:", _K_SKIP), (b"HISTEND:", _K_SKIP),
+    (b"OTAR:", _K_SKIP), (b"OTAK:", _K_SKIP), (b"OTAD:", _K_SKIP),
+    (b"STATS:", _K_SKIP), (b"DUPID:", _K_SKIP), (b"ARBR:", _K_SKIP),
+)
+# Table indexée par le premier octet : [(préfixe, type), ...]
+_SCREEN = {}
+for _prefix, _kind in _SCREEN_PREFIXES:
+    _SCREEN.setdefault(_prefix[0], []).append((_prefix, _kind))
+
+_id_bytes = b""
+
+def set_id_bytes(det_id):
+    """Met à jour l'ID comparé par screen_frame()"""
+    global _id_bytes
+    _id_bytes = det_id.encode()
+
+def _field_is(buf, p, value):
+    """Vrai si le champ commençant en p vaut exactement value"""
+    n = len(value)
+    if buf.find(value, p, p + n) != p or p + n >= len(buf):
+        return False
+    # Séparateur ':' (58), '\r' (13) ou '\n' (10) : comparaison explicite,
+    # "int in bytes" n'est pas fiable sous MicroPython
+    c = buf[p + n]
+    return c == 58 or c == 13 or c == 10
+
+def _field_is_all(buf, p):
+    """Vrai si le champ commençant en p vaut ALL, sans tenir compte de la casse"""
+    if p + 3 >= len(buf):
+        return False
+    # Minuscule ASCII par | 0x20 : "ALL", "All", "all"...
+    c = buf[p + 3]
+    return ((buf[p] | 0x20) == 97 and (buf[p + 1] | 0x20) == 108
+            and (buf[p + 2] | 0x20) == 108 and (c == 58 or c == 13 or c == 10))
+
+def screen_frame(buf, start):
+    """Classe la ligne commençant en buf[start] sans la copier ni la décoder"""
+    entries = _SCREEN.get(buf[start])
+    if not entries:
+        return SCR_SKIP
+    for prefix, kind in entries:
+        n = len(prefix)
+        if buf.find(prefix, start, start + n) != start:
+            continue
+        if kind == _K_PASS:
+            return SCR_PARSE
+        if kind == _K_SKIP:
+            return SCR_SKIP
+        p = start + n
+        mine = _field_is(buf, p, _id_bytes)
+        if kind == _K_ECHO:
+            return SCR_ECHO_MINE if mine else SCR_SKIP
+        if mine:
+            return SCR_PARSE
+        if prefix == b"POLL:":
+            if _field_is_all(buf, p):
+                return SCR_PARSE
+            return SCR_OTHER_POLL
+        return SCR_SKIP
+    return SCR_SKIP
+
+# Registres d'entrée GPIO de l'ESP32 (GPIO0-31 et GPIO32-39)
+_GPIO_IN_REG = const(0x3FF4403C)
+_GPIO_IN1_REG = const(0x3FF44040)
+
+_channel_pins = [Pin(p, Pin.IN, Pin.PULL_UP) for p in CHANNEL_PINS[:8]]
+# (registre haut ?, bit) précalculés pour chaque canal
+_channel_bits = [(p >= 32, (p - 32) if p >= 32 else p) for p in CHANNEL_PINS[:8]]
+CHANNEL_COUNT = len(_channel_bits)
+
+def measure_channels():
+    """
+    Échantillonne tous les canaux en une passe : les deux registres
+    GPIO_IN sont lus une seule fois, les bits sont ensuite extraits.
+    Retourne un masque (bit i = tension présente sur le canal i).
+    """
+    lo = mem32[_GPIO_IN_REG]
+    hi = mem32[_GPIO_IN1_REG]
+    mask = 0
+    for i, (high, bit) in enumerate(_channel_bits):
+        level = ((hi if high else lo) >> bit) & 1
+        if level == OPTO_ACTIVE_LEVEL:
+            mask |= 1 << i
+    return mask
+
 def measure_state():
-    """Mesure l'état du détecteur"""
+    """Mesure l'état du détecteur (masque des canaux en multi-canaux)"""
+    if CHANNEL_COUNT:
+        return measure_channels()
     # TODO: Remplacer par mesure réelle (opto/ADC/GPIO/etc.)
     return 1  # Simulé : alimenté
 
+# ===================== HISTORIQUE DES ÉTATS =====================
+# Ring buffer à base d'array : pas d'allocation après le démarrage
+hist_ticks = array("I", [0] * HIST_SIZE)
+hist_states = array("B", [0] * HIST_SIZE)
+hist_head = 0             # Prochaine case à écrire
+hist_count = 0            # Nombre d'entrées valides
+hist_total = 0            # Transitions depuis le boot (numéro de la suivante)
+last_state = None
+
+def hist_record(state):
+    """Enregistre une transition d'état (ticks_ms, état)"""
+    global hist_head, hist_count, hist_total
+    hist_ticks[hist_head] = time.ticks_ms()
+    hist_states[hist_head] = state & 0xFF
+    hist_head = (hist_head + 1) % HIST_SIZE
+    hist_total += 1
+    if hist_count < HIST_SIZE:
+        hist_count += 1
+
+def hist_sample():
+    """Échantillonne l'état et mémorise uniquement les transitions"""
+    global last_state
+    state = measure_state()
+    if state != last_state:
+        last_state = state
+        hist_record(state)
+    return state
+
+def hist_since(since):
+    """Itère sur les transitions de numéro >= `since` (ordre chronologique)"""
+    start = (hist_head - hist_count) % HIST_SIZE
+    first = hist_total - hist_count
+    for i in range(max(0, since - first), hist_count):
+        j = (start + i) % HIST_SIZE
+        yield first + i, hist_ticks[j], hist_states[j]
+
 def _uart_write_str(s):
     """Écriture UART robuste"""
     try:
@@ -235,11 +645,228 @@ def send_ack(det_id, state):
     msg = "ACK:{}:{}\n".format(det_id, 1 if state else 0)
     return _uart_write_str(msg)
 
+def send_ack_multi(det_id, mask):
+    """Envoie l'état de tous les canaux dans une seule trame"""
+    flush_uart_rx()
+    return _uart_write_str("ACKM:{}:{}:{:02x}\n".format(det_id, CHANNEL_COUNT, mask))
+
+#@if HIST_QUERY
+def send_history(det_id, since):
+    """
+    Envoie les transitions à partir du numéro `since`, puis HISTEND avec
+    le tick courant et le numéro de la prochaine transition
+    """
+    flush_uart_rx()
+    sent = 0
+    for n, tick, state in hist_since(since):
+        _uart_write_str("HIST:{}:{}:{}:{}\n".format(det_id, n, tick, state))
+        sent += 1
+    _uart_write_str("HISTEND:{}:{}:{}\n".format(det_id, time.ticks_ms(), hist_total))
+    return sent
+#@endif HIST_QUERY
+
 def send_ack_id_change(ok, new_id):
     """Envoie un ACK pour changement d'ID"""
     flush_uart_rx()
     _uart_write_str("ACKSETID:{}:{}\n".format(new_id, "OK" if ok else "ERR"))
 
+# ===================== ID EN DOUBLE / ARBITRAGE =================
+# Identifiant matériel unique (MAC) pour départager deux DD de même ID
+UID = hexlify(unique_id()).decode()
+id_conflict = False
+_dupid_ts = None
+
+def _random_ms(slots, slot_ms):
+    """Délai aléatoire (RNG matériel) en créneaux de slot_ms"""
+    return (os.urandom(1)[0] % slots) * slot_ms
+
+def id_conflict_seen(det_id):
+    """Un autre DD a répondu avec notre ID : signale le conflit au TA"""
+    global id_conflict, _dupid_ts
+    id_conflict = True
+    stats["id_conflicts"] += 1
+    now = time.ticks_ms()
+    if _dupid_ts is not None and time.ticks_diff(now, _dupid_ts) < DUPID_MIN_INTERVAL_MS:
+        return False
+    _dupid_ts = now
+    print("[DD] ID {} en double détecté".format(det_id))
+    # Délai aléatoire pour ne pas entrer en collision avec l'autre DD
+    time.sleep_ms(_random_ms(ARB_SLOTS, ARB_SLOT_MS))
+    return _uart_write_str("DUPID:{}:{}\n".format(det_id, UID))
+
+def send_arbitration(det_id):
+    """Répond à ARB après un back-off aléatoire (créneaux ARB_SLOT_MS)"""
+    time.sleep_ms(_random_ms(ARB_SLOTS, ARB_SLOT_MS))
+    return _uart_write_str("ARBR:{}:{}\n".format(det_id, UID))
+
+def change_id(new_id):
+    """Change et persiste l'ID du détecteur, puis envoie ACKSETID"""
+    global DETECTOR_ID, id_conflict
+    ok = _persist_id_to_nvs(new_id)
+    
+    if ok:
+        DETECTOR_ID = new_id
+        set_id_bytes(new_id)
+        id_conflict = False
+        stats["setid_ok"] += 1
+        rec["setid_ok"] += 1
+        print("[DD] ID changé: {}".format(new_id))
+        led_pulse()
+    else:
+        stats["setid_err"] += 1
+        rec["setid_err"] += 1
+        print("[DD] Erreur changement ID")
+    
+    send_ack_id_change(ok, new_id)
+    return ok
+
+#@if OTA
+# ======================== MISE À JOUR OTA =======================
+# Le TA envoie OTAS (début), des blocs OTAB numérotés puis OTAE (fin).
+# Le DD acquitte par fenêtre (OTAK:<id>:<prochain bloc>) ; un bloc hors
+# séquence ou corrompu déclenche un OTAK immédiat (go-back-N côté TA).
+# Les réponses OTA ne vident pas le buffer RX : les blocs suivants y sont.
+ota = None
+
+def _ota_reply(kind, det_id, value):
+    _uart_write_str("{}:{}:{}\n".format(kind, det_id, value))
+
+def _ota_remove(name):
+    try:
+        os.remove(name)
+    except OSError:
+        pass
+
+def ota_start(det_id, size, block, window, sha, name):
+    """Ouvre (ou reprend) un transfert OTA et répond OTAR:<id>:<prochain bloc>"""
+    global ota
+    if ota and ota["f"]:
+        ota["f"].close()
+    ota = None
+
+    if name not in OTA_TARGETS or not 0 < size <= OTA_MAX_SIZE or block <= 0 or window <= 0:
+        _ota_reply("OTAR", det_id, "ERR")
+        return False
+    # La fenêtre entière doit tenir dans le buffer RX pendant les écritures
+    # flash : OTAB:<id>:<n>:<crc32>: (32 car. max) + base64 + '\n'
+    if window * ((block + 2) // 3 * 4 + 33) > UART_RXBUF:
+        print("[DD] OTA refusée : fenêtre {} x {} o > rxbuf".format(window, block))
+        _ota_reply("OTAR", det_id, "ERR")
+        return False
+
+    meta = "{}:{}:{}:{}".format(size, block, sha, name)
+    next_seq = 0
+    try:
+        with open(OTA_META_FILE) as f:
+            same = f.read() == meta
+        done = os.stat(OTA_TMP_FILE)[6]
+        if same and done % block == 0 and done <= size:
+            next_seq = done // block
+    except OSError:
+        pass
+
+    try:
+        if next_seq:
+            f = open(OTA_TMP_FILE, "r+b")
+            f.seek(next_seq * block)
+        else:
+            _ota_remove(OTA_PENDING_FILE)
+            with open(OTA_META_FILE, "w") as mf:
+                mf.write(meta)
+            f = open(OTA_TMP_FILE, "wb")
+    except OSError:
+        _ota_reply("OTAR", det_id, "ERR")
+        return False
+
+    ota = {"size": size, "block": block, "window": window, "sha": sha,
+           "name": name, "next": next_seq, "nak": -1, "f": f,
+           "count": (size + block - 1) // block, "ts": time.ticks_ms()}
+    print("[DD] OTA {} ({} o) reprise au bloc {}".format(name, size, next_seq))
+    _ota_reply("OTAR", det_id, next_seq)
+    return True
+
+def ota_block(det_id, seq, crc, b64):
+    """Écrit un bloc s'il est le suivant attendu et si son CRC est bon"""
+    if not ota:
+        return False
+    ota["ts"] = time.ticks_ms()
+    if seq != ota["next"]:
+        # Trou : une seule demande de reprise
+        if seq > ota["next"] and ota["nak"] != ota["next"]:
+            ota["nak"] = ota["next"]
+            _ota_reply("OTAK", det_id, ota["next"])
+        # Doublon : le TA renvoie la fenêtre car notre OTAK s'est perdu ;
+        # il est répété une fois par fenêtre, au dernier bloc déjà reçu
+        elif seq == ota["next"] - 1:
+            _ota_reply("OTAK", det_id, ota["next"])
+        return False
+    try:
+        data = a2b_base64(b64)
+    except ValueError:
+        data = b""
+    expected = min(ota["block"], ota["size"] - seq * ota["block"])
+    if len(data) != expected or (crc32(data) & 0xFFFFFFFF) != crc:
+        ota["nak"] = ota["next"]
+        _ota_reply("OTAK", det_id, ota["next"])
+        return False
+
+    ota["f"].write(data)
+    ota["next"] += 1
+    if ota["next"] % ota["window"] == 0 or ota["next"] == ota["count"]:
+        ota["f"].flush()
+        _ota_reply("OTAK", det_id, ota["next"])
+    return True
+
+def ota_trial_done():
+    """Première boucle atteinte : boot.py garde cette version"""
+    try:
+        if _rec_nvs.get_i32(OTA_TRIAL_KEY):
+            _rec_nvs.set_i32(OTA_TRIAL_KEY, 0)
+            _rec_nvs.commit()
+            print("[DD] Mise à jour OTA validée")
+    except Exception:
+        pass
+
+def ota_end(det_id):
+    """Vérifie taille et SHA-256, marque l'image à installer et redémarre"""
+    global ota
+    if not ota:
+        _ota_reply("OTAD", det_id, "ERR")
+        return False
+    ota["f"].close()
+    name = ota["name"]
+    ok = ota["next"] == ota["count"]
+    if ok:
+        h = sha256()
+        try:
+            with open(OTA_TMP_FILE, "rb") as f:
+                while True:
+                    chunk = f.read(512)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+            ok = (os.stat(OTA_TMP_FILE)[6] == ota["size"]
+                  and hexlify(h.digest()).decode() == ota["sha"])
+        except OSError:
+            ok = False
+    ota = None
+
+    if not ok:
+        _ota_remove(OTA_TMP_FILE)
+        _ota_remove(OTA_META_FILE)
+        _ota_reply("OTAD", det_id, "ERR")
+        print("[DD] OTA rejetée (hash/taille)")
+        return False
+
+    with open(OTA_PENDING_FILE, "w") as f:
+        f.write(name)
+    _ota_reply("OTAD", det_id, "OK")
+    print("[DD] OTA vérifiée - installation de {} au redémarrage".format(name))
+    rec_save(force=True)
+    time.sleep_ms(200)
+    reset()
+#@endif OTA
+
 # ======================== STATISTIQUES ==========================
 stats = {
     "loop_count": 0,
@@ -247,10 +874,93 @@ stats = {
     "nok_count": 0,          # POLL pour autres DD
     "setid_ok": 0,
     "setid_err": 0,
-    "min_response_time": 9999,
-    "max_response_time": 0,
+    "hist_req": 0,           # Requêtes HISTQ servies
+    "ready_ms": 0,           # Mise sous tension -> message BOOT
+    "first_ack_ms": 0,       # Mise sous tension -> premier ACK
+    "id_conflicts": 0,       # Réponses d'un autre DD avec notre ID
+    "min_response_time": 999999,  # µs
+    "max_response_time": 0,       # µs
 }
 
+# Instrumentation du chemin POLL -> ACK (ticks_us)
+#   STAGE_PARSE : début du filtrage de la trame -> parse terminé
+#   STAGE_REPLY : parse terminé -> réponse en file TX
+#   STAGE_TOTAL : début du filtrage de la trame -> réponse en file TX
+STAGE_PARSE = const(0)
+STAGE_REPLY = const(1)
+STAGE_TOTAL = const(2)
+STAGE_NAMES = ("parse", "reply", "total")
+# Fenêtre remise à zéro à chaque trame STATS ; une mesure qui ferait
+# déborder les cumuls (array "I") est ignorée pour garder des moyennes justes
+stage_sum = array("I", [0, 0, 0])   # Cumuls (µs)
+stage_max = array("I", [0, 0, 0])   # Maximums (µs)
+stage_n = 0                         # Nombre de réponses mesurées
+STAGE_SUM_MAX = 0xFFFFFFFF
+
+# Uptime : ticks_ms reboucle (~12,4 jours), on cumule les écarts
+_up_ref = time.ticks_ms()
+_up_ms = _up_ref
+
+# Trame STATS (struct en hexa) :
+#   version, loop_count, ok, nok, setid_ok, setid_err, min_rt, max_rt (µs),
+#   uptime (s), heap libre, cause reset, premier ACK (ms), n, cumuls[3],
+#   maximums[3] (µs)
+STATS_VERSION = 2
+STATS_FMT = "<BIIIHHIIIIBII3I3I"
+
+def stage_record(t_rx, t_parse, t_tx):
+    """Cumule les durées des étapes d'une réponse"""
+    global stage_n
+    d_parse = time.ticks_diff(t_parse, t_rx)
+    d_reply = time.ticks_diff(t_tx, t_parse)
+    d_total = time.ticks_diff(t_tx, t_rx)
+    # Le total majore les deux autres étapes : seul cumul à surveiller
+    if stage_sum[STAGE_TOTAL] + d_total <= STAGE_SUM_MAX:
+        stage_sum[STAGE_PARSE] += d_parse
+        stage_sum[STAGE_REPLY] += d_reply
+        stage_sum[STAGE_TOTAL] += d_total
+        stage_n += 1
+    if d_parse > stage_max[STAGE_PARSE]:
+        stage_max[STAGE_PARSE] = d_parse
+    if d_reply > stage_max[STAGE_REPLY]:
+        stage_max[STAGE_REPLY] = d_reply
+    if d_total > stage_max[STAGE_TOTAL]:
+        stage_max[STAGE_TOTAL] = d_total
+    return d_total
+
+def uptime_s():
+    """Uptime en secondes, à appeler au moins une fois par demi-période de ticks_ms"""
+    global _up_ref, _up_ms
+    now = time.ticks_ms()
+    _up_ms += time.ticks_diff(now, _up_ref)
+    _up_ref = now
+    return _up_ms // 1000
+
+#@if STATS
+def stage_reset():
+    """Ouvre une nouvelle fenêtre de mesure des étapes"""
+    global stage_n
+    for i in range(3):
+        stage_sum[i] = 0
+        stage_max[i] = 0
+    stage_n = 0
+
+def send_stats(det_id):
+    """Envoie compteurs et instrumentation dans une trame STATS (struct en hexa)"""
+    flush_uart_rx()
+    min_rt = stats["min_response_time"] if stats["ok_count"] else 0
+    payload = struct.pack(STATS_FMT, STATS_VERSION,
+                          stats["loop_count"], stats["ok_count"], stats["nok_count"],
+                          min(stats["setid_ok"], 0xFFFF), min(stats["setid_err"], 0xFFFF),
+                          min_rt, stats["max_response_time"],
+                          min(uptime_s(), 0xFFFFFFFF), gc.mem_free(), RESET_CAUSE & 0xFF,
+                          stats["first_ack_ms"], stage_n,
+                          stage_sum[0], stage_sum[1], stage_sum[2],
+                          stage_max[0], stage_max[1], stage_max[2])
+    stage_reset()
+    return _uart_write_str("STATS:{}:{}\n".format(det_id, hexlify(payload).decode()))
+#@endif STATS
+
 def print_stats():
     """Affiche les statistiques (version production)"""
     print("[STATS] loop={} OK={} NOK={}".format(
@@ -258,34 +968,52 @@ def print_stats():
     ))
     
     if stats["ok_count"] > 0:
-        print("[STATS] response: min={}ms max={}ms".format(
+        print("[STATS] response: min={}us max={}us".format(
             stats["min_response_time"],
             stats["max_response_time"]
         ))
 
+    if stage_n:
+        print("[STATS] " + " ".join("{}={}/{}us".format(
+            STAGE_NAMES[i], stage_sum[i] // stage_n, stage_max[i]) for i in range(3)))
+
+    print("[STATS] cumul: boots={} OK={} NOK={}".format(
+        rec["boots"], rec["ok"], rec["nok"]
+    ))
+
 # ======================== BOUCLE PRINCIPALE =====================
 buf = bytearray()
+set_id_bytes(DETECTOR_ID)
 
 # Vider buffer au démarrage
 time.sleep_ms(200)
 flush_uart_rx()
 
+# État initial dans l'historique
+hist_sample()
+
 # Message de boot
-_uart_write_str("BOOT:{}\n".format(DETECTOR_ID))
-print("[DD] Message BOOT envoyé\n")
+# ticks_ms() part de 0 au reset : c'est le temps de démarrage complet
+stats["ready_ms"] = time.ticks_ms()
+_uart_write_str("BOOT:{}:{}:{}\n".format(DETECTOR_ID, RESET_CAUSE, stats["ready_ms"]))
+print("[DD] Message BOOT envoyé (prêt en {}ms)\n".format(stats["ready_ms"]))
 led.value(0)
 
 print("[DD] Boucle principale active (délai={}ms)\n".format(LOOP_DELAY_MS))
 
 while True:
-    # Watchdog
-    last_loop_ts = time.ticks_ms()
     stats["loop_count"] += 1
+    rx_progress = False       # Trame complète lue et filtrée
+    uart_ok = False           # Passe de lecture UART terminée sans erreur
 
     # LED
     led_update()
 
+    # Historique des transitions
+    hist_sample()
+
     # Lecture UART
+    pos = 0
     try:
         if uart.any():
             data = uart.read()
@@ -294,18 +1022,33 @@ while True:
                 
                 # Traiter toutes les lignes complètes
                 while True:
-                    nl = buf.find(b'\n')
+                    nl = buf.find(b'\n', pos)
                     if nl == -1:
                         break
-                    
-                    line = bytes(buf[:nl + 1])
-                    buf = bytearray(buf[nl + 1:])
+                    start = pos
+                    pos = nl + 1
+                    rx_progress = True
+                    # Horodatage par trame : une trame en fin de lecture ne
+                    # compte pas le traitement des précédentes
+                    t_rx = time.ticks_us()   # Début du filtrage
 
-                    process_start = time.ticks_ms()
+                    # Filtrage sur octets bruts : seules nos trames sont décodées
+                    kind = screen_frame(buf, start)
+                    if kind == SCR_SKIP:
+                        continue
+                    if kind == SCR_OTHER_POLL:
+                        stats["nok_count"] += 1
+                        rec["nok"] += 1
+                        continue
+                    if kind == SCR_ECHO_MINE:
+                        id_conflict_seen(DETECTOR_ID)
+                        continue
 
+                    line = bytes(buf[start:pos])
                     parsed = parse_line(line)
                     if not parsed:
                         continue
+                    t_parse = time.ticks_us()   # Parse terminé
 
                     cmd, det_id, _ = parsed
                     
@@ -316,47 +1059,113 @@ while True:
                     if cmd == "POLL":
                         if det_id == DETECTOR_ID or det_id.upper() == "ALL":
                             # POLL pour ce détecteur
-                            state = measure_state()
-                            success = send_ack(DETECTOR_ID, state)
+                            state = hist_sample()
+                            if CHANNEL_COUNT:
+                                success = send_ack_multi(DETECTOR_ID, state)
+                            else:
+                                success = send_ack(DETECTOR_ID, state)
+                            t_tx = time.ticks_us()   # Réponse en file TX
                             
                             if success:
                                 stats["ok_count"] += 1
+                                rec["ok"] += 1
+                                if not stats["first_ack_ms"]:
+                                    stats["first_ack_ms"] = time.ticks_ms()
+                                    print("[DD] Premier ACK à {}ms".format(stats["first_ack_ms"]))
                                 
-                                # Temps de réponse
-                                response_time = time.ticks_diff(time.ticks_ms(), process_start)
+                                # Temps de réponse (µs)
+                                response_time = stage_record(t_rx, t_parse, t_tx)
                                 if response_time < stats["min_response_time"]:
                                     stats["min_response_time"] = response_time
                                 if response_time > stats["max_response_time"]:
                                     stats["max_response_time"] = response_time
+                                if response_time < rec["min_rt"]:
+                                    rec["min_rt"] = response_time
+                                if response_time > rec["max_rt"]:
+                                    rec["max_rt"] = response_time
                                 
                                 # Feedback LED
                                 led_pulse()
                         else:
                             # POLL pour autre détecteur
                             stats["nok_count"] += 1
+                            rec["nok"] += 1
 
-                    elif cmd == "SETID":
-                        # Changement d'ID
-                        new_id = det_id
-                        ok = _persist_id_to_nvs(new_id)
-                        
-                        if ok:
-                            DETECTOR_ID = new_id
-                            stats["setid_ok"] += 1
-                            print("[DD] ID changé: {}".format(new_id))
+                    #@if STATS
+                    elif cmd == "STATQ":
+                        if det_id == DETECTOR_ID:
+                            send_stats(DETECTOR_ID)
+
+                    #@endif STATS
+                    #@if HIST_QUERY
+                    elif cmd == "HIST":
+                        # Historique des transitions depuis un numéro
+                        if det_id == DETECTOR_ID:
+                            send_history(DETECTOR_ID, parsed[2])
+                            stats["hist_req"] += 1
                             led_pulse()
-                        else:
-                            stats["setid_err"] += 1
-                            print("[DD] Erreur changement ID")
-                        
-                        send_ack_id_change(ok, new_id)
+
+                    #@endif HIST_QUERY
+                    #@if OTA
+                    elif cmd == "OTAB":
+                        if det_id == DETECTOR_ID:
+                            ota_block(DETECTOR_ID, *parsed[2])
+
+                    elif cmd == "OTAS":
+                        if det_id == DETECTOR_ID:
+                            ota_start(DETECTOR_ID, *parsed[2])
+                            led_pulse()
+
+                    elif cmd == "OTAE":
+                        if det_id == DETECTOR_ID:
+                            ota_end(DETECTOR_ID)
+
+                    #@endif OTA
+                    elif cmd == "SETID":
+                        # Changement d'ID (diffusé)
+                        change_id(det_id)
+
+                    elif cmd == "SETIDU":
+                        # Changement d'ID ciblé (arbitrage)
+                        if parsed[2] == UID:
+                            change_id(det_id)
+
+                    elif cmd == "ARB":
+                        # Tour d'arbitrage pour notre ID
+                        if det_id == DETECTOR_ID:
+                            send_arbitration(DETECTOR_ID)
+
+        # Lecture UART terminée sans blocage ni exception
+        uart_ok = True
                         
     except Exception as e:
+        #@if DEV_MODE
         if DEV_MODE:
             print("[DD] Erreur boucle: {}".format(e))
+        #@endif DEV_MODE
+        pass
+
+    # Retirer les lignes traitées (une seule copie par lecture)
+    if pos:
+        buf = buf[pos:]
+
+    # Watchdog
+    wdt_feed(rx_progress, uart_ok)
+
+    # Persistance paresseuse des compteurs
+    rec_save()
                         
     # Stats toutes les 500 boucles (~25s avec 50ms)
     if (stats["loop_count"] % 500) == 0:
+        uptime_s()            # Suit le rebouclage même sans STATQ
         print_stats()
 
-    time.sleep_ms(LOOP_DELAY_MS)
\ No newline at end of file
+    delay = LOOP_DELAY_MS
+    #@if OTA
+    if stats["loop_count"] == 1:
+        ota_trial_done()
+    # Transfert OTA en cours : les blocs arrivent en rafale
+    if ota and time.ticks_diff(time.ticks_ms(), ota["ts"]) < OTA_IDLE_MS:
+        delay = OTA_LOOP_DELAY_MS
+    #@endif OTA
+    time.sleep_ms(delay)
\ No newline at end of file
@@ -0,0 +1,121 @@
+# test_build_dd.py - Vérifie sur PC que le build allégé se comporte comme
+# la source complète (protocole et filtrage des trames)
+#
+# Usage : python -m pytest dd/tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import build_dd  # noqa: E402
+
+ALL_ON = dict(build_dd.FEATURES)
+ALL_OFF = {name: False for name in build_dd.FEATURES}
+
+# Début de la section protocole / fin du filtrage dans dd_main.py
+_SECTION_START = "# ======================= OUTILS / PROTOCOLE"
+_SECTION_END = "# Registres d'entrée GPIO"
+
+FRAMES = [
+    b"POLL:01\n", b"POLL:02\n", b"POLL:ALL\n", b"POLL:010\n",
+    b"ACK:01:1\n", b"ACK:02:0\n", b"ACKM:01:2:3\n", b"BOOT:01:2:350\n",
+    b"SETID:05\n", b"SETIDU:a1b2c3:07\n", b"ARB:01\n", b"ARB:02\n",
+    b"STATQ:01\n", b"HISTQ:01:0\n", b"OTAE:01\n",
+    b"OTAS:01:100:64:4:" + b"0" * 64 + b":dd_main.py\n",
+    b"OTAB:01:0:1234abcd:QUJD\n",
+    b"HIST:01:5:1200:1\n", b"STATS:01:00\n", b"DUPID:01:ff\n", b"\x00garbage\n",
+]
+DISABLED_FRAMES = [b"STATQ:01\n", b"HISTQ:01:0\n", b"OTAE:01\n",
+                   b"OTAB:01:0:1234abcd:QUJD\n"]
+
+
+def _read_source():
+    with open(build_dd.SOURCE, encoding="utf-8") as f:
+        return f.read()
+
+
+def _load_protocol(text):
+    """Exécute parse_line/screen_frame extraits de text (sans matériel)"""
+    start = text.index(_SECTION_START)
+    end = text.index(_SECTION_END)
+    ns = {"const": lambda x: x}
+    exec(compile(text[start:end], "dd_main.py", "exec"), ns)
+    ns["set_id_bytes"]("01")
+    return ns
+
+
+def _run(ns, frame):
+    return ns["screen_frame"](frame, 0), ns["parse_line"](frame)
+
+
+@pytest.mark.parametrize("features", [ALL_ON, ALL_OFF])
+def test_stripped_source_compiles(features):
+    text = build_dd.strip_features(_read_source(), features)
+    compile(text, "dd_main.py", "exec")
+    assert "#@" not in text
+
+
+@pytest.mark.parametrize("features", [ALL_ON, ALL_OFF])
+def test_accepted_frames_are_parsed(features):
+    # Une trame retenue par screen_frame doit être décodée par parse_line,
+    # sinon les comparaisons ci-dessous ne vérifieraient que des None
+    ns = _load_protocol(build_dd.strip_features(_read_source(), features))
+    accepted = 0
+    for frame in FRAMES:
+        kind, parsed = _run(ns, frame)
+        if kind == ns["SCR_PARSE"]:
+            assert parsed is not None, frame
+            accepted += 1
+    assert accepted >= 5
+
+
+def test_screen_frame_id_field():
+    ns = _load_protocol(_read_source())
+    screen = ns["screen_frame"]
+    assert screen(b"POLL:01\n", 0) == ns["SCR_PARSE"]
+    assert screen(b"POLL:01\r\n", 0) == ns["SCR_PARSE"]
+    assert screen(b"HISTQ:01:0\n", 0) == ns["SCR_PARSE"]
+    assert screen(b"POLL:010\n", 0) == ns["SCR_OTHER_POLL"]
+    assert screen(b"POLL:0\n", 0) == ns["SCR_OTHER_POLL"]
+    assert screen(b"POLL:01", 0) == ns["SCR_OTHER_POLL"]
+    assert screen(b"ACK:01:1\n", 0) == ns["SCR_ECHO_MINE"]
+    assert screen(b"ACK:011:1\n", 0) == ns["SCR_SKIP"]
+    # POLL:ALL quelle que soit la casse, champ complet uniquement
+    for frame in (b"POLL:ALL\n", b"POLL:All\n", b"POLL:all\r\n"):
+        assert screen(frame, 0) == ns["SCR_PARSE"], frame
+    assert screen(b"POLL:ALLX\n", 0) == ns["SCR_OTHER_POLL"]
+    assert screen(b"POLL:AL\n", 0) == ns["SCR_OTHER_POLL"]
+    # Ligne au milieu du buffer RX
+    assert screen(b"POLL:02\nPOLL:01\n", 8) == ns["SCR_PARSE"]
+
+
+def test_full_build_matches_source():
+    src = _load_protocol(_read_source())
+    built = _load_protocol(build_dd.strip_features(_read_source(), ALL_ON))
+    for frame in FRAMES:
+        assert _run(built, frame) == _run(src, frame), frame
+
+
+def test_minimal_build_keeps_core_protocol():
+    src = _load_protocol(_read_source())
+    built = _load_protocol(build_dd.strip_features(_read_source(), ALL_OFF))
+    for frame in FRAMES:
+        if frame in DISABLED_FRAMES or frame.startswith(b"OTAS:"):
+            continue
+        assert _run(built, frame) == _run(src, frame), frame
+
+
+def test_minimal_build_ignores_disabled_commands():
+    built = _load_protocol(build_dd.strip_features(_read_source(), ALL_OFF))
+    for frame in DISABLED_FRAMES:
+        assert built["screen_frame"](frame, 0) == built["SCR_SKIP"], frame
+
+
+def test_unbalanced_markers_rejected():
+    with pytest.raises(build_dd.BuildError):
+        build_dd.strip_features("#@if OTA\nx = 1\n", ALL_ON)
+    with pytest.raises(build_dd.BuildError):
+        build_dd.strip_features("#@if NOPE\n#@endif NOPE\n", ALL_ON)
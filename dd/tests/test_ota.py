@@ -0,0 +1,183 @@
+# test_ota.py - Transfert OTA sur PC : ota_start/ota_block/ota_end de
+# dd_main.py face au vrai Radio433.ota_update du TA (ta_radio_433.py),
+# reliés par une fausse UART qui peut perdre des trames
+#
+# Usage : python -m pytest dd/tests
+
+import asyncio
+import binascii
+import hashlib
+import importlib
+import os
+import sys
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import build_dd  # noqa: E402
+
+TA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), "ta")
+
+_OTA_START = "# ======================== MISE À JOUR OTA"
+_OTA_END = "#@endif OTA"
+_PROTO_START = "# ======================= OUTILS / PROTOCOLE"
+_PROTO_END = "# Registres d'entrée GPIO"
+
+BLOCK = 32
+WINDOW = 4
+MAX_RETRIES = 5
+
+
+def _load_dd(sent):
+    """Exécute le protocole et la section OTA de dd_main.py ; les trames émises vont dans sent"""
+    with open(build_dd.SOURCE, encoding="utf-8") as f:
+        text = f.read()
+    ns = {
+        "const": lambda x: x,
+        "os": os, "a2b_base64": binascii.a2b_base64, "crc32": binascii.crc32,
+        "hexlify": binascii.hexlify, "sha256": hashlib.sha256,
+        "_uart_write_str": sent.append, "rec_save": lambda force=False: True,
+        "reset": lambda: sent.append("RESET\n"), "print": lambda *a: None,
+        "time": types.SimpleNamespace(sleep_ms=lambda ms: None, ticks_ms=lambda: 0),
+        "OTA_TMP_FILE": "ota.tmp", "OTA_META_FILE": "ota.meta",
+        "OTA_PENDING_FILE": "ota.pending", "OTA_TARGETS": ("dd_main.py",),
+        "OTA_MAX_SIZE": 65536, "UART_RXBUF": 2048,
+    }
+    for start, end in ((_PROTO_START, _PROTO_END), (_OTA_START, _OTA_END)):
+        a = text.index(start)
+        b = text.index(end, a)
+        exec(compile(text[a:b], "dd_main.py", "exec"), ns)
+    ns["set_id_bytes"]("01")
+    return ns
+
+
+class LoopbackUart:
+    """
+    UART du TA reliée au DD exécuté : chaque ligne écrite est traitée comme
+    dans la boucle principale du DD, ses réponses deviennent lisibles par le
+    TA. Les OTAK dont le rang figure dans drop_otak sont perdus.
+    """
+
+    def __init__(self, dd, sent, drop_otak=()):
+        self.dd = dd
+        self.sent = sent
+        self.drop_otak = drop_otak
+        self.otak_rank = 0
+        self.tx = bytearray()
+        self.rx = bytearray()
+
+    def write(self, data):
+        self.tx.extend(data)
+        while b"\n" in self.tx:
+            nl = self.tx.index(b"\n")
+            self._dd_line(bytes(self.tx[:nl + 1]))
+            del self.tx[:nl + 1]
+        return len(data)
+
+    def _dd_line(self, line):
+        del self.sent[:]
+        parsed = self.dd["parse_line"](line)
+        if parsed:
+            cmd, det_id, args = parsed
+            if cmd == "OTAS":
+                self.dd["ota_start"](det_id, *args)
+            elif cmd == "OTAB":
+                self.dd["ota_block"](det_id, *args)
+            elif cmd == "OTAE":
+                self.dd["ota_end"](det_id)
+        for reply in self.sent:
+            if reply.startswith("OTAK:"):
+                dropped = self.otak_rank in self.drop_otak
+                self.otak_rank += 1
+                if dropped:
+                    continue
+            self.rx.extend(reply.encode())
+
+    def any(self):
+        return len(self.rx)
+
+    def read(self, n):
+        data = bytes(self.rx[:n])
+        del self.rx[:n]
+        return data
+
+
+class Logger:
+    def __getattr__(self, name):
+        return lambda *a: None
+
+
+@pytest.fixture
+def radio_433(monkeypatch):
+    """Module ta_radio_433 sur PC : horloge virtuelle avancée par sleep_ms"""
+    clock = [0]
+
+    def sleep_ms(ms):
+        clock[0] += max(ms, 1)
+
+    async def async_sleep_ms(ms):
+        sleep_ms(ms)
+        await asyncio.sleep(0)
+
+    monkeypatch.setitem(sys.modules, "machine", types.SimpleNamespace(Pin=None, UART=None))
+    monkeypatch.setattr(time, "ticks_ms", lambda: clock[0], raising=False)
+    monkeypatch.setattr(time, "ticks_diff", lambda a, b: a - b, raising=False)
+    monkeypatch.setattr(time, "sleep_ms", sleep_ms, raising=False)
+    monkeypatch.setattr(asyncio, "sleep_ms", async_sleep_ms, raising=False)
+    monkeypatch.syspath_prepend(TA_DIR)
+    monkeypatch.delitem(sys.modules, "ta_radio_433", raising=False)
+    module = importlib.import_module("ta_radio_433")
+    yield module
+    sys.modules.pop("ta_radio_433", None)
+
+
+def _transfer(radio_433, tmp_path, image, drop_otak=()):
+    """Envoie image au DD par Radio433.ota_update ; True si le DD l'a acceptée"""
+    sent = []
+    dd = _load_dd(sent)
+    radio = radio_433.Radio433({"SIMULATE": True, "OTA": {
+        "BLOCK_SIZE": BLOCK, "WINDOW": WINDOW, "BLOCK_GAP_MS": 0,
+        "ACK_TIMEOUT_MS": 500, "END_TIMEOUT_MS": 500,
+        "MAX_RETRIES": MAX_RETRIES}}, Logger())
+    radio.simulate = False
+    radio.uart = LoopbackUart(dd, sent, drop_otak)
+    path = tmp_path / "fw.py"
+    path.write_bytes(image)
+    return asyncio.run(radio.ota_update("01", str(path), "dd_main.py"))
+
+
+def test_transfer_completes(radio_433, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    image = bytes(range(256)) * 2 + b"fin"
+    assert _transfer(radio_433, tmp_path, image)
+    assert (tmp_path / "ota.tmp").read_bytes() == image
+    assert (tmp_path / "ota.pending").read_text() == "dd_main.py"
+
+
+def test_lost_window_ack_is_repeated(radio_433, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    image = bytes(range(256)) * 2 + b"fin"
+    # Perte de l'OTAK qui ferme la première fenêtre
+    assert _transfer(radio_433, tmp_path, image, drop_otak=(0,))
+    assert (tmp_path / "ota.tmp").read_bytes() == image
+
+
+def test_lost_final_ack_is_repeated(radio_433, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    image = bytes(range(4 * BLOCK))
+    # Une seule fenêtre : son OTAK (le dernier) est perdu
+    assert _transfer(radio_433, tmp_path, image, drop_otak=(0,))
+
+
+def test_window_larger_than_rxbuf_is_refused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sent = []
+    dd = _load_dd(sent)
+    # 16 blocs de 96 o (~160 car. par ligne) ne tiennent pas dans 2048 o
+    assert not dd["ota_start"]("01", 4096, 96, 16, "0" * 64, "dd_main.py")
+    assert sent[-1] == "OTAR:01:ERR\n"
+    assert dd["ota_start"]("01", 4096, 96, 8, "0" * 64, "dd_main.py")
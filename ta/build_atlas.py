@@ -0,0 +1,150 @@
+# build_atlas.py - Génère l'atlas de sprites de l'UI du TA (exécuté sur le PC)
+# Version : 1.1 (tag = empreinte de la géométrie + titre)
+#
+# Rend le bandeau de titre et les labels DD avec les mêmes fonts, couleurs
+# et géométrie que ta_ui, dans un atlas 4 bits/pixel (palette RGB565) lu
+# par ta_atlas.Atlas au démarrage.
+#
+# Usage :
+#   python build_atlas.py --fonts <dossier contenant vga1_8x16.py et
+#                                  vga1_16x32.py> [--out ui_atlas.bin]
+#
+# Copier ensuite ui_atlas.bin sur la carte (UI["ATLAS_FILE"]). À refaire
+# après un changement de APP_NAME/APP_VERSION, de GROUP_IDS, de la largeur
+# ou des marges : le tag de l'atlas en contient l'empreinte et ta_ui ignore
+# un atlas qui ne correspond plus (dessin classique).
+
+import argparse
+import os
+import struct
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import ta_config as config  # noqa: E402
+import st7789  # noqa: E402  (couleurs, comme ta_config)
+import ta_atlas  # noqa: E402
+import ta_layout  # noqa: E402
+
+DEFAULT_OUT = "ui_atlas.bin"
+
+
+class Sprite:
+    """Image en indices de palette, dessinée en mémoire sur le PC"""
+
+    def __init__(self, name, width, height, background):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.pixels = [background] * (width * height)
+
+    def text(self, font, text, x, y, color):
+        """Texte en font bitmap (mêmes règles que st7789s3 : glyphes hors
+        font en cases vides, caractères hors sprite coupés)"""
+        bpr = font.WIDTH // 8
+        for ch in text:
+            code = ord(ch)
+            if font.FIRST <= code < font.LAST:
+                base = (code - font.FIRST) * bpr * font.HEIGHT
+                for row in range(font.HEIGHT):
+                    for col in range(font.WIDTH):
+                        byte = font.FONT[base + row * bpr + col // 8]
+                        if byte & (0x80 >> (col % 8)):
+                            self.set(x + col, y + row, color)
+            x += font.WIDTH
+
+    def set(self, x, y, color):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.pixels[y * self.width + x] = color
+
+    def pack(self, palette):
+        """Pixels 4 bits/pixel, quartet haut = pixel pair"""
+        out = bytearray()
+        for y in range(self.height):
+            row = self.pixels[y * self.width:(y + 1) * self.width]
+            if self.width % 2:
+                row = row + [row[-1]]
+            for i in range(0, len(row), 2):
+                out.append(palette.index(row[i]) << 4 | palette.index(row[i + 1]))
+        return bytes(out)
+
+
+def build_sprites(font_small, font_large):
+    """Sprites du titre et des labels, à la géométrie de ta_ui ; retourne (tag, sprites)"""
+    ui = config.UI
+    width = ui.get("WIDTH", 320)
+    title_h = ui.get("ZONE_TITLE_HEIGHT", 20)
+    margin_left = ui.get("MARGIN_LEFT", 10)
+    margin_right = ui.get("MARGIN_RIGHT", 10)
+    bar_spacing = ui.get("BAR_SPACING", 5)
+    group_ids = config.RADIO["GROUP_IDS"]
+    _, bar_width, _, labels = ta_layout.group_layout(
+        width, margin_left, margin_right, bar_spacing, len(group_ids))
+
+    title = ta_layout.title_text(config)
+    tag = ta_layout.atlas_tag(title, width, title_h, margin_left, margin_right,
+                              bar_spacing, group_ids)
+    sprite = Sprite("title", width, title_h, st7789.BLUE)
+    sprite.text(font_large, title, ta_layout.title_x(width, title), 2, st7789.WHITE)
+    sprites = [sprite]
+
+    for i, text in enumerate(labels):
+        sprite = Sprite("lbl{}".format(i), bar_width, font_small.HEIGHT, st7789.BLACK)
+        text_x = (bar_width - len(text) * ta_layout.LABEL_CHAR_W) // 2
+        sprite.text(font_small, text, text_x, 0, st7789.WHITE)
+        sprites.append(sprite)
+    return tag, sprites
+
+
+def write_atlas(path, tag, sprites):
+    palette = []
+    for sprite in sprites:
+        for color in sprite.pixels:
+            if color not in palette:
+                palette.append(color)
+    if len(palette) > ta_atlas.MAX_COLORS:
+        raise ValueError("plus de {} couleurs".format(ta_atlas.MAX_COLORS))
+
+    offset = (ta_atlas.HEADER_SIZE + 2 * len(palette)
+              + ta_atlas.ENTRY_SIZE * len(sprites))
+    index = bytearray()
+    data = bytearray()
+    for sprite in sprites:
+        packed = sprite.pack(palette)
+        index += struct.pack(ta_atlas.ENTRY_FMT, sprite.name.encode(),
+                             sprite.width, sprite.height, offset + len(data))
+        data += packed
+
+    with open(path, "wb") as f:
+        f.write(struct.pack(ta_atlas.HEADER_FMT, ta_atlas.MAGIC, ta_atlas.VERSION,
+                            len(palette), len(sprites), tag.encode()[:32]))
+        f.write(struct.pack("<{}H".format(len(palette)), *palette))
+        f.write(index)
+        f.write(data)
+    return os.path.getsize(path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Atlas de sprites de l'UI du TA")
+    ap.add_argument("--fonts", required=True,
+                    help="dossier des fonts vga1_8x16.py / vga1_16x32.py")
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    args = ap.parse_args(argv)
+
+    sys.path.insert(0, args.fonts)
+    try:
+        import vga1_8x16 as font_small
+        import vga1_16x32 as font_large
+    except ImportError as e:
+        print("[ATLAS] Erreur: font introuvable ({})".format(e))
+        return 1
+
+    tag, sprites = build_sprites(font_small, font_large)
+    size = write_atlas(args.out, tag, sprites)
+    print("[ATLAS] {} sprites -> {} ({} octets)".format(len(sprites), args.out, size))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
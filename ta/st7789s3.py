@@ -43,9 +43,21 @@ This driver adds support for:
 """
 
 import time
+import micropython
 from micropython import const
+from array import array
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
 import ustruct as struct
 
+try:
+    # Native i80 bus driver (LCD_CAM + GDMA), e.g. lvgl_micropython lcd_bus
+    import lcd_bus
+except ImportError:
+    lcd_bus = None
+
 # commands
 ST7789_NOP = const(0x00)
 ST7789_SWRESET = const(0x01)
@@ -65,6 +77,7 @@ ST7789_CASET = const(0x2A)
 ST7789_RASET = const(0x2B)
 ST7789_RAMWR = const(0x2C)
 ST7789_RAMRD = const(0x2E)
+ST7789_RAMWRC = const(0x3C)
 
 ST7789_PTLAR = const(0x30)
 ST7789_VSCRDEF = const(0x33)
@@ -106,7 +119,10 @@ _ENCODE_PIXEL = ">H"
 _ENCODE_POS = ">HH"
 _DECODE_PIXEL = ">BBB"
 
-_BUFFER_SIZE = const(256)
+_I80_CHUNK = const(8192)  # DMA staging buffer size (bytes)
+_I80_TX_TIMEOUT_MS = const(100)  # Max wait for a staging buffer to drain
+_GLYPH_CACHE_BYTES = const(16384)  # Default glyph cache budget (bytes)
+_EXPAND_BYTES = const(4096)  # RGB565 rows expanded per write by blit_indexed
 
 _BIT7 = const(0x80)
 _BIT6 = const(0x40)
@@ -117,6 +133,12 @@ _BIT2 = const(0x04)
 _BIT1 = const(0x02)
 _BIT0 = const(0x01)
 
+# ESP32-S3 GPIO output set/clear registers (write 1 to set/clear a bit)
+_GPIO_OUT_W1TS = const(0x60004008)   # GPIO0-31
+_GPIO_OUT_W1TC = const(0x6000400C)
+_GPIO_OUT1_W1TS = const(0x60004014)  # GPIO32-48
+_GPIO_OUT1_W1TC = const(0x60004018)
+
 # Rotation tables (width, height, xstart, ystart)[rotation % 4]
 
 WIDTH_320 = [(240, 320,  0,  0),
@@ -164,6 +186,224 @@ def _encode_pixel(color):
     return struct.pack(_ENCODE_PIXEL, color)
 
 
+def _pin_id(pin):
+    """Return the GPIO number of a machine.Pin ("Pin(48)" / "Pin(GPIO48)")."""
+    digits = "".join(c for c in str(pin) if c.isdigit())
+    return int(digits) if digits else -1
+
+
+def _is_esp32s3():
+    try:
+        import os
+        return "ESP32S3" in os.uname().machine.replace("-", "")
+    except (ImportError, AttributeError):
+        return False
+
+
+def _bus_masks(data_ids, wr_id):
+    """
+    Build the set/clear mask table for the data bus.
+
+    Args:
+        data_ids (list): GPIO numbers of d7..d0, all in GPIO32-48
+        wr_id (int): GPIO number of the write strobe, in GPIO0-31
+
+    Returns:
+        array('I', 513): entry 2*b is the OUT1 set mask and entry 2*b+1 the
+        OUT1 clear mask that put byte b on the bus; entry 512 is the WR mask
+    """
+    bits = [1 << (gpio - 32) for gpio in data_ids]
+    bus = 0
+    for bit in bits:
+        bus |= bit
+    table = array("I", bytes(4 * 513))
+    for b in range(256):
+        on = 0
+        for i, bit in enumerate(bits):
+            if b & (0x80 >> i):
+                on |= bit
+        table[2 * b] = on
+        table[2 * b + 1] = bus & ~on
+    table[512] = 1 << wr_id
+    return table
+
+
+@micropython.viper
+def _bus_write(buf, n: int, table):
+    """Put n bytes of buf on the data bus, strobing WR (GPIO0-31) each byte."""
+    src = ptr8(buf)
+    masks = ptr32(table)
+    wr = masks[512]
+    out_set = ptr32(_GPIO_OUT1_W1TS)
+    out_clr = ptr32(_GPIO_OUT1_W1TC)
+    wr_set = ptr32(_GPIO_OUT_W1TS)
+    wr_clr = ptr32(_GPIO_OUT_W1TC)
+    i = 0
+    while i < n:
+        b = src[i] << 1
+        out_set[0] = masks[b]
+        out_clr[0] = masks[b + 1]
+        wr_clr[0] = wr
+        wr_set[0] = wr
+        i += 1
+
+
+@micropython.viper
+def _bus_fill(table, hi: int, lo: int, n: int):
+    """Send n pixels of the colour hi:lo; data lines set once if hi == lo."""
+    masks = ptr32(table)
+    wr = masks[512]
+    out_set = ptr32(_GPIO_OUT1_W1TS)
+    out_clr = ptr32(_GPIO_OUT1_W1TC)
+    wr_set = ptr32(_GPIO_OUT_W1TS)
+    wr_clr = ptr32(_GPIO_OUT_W1TC)
+    hi_set = masks[hi << 1]
+    hi_clr = masks[(hi << 1) + 1]
+    lo_set = masks[lo << 1]
+    lo_clr = masks[(lo << 1) + 1]
+    i = 0
+    if hi == lo:
+        out_set[0] = hi_set
+        out_clr[0] = hi_clr
+        n <<= 1
+        while i < n:
+            wr_clr[0] = wr
+            wr_set[0] = wr
+            i += 1
+        return
+    while i < n:
+        out_set[0] = hi_set
+        out_clr[0] = hi_clr
+        wr_clr[0] = wr
+        wr_set[0] = wr
+        out_set[0] = lo_set
+        out_clr[0] = lo_clr
+        wr_clr[0] = wr
+        wr_set[0] = wr
+        i += 1
+
+
+@micropython.viper
+def _pack_glyphs(glyphs, chars, buf, params):
+    """
+    Rasterise a run of 1-bit glyphs into an RGB565 buffer.
+
+    Args:
+        glyphs (bytes): font bitmap, row-major, width/8 bytes per row
+        chars (array('H')): glyph indexes of the run
+        buf (bytearray): output, count * width x height pixels
+        params (array('I')): fg, bg (byte-swapped), bytes per row, height,
+            count
+    """
+    p = ptr32(params)
+    fg = p[0]
+    bg = p[1]
+    bpr = p[2]
+    height = p[3]
+    count = p[4]
+    font = ptr8(glyphs)
+    idx = ptr16(chars)
+    dst = ptr16(buf)
+    glyph_size = bpr * height
+    stride = count * bpr * 8
+    c = 0
+    while c < count:
+        g = idx[c] * glyph_size
+        row = c * bpr * 8
+        y = 0
+        while y < height:
+            d = row
+            k = 0
+            while k < bpr:
+                byte = font[g]
+                g += 1
+                bit = 0x80
+                while bit:
+                    dst[d] = fg if byte & bit else bg
+                    d += 1
+                    bit >>= 1
+                k += 1
+            row += stride
+            y += 1
+        c += 1
+
+
+@micropython.viper
+def _copy_glyphs(glyphs, buf, params):
+    """
+    Copy pre-rendered RGB565 glyphs side by side into a text run buffer.
+
+    Args:
+        glyphs (list): count glyph buffers of width x height pixels
+        buf (bytearray): output, count * width x height pixels
+        params (array('I')): width, height, count
+    """
+    p = ptr32(params)
+    width = p[0]
+    height = p[1]
+    count = p[2]
+    dst = ptr16(buf)
+    stride = count * width
+    c = 0
+    while c < count:
+        src = ptr16(glyphs[c])
+        s = 0
+        row = c * width
+        y = 0
+        while y < height:
+            d = row
+            x = 0
+            while x < width:
+                dst[d] = src[s]
+                d += 1
+                s += 1
+                x += 1
+            row += stride
+            y += 1
+        c += 1
+
+
+@micropython.viper
+def _expand4(src, dst, lut, params):
+    """
+    Expand rows of 4-bit palette indexes into RGB565.
+
+    Args:
+        src (bytearray): indexes, two pixels per byte, high nibble first
+        dst (bytearray): output, width x rows pixels, big endian
+        lut (array('H', 512)): entries 2*b and 2*b+1 are the byte-swapped
+            colors of the two pixels of source byte b
+        params (array('I')): source offset, source stride (bytes), width,
+            rows
+    """
+    p = ptr32(params)
+    row = p[0]
+    stride = p[1]
+    width = p[2]
+    rows = p[3]
+    s = ptr8(src)
+    d = ptr16(dst)
+    t = ptr16(lut)
+    pairs = width >> 1
+    d_i = 0
+    y = 0
+    while y < rows:
+        s_i = row
+        k = 0
+        while k < pairs:
+            b = s[s_i] << 1
+            d[d_i] = t[b]
+            d[d_i + 1] = t[b + 1]
+            d_i += 2
+            s_i += 1
+            k += 1
+        if width & 1:
+            d[d_i] = t[s[s_i] << 1]
+            d_i += 1
+        row += stride
+        y += 1
+
+
 class ST7789():
     """
     ST7789 driver class
@@ -221,10 +461,23 @@ class ST7789():
         self.backlight = backlight
         self._rotation = rotation % 4
 
-        self.cs.on()
-        self.dc.on()
-        self.wr.on()
-        self.rd.on()
+        self._bus_table = None
+        self._init_bus()
+
+        # Text rasteriser work buffers (grown on demand)
+        self._text_buf = bytearray(0)
+        self._text_chars = array("H")
+        self._text_params = array("I", bytes(20))
+        self._text_glyphs = []
+
+        # Palette expansion work buffers (blit_indexed)
+        self._expand_buf = bytearray(0)
+        self._expand_params = array("I", bytes(16))
+
+        # Rendered glyphs, LRU order: (font, char, fg, bg) -> RGB565 buffer
+        self._glyphs = OrderedDict()
+        self._glyphs_bytes = 0
+        self._glyphs_budget = _GLYPH_CACHE_BYTES
 
         self.hard_reset()
         self.sleep_mode(False)
@@ -241,6 +494,22 @@ class ST7789():
         self._write(ST7789_DISPON)
         time.sleep_ms(125)
 
+    def _init_bus(self):
+        """Set the control lines idle and pick the bit-bang bus implementation."""
+        self.cs.on()
+        self.dc.on()
+        self.wr.on()
+        self.rd.on()
+
+        # Register-level bus: all data pins on GPIO32-48 and WR on GPIO0-31
+        # (T-Display-S3), otherwise fall back to Pin.value() per bit
+        data_ids = [_pin_id(p) for p in (self.d7, self.d6, self.d5, self.d4,
+                                         self.d3, self.d2, self.d1, self.d0)]
+        wr_id = _pin_id(self.wr)
+        if (_is_esp32s3() and 0 <= wr_id < 32
+                and all(32 <= gpio <= 48 for gpio in data_ids)):
+            self._bus_table = _bus_masks(data_ids, wr_id)
+
     def _write_byte(self, b):
         """Write to the display using 8 bit parallel mode. Note: this is not fast."""
         if b != self.last:
@@ -261,6 +530,16 @@ class ST7789():
         """Write to the display: command and/or data."""
         self.cs.off()
 
+        if self._bus_table is not None:
+            if command is not None:
+                self.dc.off()
+                _bus_write(bytes((command,)), 1, self._bus_table)
+            if data is not None:
+                self.dc.on()
+                _bus_write(data, len(data), self._bus_table)
+            self.cs.on()
+            return
+
         if command is not None:
             self.dc.off()
             for b in bytes([command]):
@@ -454,6 +733,47 @@ class ST7789():
         self._set_window(x, y, x + width - 1, y + height - 1)
         self._write(None, buffer)
 
+    def blit_indexed(self, buffer, x, y, width, height, lut, offset=0, stride=None):
+        """
+        Copy a 4-bit palette buffer to display, expanded to RGB565 on the fly.
+
+        Rows are expanded through the lookup table into a small work buffer
+        and streamed in one RAMWR window, so a 4-bit frame buffer never
+        needs an RGB565 copy.
+
+        Args:
+            buffer (bytearray): pixel indexes, two per byte, high nibble first
+            x (int): Top left corner x coordinate
+            y (int): Top left corner y coordinate
+            width (int): Width
+            height (int): Height
+            lut (array('H', 512)): byte -> two byte-swapped RGB565 colors
+            offset (int): byte offset of the first pixel in buffer
+            stride (int): bytes per buffer row, default (width + 1) // 2
+        """
+        if width <= 0 or height <= 0:
+            return
+        if stride is None:
+            stride = (width + 1) // 2
+        row_bytes = width * 2
+        band = max(1, _EXPAND_BYTES // row_bytes)
+        if len(self._expand_buf) < band * row_bytes:
+            self._expand_buf = bytearray(band * row_bytes)
+        out = memoryview(self._expand_buf)
+        params = self._expand_params
+        params[1] = stride
+        params[2] = width
+
+        self._set_window(x, y, x + width - 1, y + height - 1)
+        while height > 0:
+            n = min(band, height)
+            params[0] = offset
+            params[3] = n
+            _expand4(buffer, self._expand_buf, lut, params)
+            self._write(None, out[:n * row_bytes])
+            offset += n * stride
+            height -= n
+
     def rect(self, x, y, w, h, color):
         """
         Draw a rectangle at the given location, size and color.
@@ -483,19 +803,37 @@ class ST7789():
             color (int): 565 encoded color
         """
         self._set_window(x, y, x + width - 1, y + height - 1)
-        chunks, rest = divmod(width * height, _BUFFER_SIZE)
-        pixel = _encode_pixel(color)
         self.cs.off()
         self.dc.on()
-        if chunks:
-            data = pixel * _BUFFER_SIZE
-            for _ in range(chunks):
-                self._write(None, data)
-        if rest:
-            self._write(None, pixel * rest)
-
+        self._fill(width * height, color)
         self.cs.on()
 
+    def _fill(self, count, color):
+        """
+        Send count pixels of a solid color after RAMWR (CS low, DC high).
+
+        The data lines only change between the high and low byte; when both
+        bytes are equal (black, white, greys) only WR is strobed.
+        """
+        if count <= 0:
+            return
+        hi = color >> 8 & 0xff
+        lo = color & 0xff
+        if self._bus_table is not None:
+            _bus_fill(self._bus_table, hi, lo, count)
+            return
+
+        self._write_byte(hi)
+        if hi == lo:
+            for _ in range(2 * count - 1):
+                self.wr.value(0)
+                self.wr.value(1)
+            return
+        self._write_byte(lo)
+        for _ in range(count - 1):
+            self._write_byte(hi)
+            self._write_byte(lo)
+
 
     def fill(self, color):
         """
@@ -576,287 +914,133 @@ class ST7789():
         """
         self._write(ST7789_VSCSAD, struct.pack(">H", vssa))
 
-    def _text8(self, font, text, x0, y0, color=WHITE, background=BLACK):
+    def text(self, font, text, x0, y0, color=WHITE, background=BLACK):
         """
-        Internal method to write characters with width of 8 and
-        heights of 8 or 16.
+        Draw text on display in specified font and colors. 8 and 16 bit wide
+        fonts are supported.
 
-        Args:
-            font (module): font module to use
-            text (str): text to write
-            x0 (int): column to start drawing at
-            y0 (int): row to start drawing at
-            color (int): 565 encoded color to use for characters
-            background (int): 565 encoded color to use for background
-        """
-        for char in text:
-            ch = ord(char)
-            if (font.FIRST <= ch < font.LAST
-                    and x0+font.WIDTH <= self.width
-                    and y0+font.HEIGHT <= self.height):
-
-                if font.HEIGHT == 8:
-                    passes = 1
-                    size = 8
-                    each = 0
-                else:
-                    passes = 2
-                    size = 16
-                    each = 8
-
-                for line in range(passes):
-                    idx = (ch-font.FIRST)*size+(each*line)
-                    buffer = struct.pack(
-                        '>64H',
-                        color if font.FONT[idx] & _BIT7 else background,
-                        color if font.FONT[idx] & _BIT6 else background,
-                        color if font.FONT[idx] & _BIT5 else background,
-                        color if font.FONT[idx] & _BIT4 else background,
-                        color if font.FONT[idx] & _BIT3 else background,
-                        color if font.FONT[idx] & _BIT2 else background,
-                        color if font.FONT[idx] & _BIT1 else background,
-                        color if font.FONT[idx] & _BIT0 else background,
-                        color if font.FONT[idx+1] & _BIT7 else background,
-                        color if font.FONT[idx+1] & _BIT6 else background,
-                        color if font.FONT[idx+1] & _BIT5 else background,
-                        color if font.FONT[idx+1] & _BIT4 else background,
-                        color if font.FONT[idx+1] & _BIT3 else background,
-                        color if font.FONT[idx+1] & _BIT2 else background,
-                        color if font.FONT[idx+1] & _BIT1 else background,
-                        color if font.FONT[idx+1] & _BIT0 else background,
-                        color if font.FONT[idx+2] & _BIT7 else background,
-                        color if font.FONT[idx+2] & _BIT6 else background,
-                        color if font.FONT[idx+2] & _BIT5 else background,
-                        color if font.FONT[idx+2] & _BIT4 else background,
-                        color if font.FONT[idx+2] & _BIT3 else background,
-                        color if font.FONT[idx+2] & _BIT2 else background,
-                        color if font.FONT[idx+2] & _BIT1 else background,
-                        color if font.FONT[idx+2] & _BIT0 else background,
-                        color if font.FONT[idx+3] & _BIT7 else background,
-                        color if font.FONT[idx+3] & _BIT6 else background,
-                        color if font.FONT[idx+3] & _BIT5 else background,
-                        color if font.FONT[idx+3] & _BIT4 else background,
-                        color if font.FONT[idx+3] & _BIT3 else background,
-                        color if font.FONT[idx+3] & _BIT2 else background,
-                        color if font.FONT[idx+3] & _BIT1 else background,
-                        color if font.FONT[idx+3] & _BIT0 else background,
-                        color if font.FONT[idx+4] & _BIT7 else background,
-                        color if font.FONT[idx+4] & _BIT6 else background,
-                        color if font.FONT[idx+4] & _BIT5 else background,
-                        color if font.FONT[idx+4] & _BIT4 else background,
-                        color if font.FONT[idx+4] & _BIT3 else background,
-                        color if font.FONT[idx+4] & _BIT2 else background,
-                        color if font.FONT[idx+4] & _BIT1 else background,
-                        color if font.FONT[idx+4] & _BIT0 else background,
-                        color if font.FONT[idx+5] & _BIT7 else background,
-                        color if font.FONT[idx+5] & _BIT6 else background,
-                        color if font.FONT[idx+5] & _BIT5 else background,
-                        color if font.FONT[idx+5] & _BIT4 else background,
-                        color if font.FONT[idx+5] & _BIT3 else background,
-                        color if font.FONT[idx+5] & _BIT2 else background,
-                        color if font.FONT[idx+5] & _BIT1 else background,
-                        color if font.FONT[idx+5] & _BIT0 else background,
-                        color if font.FONT[idx+6] & _BIT7 else background,
-                        color if font.FONT[idx+6] & _BIT6 else background,
-                        color if font.FONT[idx+6] & _BIT5 else background,
-                        color if font.FONT[idx+6] & _BIT4 else background,
-                        color if font.FONT[idx+6] & _BIT3 else background,
-                        color if font.FONT[idx+6] & _BIT2 else background,
-                        color if font.FONT[idx+6] & _BIT1 else background,
-                        color if font.FONT[idx+6] & _BIT0 else background,
-                        color if font.FONT[idx+7] & _BIT7 else background,
-                        color if font.FONT[idx+7] & _BIT6 else background,
-                        color if font.FONT[idx+7] & _BIT5 else background,
-                        color if font.FONT[idx+7] & _BIT4 else background,
-                        color if font.FONT[idx+7] & _BIT3 else background,
-                        color if font.FONT[idx+7] & _BIT2 else background,
-                        color if font.FONT[idx+7] & _BIT1 else background,
-                        color if font.FONT[idx+7] & _BIT0 else background
-                    )
-                    self.blit_buffer(buffer, x0, y0+8*line, 8, 8)
-
-                x0 += 8
-
-    def _text16(self, font, text, x0, y0, color=WHITE, background=BLACK):
-        """
-        Internal method to draw characters with width of 16 and heights of 16
-        or 32.
+        The whole run is rasterised into one buffer and sent with a single
+        blit_buffer (one window set per call). Characters that would not fit
+        on the display are clipped; characters missing from the font are
+        drawn as blank cells.
 
         Args:
-            font (module): font module to use
+            font (module): font module to use.
             text (str): text to write
             x0 (int): column to start drawing at
             y0 (int): row to start drawing at
             color (int): 565 encoded color to use for characters
             background (int): 565 encoded color to use for background
         """
-        for char in text:
-            ch = ord(char)
-            if (font.FIRST <= ch < font.LAST
-                    and x0+font.WIDTH <= self.width
-                    and y0+font.HEIGHT <= self.height):
-
-                each = 16
-                if font.HEIGHT == 16:
-                    passes = 2
-                    size = 32
-                else:
-                    passes = 4
-                    size = 64
-
-                for line in range(passes):
-                    idx = (ch-font.FIRST)*size+(each*line)
-                    buffer = struct.pack(
-                        '>128H',
-                        color if font.FONT[idx] & _BIT7 else background,
-                        color if font.FONT[idx] & _BIT6 else background,
-                        color if font.FONT[idx] & _BIT5 else background,
-                        color if font.FONT[idx] & _BIT4 else background,
-                        color if font.FONT[idx] & _BIT3 else background,
-                        color if font.FONT[idx] & _BIT2 else background,
-                        color if font.FONT[idx] & _BIT1 else background,
-                        color if font.FONT[idx] & _BIT0 else background,
-                        color if font.FONT[idx+1] & _BIT7 else background,
-                        color if font.FONT[idx+1] & _BIT6 else background,
-                        color if font.FONT[idx+1] & _BIT5 else background,
-                        color if font.FONT[idx+1] & _BIT4 else background,
-                        color if font.FONT[idx+1] & _BIT3 else background,
-                        color if font.FONT[idx+1] & _BIT2 else background,
-                        color if font.FONT[idx+1] & _BIT1 else background,
-                        color if font.FONT[idx+1] & _BIT0 else background,
-                        color if font.FONT[idx+2] & _BIT7 else background,
-                        color if font.FONT[idx+2] & _BIT6 else background,
-                        color if font.FONT[idx+2] & _BIT5 else background,
-                        color if font.FONT[idx+2] & _BIT4 else background,
-                        color if font.FONT[idx+2] & _BIT3 else background,
-                        color if font.FONT[idx+2] & _BIT2 else background,
-                        color if font.FONT[idx+2] & _BIT1 else background,
-                        color if font.FONT[idx+2] & _BIT0 else background,
-                        color if font.FONT[idx+3] & _BIT7 else background,
-                        color if font.FONT[idx+3] & _BIT6 else background,
-                        color if font.FONT[idx+3] & _BIT5 else background,
-                        color if font.FONT[idx+3] & _BIT4 else background,
-                        color if font.FONT[idx+3] & _BIT3 else background,
-                        color if font.FONT[idx+3] & _BIT2 else background,
-                        color if font.FONT[idx+3] & _BIT1 else background,
-                        color if font.FONT[idx+3] & _BIT0 else background,
-                        color if font.FONT[idx+4] & _BIT7 else background,
-                        color if font.FONT[idx+4] & _BIT6 else background,
-                        color if font.FONT[idx+4] & _BIT5 else background,
-                        color if font.FONT[idx+4] & _BIT4 else background,
-                        color if font.FONT[idx+4] & _BIT3 else background,
-                        color if font.FONT[idx+4] & _BIT2 else background,
-                        color if font.FONT[idx+4] & _BIT1 else background,
-                        color if font.FONT[idx+4] & _BIT0 else background,
-                        color if font.FONT[idx+5] & _BIT7 else background,
-                        color if font.FONT[idx+5] & _BIT6 else background,
-                        color if font.FONT[idx+5] & _BIT5 else background,
-                        color if font.FONT[idx+5] & _BIT4 else background,
-                        color if font.FONT[idx+5] & _BIT3 else background,
-                        color if font.FONT[idx+5] & _BIT2 else background,
-                        color if font.FONT[idx+5] & _BIT1 else background,
-                        color if font.FONT[idx+5] & _BIT0 else background,
-                        color if font.FONT[idx+6] & _BIT7 else background,
-                        color if font.FONT[idx+6] & _BIT6 else background,
-                        color if font.FONT[idx+6] & _BIT5 else background,
-                        color if font.FONT[idx+6] & _BIT4 else background,
-                        color if font.FONT[idx+6] & _BIT3 else background,
-                        color if font.FONT[idx+6] & _BIT2 else background,
-                        color if font.FONT[idx+6] & _BIT1 else background,
-                        color if font.FONT[idx+6] & _BIT0 else background,
-                        color if font.FONT[idx+7] & _BIT7 else background,
-                        color if font.FONT[idx+7] & _BIT6 else background,
-                        color if font.FONT[idx+7] & _BIT5 else background,
-                        color if font.FONT[idx+7] & _BIT4 else background,
-                        color if font.FONT[idx+7] & _BIT3 else background,
-                        color if font.FONT[idx+7] & _BIT2 else background,
-                        color if font.FONT[idx+7] & _BIT1 else background,
-                        color if font.FONT[idx+7] & _BIT0 else background,
-                        color if font.FONT[idx+8] & _BIT7 else background,
-                        color if font.FONT[idx+8] & _BIT6 else background,
-                        color if font.FONT[idx+8] & _BIT5 else background,
-                        color if font.FONT[idx+8] & _BIT4 else background,
-                        color if font.FONT[idx+8] & _BIT3 else background,
-                        color if font.FONT[idx+8] & _BIT2 else background,
-                        color if font.FONT[idx+8] & _BIT1 else background,
-                        color if font.FONT[idx+8] & _BIT0 else background,
-                        color if font.FONT[idx+9] & _BIT7 else background,
-                        color if font.FONT[idx+9] & _BIT6 else background,
-                        color if font.FONT[idx+9] & _BIT5 else background,
-                        color if font.FONT[idx+9] & _BIT4 else background,
-                        color if font.FONT[idx+9] & _BIT3 else background,
-                        color if font.FONT[idx+9] & _BIT2 else background,
-                        color if font.FONT[idx+9] & _BIT1 else background,
-                        color if font.FONT[idx+9] & _BIT0 else background,
-                        color if font.FONT[idx+10] & _BIT7 else background,
-                        color if font.FONT[idx+10] & _BIT6 else background,
-                        color if font.FONT[idx+10] & _BIT5 else background,
-                        color if font.FONT[idx+10] & _BIT4 else background,
-                        color if font.FONT[idx+10] & _BIT3 else background,
-                        color if font.FONT[idx+10] & _BIT2 else background,
-                        color if font.FONT[idx+10] & _BIT1 else background,
-                        color if font.FONT[idx+10] & _BIT0 else background,
-                        color if font.FONT[idx+11] & _BIT7 else background,
-                        color if font.FONT[idx+11] & _BIT6 else background,
-                        color if font.FONT[idx+11] & _BIT5 else background,
-                        color if font.FONT[idx+11] & _BIT4 else background,
-                        color if font.FONT[idx+11] & _BIT3 else background,
-                        color if font.FONT[idx+11] & _BIT2 else background,
-                        color if font.FONT[idx+11] & _BIT1 else background,
-                        color if font.FONT[idx+11] & _BIT0 else background,
-                        color if font.FONT[idx+12] & _BIT7 else background,
-                        color if font.FONT[idx+12] & _BIT6 else background,
-                        color if font.FONT[idx+12] & _BIT5 else background,
-                        color if font.FONT[idx+12] & _BIT4 else background,
-                        color if font.FONT[idx+12] & _BIT3 else background,
-                        color if font.FONT[idx+12] & _BIT2 else background,
-                        color if font.FONT[idx+12] & _BIT1 else background,
-                        color if font.FONT[idx+12] & _BIT0 else background,
-                        color if font.FONT[idx+13] & _BIT7 else background,
-                        color if font.FONT[idx+13] & _BIT6 else background,
-                        color if font.FONT[idx+13] & _BIT5 else background,
-                        color if font.FONT[idx+13] & _BIT4 else background,
-                        color if font.FONT[idx+13] & _BIT3 else background,
-                        color if font.FONT[idx+13] & _BIT2 else background,
-                        color if font.FONT[idx+13] & _BIT1 else background,
-                        color if font.FONT[idx+13] & _BIT0 else background,
-                        color if font.FONT[idx+14] & _BIT7 else background,
-                        color if font.FONT[idx+14] & _BIT6 else background,
-                        color if font.FONT[idx+14] & _BIT5 else background,
-                        color if font.FONT[idx+14] & _BIT4 else background,
-                        color if font.FONT[idx+14] & _BIT3 else background,
-                        color if font.FONT[idx+14] & _BIT2 else background,
-                        color if font.FONT[idx+14] & _BIT1 else background,
-                        color if font.FONT[idx+14] & _BIT0 else background,
-                        color if font.FONT[idx+15] & _BIT7 else background,
-                        color if font.FONT[idx+15] & _BIT6 else background,
-                        color if font.FONT[idx+15] & _BIT5 else background,
-                        color if font.FONT[idx+15] & _BIT4 else background,
-                        color if font.FONT[idx+15] & _BIT3 else background,
-                        color if font.FONT[idx+15] & _BIT2 else background,
-                        color if font.FONT[idx+15] & _BIT1 else background,
-                        color if font.FONT[idx+15] & _BIT0 else background
-                    )
-                    self.blit_buffer(buffer, x0, y0+8*line, 16, 8)
-            x0 += font.WIDTH
+        count = min(len(text), (self.width - x0) // font.WIDTH)
+        if count <= 0 or x0 < 0 or y0 < 0 or y0 + font.HEIGHT > self.height:
+            return
+        buffer, width = self.text_buffer(font, text[:count], color, background)
+        self.blit_buffer(buffer, x0, y0, width, font.HEIGHT)
 
-    def text(self, font, text, x0, y0, color=WHITE, background=BLACK):
+    def text_buffer(self, font, text, color=WHITE, background=BLACK):
         """
-        Draw text on display in specified font and colors. 8 and 16 bit wide
-        fonts are supported.
+        Rasterise text without drawing it, e.g. for an off-screen canvas.
+
+        The buffer is reused by the next text call; copy it to keep it.
 
         Args:
             font (module): font module to use.
-            text (str): text to write
-            x0 (int): column to start drawing at
-            y0 (int): row to start drawing at
+            text (str): text to rasterise
             color (int): 565 encoded color to use for characters
             background (int): 565 encoded color to use for background
+
+        Returns:
+            (memoryview, int): RGB565 big endian pixels, width in pixels
+            (height is font.HEIGHT)
         """
-        if font.WIDTH == 8:
-            self._text8(font, text, x0, y0, color, background)
+        count = len(text)
+        if not count:
+            return memoryview(self._text_buf)[:0], 0
+        if self._glyphs_budget:
+            buffer = self._compose_text(font, text, count, color, background)
         else:
-            self._text16(font, text, x0, y0, color, background)
+            buffer = self._pack_text(font, text, count, color, background)
+        return buffer, count * font.WIDTH
+
+    def glyph_cache(self, budget):
+        """
+        Set the glyph cache budget and empty the cache.
+
+        Args:
+            budget (int): maximum bytes of cached glyphs, 0 disables the cache
+        """
+        self._glyphs = OrderedDict()
+        self._glyphs_bytes = 0
+        self._glyphs_budget = max(0, budget)
+
+    def _glyph(self, font, char, color, background):
+        """Return the RGB565 buffer of one glyph, from the cache if present."""
+        key = (font, char, color, background)
+        cache = self._glyphs
+        glyph = cache.pop(key, None)
+        if glyph is None:
+            glyph = bytes(self._pack_text(font, char, 1, color, background))
+            if len(glyph) > self._glyphs_budget:
+                return glyph
+            self._glyphs_bytes += len(glyph)
+            while self._glyphs_bytes > self._glyphs_budget:
+                self._glyphs_bytes -= len(cache.pop(next(iter(cache))))
+        cache[key] = glyph  # Most recently used at the end
+        return glyph
+
+    def _compose_text(self, font, text, count, color, background):
+        """
+        Assemble a text run from cached glyphs.
+
+        Returns:
+            memoryview: count * WIDTH x HEIGHT pixels, row-major, big endian
+        """
+        glyphs = self._text_glyphs
+        del glyphs[:]
+        for i in range(count):
+            glyphs.append(self._glyph(font, text[i], color, background))
+
+        size = count * font.WIDTH * font.HEIGHT * 2
+        if len(self._text_buf) < size:
+            self._text_buf = bytearray(size)
+        params = self._text_params
+        params[0] = font.WIDTH
+        params[1] = font.HEIGHT
+        params[2] = count
+        _copy_glyphs(glyphs, self._text_buf, params)
+        return memoryview(self._text_buf)[:size]
+
+    def _pack_text(self, font, text, count, color, background):
+        """
+        Rasterise the first count characters of text into an RGB565 buffer.
+
+        Returns:
+            memoryview: count * WIDTH x HEIGHT pixels, row-major, big endian
+        """
+        size = count * font.WIDTH * font.HEIGHT * 2
+        if len(self._text_buf) < size:
+            self._text_buf = bytearray(size)
+        if len(self._text_chars) < count:
+            self._text_chars = array("H", bytes(2 * count))
+
+        first = font.FIRST
+        last = font.LAST
+        blank = 32 - first if first <= 32 < last else 0
+        chars = self._text_chars
+        for i in range(count):
+            ch = ord(text[i])
+            chars[i] = ch - first if first <= ch < last else blank
+
+        # Colors byte-swapped: the buffer is written as little endian words
+        params = self._text_params
+        params[0] = (color & 0xff) << 8 | color >> 8
+        params[1] = (background & 0xff) << 8 | background >> 8
+        params[2] = font.WIDTH // 8
+        params[3] = font.HEIGHT
+        params[4] = count
+        _pack_glyphs(font.FONT, chars, self._text_buf, params)
+        return memoryview(self._text_buf)[:size]
 
     def bitmap(self, bitmap, x, y, index=0):
         """
@@ -967,4 +1151,127 @@ class ST7789():
             except ValueError:
                 pass
 
-        return width
\ No newline at end of file
+        return width
+
+class ST7789I80(ST7789):
+    """
+    ST7789 driver streaming through the ESP32-S3 LCD_CAM i80 peripheral.
+
+    Same constructor and drawing API as ST7789. Pixel data is copied into
+    two DMA-capable staging buffers used alternately, so the CPU fills one
+    while the peripheral sends the other. tx_color() only queues a
+    transfer: a buffer is refilled only after the bus has reported (via its
+    transfer-done callback) the last transfer queued from it. Requires the
+    native lcd_bus module; use ST7789I80.available() before constructing.
+
+    Args:
+        freq (int): i80 write clock in Hz
+        (other args as ST7789)
+    """
+    @staticmethod
+    def available():
+        """Return True if the native i80 bus module is present."""
+        return lcd_bus is not None
+
+    def __init__(self, d7, d6, d5, d4, d3, d2, d1, d0, wr, rd, width, height, reset=None, dc=None,
+                 cs=None, backlight=None, rotation=0, freq=20000000):
+        if lcd_bus is None:
+            raise RuntimeError("lcd_bus module not available")
+        if dc is None:
+            raise ValueError("dc pin is required.")
+
+        data = [_pin_id(p) for p in (d0, d1, d2, d3, d4, d5, d6, d7)]
+        self._bus = lcd_bus.I80Bus(
+            dc=_pin_id(dc), wr=_pin_id(wr),
+            cs=_pin_id(cs) if cs is not None else -1,
+            data0=data[0], data1=data[1], data2=data[2], data3=data[3],
+            data4=data[4], data5=data[5], data6=data[6], data7=data[7],
+            freq=freq)
+        # Bytes are sent as stored (big endian RGB565, as built by the driver)
+        self._bus.init(width, height, 16, _I80_CHUNK, False, 8, 8)
+        caps = lcd_bus.MEMORY_INTERNAL | lcd_bus.MEMORY_DMA
+        self._stage = [self._bus.allocate_framebuffer(_I80_CHUNK, caps),
+                       self._bus.allocate_framebuffer(_I80_CHUNK, caps)]
+        self._stage_idx = 0
+        # Transfers complete in queue order: a stage is free once the done
+        # count reaches the number of its last queued transfer
+        self._tx_queued = 0
+        self._tx_done_count = 0
+        self._stage_seq = [0, 0]
+        self._bus.register_callback(self._tx_done)
+        self._ram_cmd = -1  # RAMWR pending from _set_window, else RAMWRC
+        super().__init__(d7, d6, d5, d4, d3, d2, d1, d0, wr, rd, width, height,
+                         reset=reset, dc=dc, cs=cs, backlight=backlight,
+                         rotation=rotation)
+
+    def _init_bus(self):
+        """The i80 peripheral drives DC, WR, CS and the data lines: no GPIO setup."""
+
+    def _set_window(self, x0, y0, x1, y1):
+        """Set the address window; RAMWR is sent with the first pixel data."""
+        self._set_columns(x0, x1)
+        self._set_rows(y0, y1)
+        self._ram_cmd = ST7789_RAMWR
+
+    def _tx_done(self, *args):
+        """lcd_bus callback: one queued color transfer has completed."""
+        self._tx_done_count += 1
+
+    def _take_stage(self):
+        """Return the next staging buffer index once its DMA has drained."""
+        idx = self._stage_idx
+        self._stage_idx ^= 1
+        start = time.ticks_ms()
+        while self._tx_done_count < self._stage_seq[idx]:
+            if time.ticks_diff(time.ticks_ms(), start) > _I80_TX_TIMEOUT_MS:
+                # Lost callback: resynchronise rather than block drawing
+                self._tx_done_count = self._tx_queued
+                break
+            time.sleep_us(10)
+        return idx
+
+    def _tx_color(self, idx, data, last):
+        """Queue data from staging buffer idx, after RAMWR or RAMWRC."""
+        cmd = self._ram_cmd if self._ram_cmd >= 0 else ST7789_RAMWRC
+        self._ram_cmd = -1
+        self._tx_queued += 1
+        self._stage_seq[idx] = self._tx_queued
+        self._bus.tx_color(cmd, data, 0, 0, 0, 0, 0, last)
+
+    def _fill(self, count, color):
+        """Send count pixels of a solid color from one pre-filled buffer."""
+        idx = self._take_stage()
+        stage = memoryview(self._stage[idx])
+        size = count * 2
+        n = min(size, _I80_CHUNK)
+        stage[0] = color >> 8 & 0xff
+        stage[1] = color & 0xff
+        k = 2
+        while k < n:
+            c = min(k, n - k)
+            stage[k:k + c] = stage[:c]
+            k += c
+        pos = 0
+        while pos < size:
+            n = min(size - pos, _I80_CHUNK)
+            self._tx_color(idx, stage[:n], pos + n >= size)
+            pos += n
+
+    def _write(self, command=None, data=None):
+        """Write a command with parameters, or stream pixel data by DMA."""
+        if command is not None:
+            self._bus.tx_param(command, data)
+            return
+        if data is None:
+            return
+
+        src = memoryview(data)
+        size = len(src)
+        pos = 0
+        while pos < size:
+            n = min(size - pos, _I80_CHUNK)
+            idx = self._take_stage()
+            stage = self._stage[idx]
+            stage[:n] = src[pos:pos + n]
+            self._tx_color(idx, memoryview(stage)[:n], pos + n >= size)
+            pos += n
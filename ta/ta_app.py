@@ -1,8 +1,14 @@
 """
-Project: DTD - ta_app.py v2.2.0
+Project: DTD - ta_app.py v2.7.0
 Version avec support complet async pour ta_radio_433 v2.3.0
+v2.3.0 : statistiques DD à distance (STATQ) + écran de diagnostic (▲ long)
+v2.4.0 : arbitrage automatique des ID de DD en double
+v2.5.0 : message de statut envoyé à l'UI seulement s'il a changé
+v2.6.0 : rendu et envoi de l'affichage dans une tâche asyncio dédiée
+v2.7.0 : gestion d'énergie (ta_power) : atténuation, veille écran, fréquence CPU
 """
 
+import time
 import ta_config as config
 from ta_logger import get_logger
 
@@ -18,6 +24,8 @@ except ImportError:
 
 from ta_ui import UI
 from ta_radio_433 import Radio433 as Radio
+from ta_buttons import Buttons
+from ta_power import PowerManager
 
 # États depuis la config
 STATE_UNKNOWN = config.RADIO["STATE_UNKNOWN"]
@@ -40,6 +48,12 @@ class TaApp:
             logger.info("Hardware GT38: {}".format("OK" if hw_ok else "ERREUR"), "app")
         
         self.states = {dd_id: STATE_UNKNOWN for dd_id in config.RADIO["GROUP_IDS"]}
+        # Balayages consécutifs sans réponse (ID réellement libre ?)
+        self.silent_sweeps = {dd_id: 0 for dd_id in config.RADIO["GROUP_IDS"]}
+        
+        # Arbitrage des ID en double : échecs et prochaine tentative par ID
+        self.arb_failures = {}
+        self.arb_next = {}
         self.testing_id = None
         self.req_period = max(150, config.RADIO.get("POLL_PERIOD_MS", 1500))
         
@@ -52,10 +66,30 @@ class TaApp:
             except Exception as e:
                 logger.error("Erreur watchdog: {}".format(e), "app")
         
+        # Boutons
+        try:
+            self.buttons = Buttons()
+        except Exception as e:
+            logger.error("Erreur init boutons: {}".format(e), "app")
+            self.buttons = None
+        
+        # Énergie : rétroéclairage, veille écran et CPU selon l'activité
+        try:
+            self.power = PowerManager(self.ui.tft)
+        except Exception as e:
+            logger.error("Erreur init énergie: {}".format(e), "app")
+            self.power = None
+        
+        # Statistiques DD (STATQ), interrogées à basse priorité
+        self.dd_stats = {dd_id: None for dd_id in config.RADIO["GROUP_IDS"]}
+        self.diag_index = 0
+        self.diag_every = config.APP.get("DIAG_POLL_LOOPS", 20)
+        
         # Compteurs et stats
         self.loop_count = 0
         self.error_count = 0
         self.last_status_update = 0
+        self.last_status_msg = None
         
         # Message initial
         mode = "SIMULATION" if self.radio.simulate else "REEL"
@@ -72,6 +106,8 @@ class TaApp:
 
     def set_testing(self, dd_id):
         self.testing_id = dd_id
+        if self.power:
+            self.power.set_busy(dd_id is not None)
         try:
             if dd_id is None:
                 self.ui.progress(None)
@@ -105,6 +141,10 @@ class TaApp:
                 if stats.get("uart_errors", 0) > 0:
                     msg += " UErr:{}".format(stats["uart_errors"])
             
+            # Texte inchangé : rien à redessiner
+            if msg == self.last_status_msg:
+                return
+            self.last_status_msg = msg
             self.ui.status(msg)
             
         except Exception as e:
@@ -131,8 +171,8 @@ class TaApp:
                 self._update_status_message()
                 self.last_status_update = self.loop_count
             
-            # Rafraîchir dirty
-            if config.UI.get("DIRTY_TRACKING", True):
+            # Rafraîchir dirty (sauf si la tâche d'affichage s'en charge)
+            if config.UI.get("DIRTY_TRACKING", True) and not self.ui.deferred_flush:
                 self.ui.render_dirty()
             
             await asyncio.sleep_ms(0)
@@ -153,11 +193,17 @@ class TaApp:
             for st in statuses:
                 old_state = self.states.get(st.dd_id, STATE_UNKNOWN)
                 self.states[st.dd_id] = st.state
+                if st.state == STATE_UNKNOWN:
+                    self.silent_sweeps[st.dd_id] = self.silent_sweeps.get(st.dd_id, 0) + 1
+                else:
+                    self.silent_sweeps[st.dd_id] = 0
                 
                 # Logger les changements d'état
                 if old_state != st.state and st.state != STATE_UNKNOWN:
                     state_name = "PRESENT" if st.state == STATE_PRESENT else "ABSENT"
                     logger.info("DD{}: {}".format(st.dd_id, state_name), "app")
+                    if self.power:
+                        self.power.activity()
                 
                 # Laisser respirer asyncio entre chaque DD
                 await asyncio.sleep_ms(0)
@@ -180,6 +226,152 @@ class TaApp:
         except Exception as e:
             logger.error("_handle_testing erreur: {}".format(e), "app")
 
+    def _free_ids(self, dup):
+        """
+        ID libres pour l'arbitrage : uniquement des groupes que le TA
+        interroge lui-même (GROUP_IDS hors CHANNEL_MAP), muets depuis
+        FREE_AFTER_SWEEPS balayages. Un ID hors balayage rendrait le DD
+        réattribué invisible ; un groupe seulement inconnu peut être un DD
+        hors de portée pour l'instant et créerait un nouveau doublon.
+        """
+        arb_cfg = config.RADIO.get("ARBITRATION", {})
+        channel_map = config.RADIO.get("CHANNEL_MAP", {})
+        mapped = set(dd_id for dd_id, _ in channel_map.values())
+        sweeps = arb_cfg.get("FREE_AFTER_SWEEPS", 10)
+        return ["{:02d}".format(d) for d in config.RADIO["GROUP_IDS"]
+                if d not in channel_map and d not in mapped
+                and self.silent_sweeps.get(d, 0) >= sweeps
+                and "{:02d}".format(d) != dup]
+
+    async def _resolve_duplicates(self):
+        """
+        Lance un arbitrage pour chaque ID signalé en double. Après un
+        arbitrage incomplet, l'ID attend RETRY_MS (doublé à chaque échec)
+        avant le suivant, et il est abandonné après MAX_ATTEMPTS échecs :
+        le balayage des DD n'est jamais bloqué par des tours ARB répétés.
+        """
+        if not self.radio.dup_ids:
+            return
+        
+        arb_cfg = config.RADIO.get("ARBITRATION", {})
+        try:
+            for dup in sorted(self.radio.dup_ids):
+                due = self.arb_next.get(dup)
+                if due is not None and time.ticks_diff(time.ticks_ms(), due) < 0:
+                    continue
+                
+                self.ui.status("ID DD{} en double: arbitrage".format(dup))
+                reassigned = await self.radio.arbitrate(dup, self._free_ids(dup))
+                for uid, new_id in reassigned.items():
+                    # Le groupe était muet : il repart de zéro
+                    self.silent_sweeps[int(new_id)] = 0
+                    self.ui.status("DD{} -> nouvel ID {}".format(dup, new_id))
+                
+                if dup not in self.radio.dup_ids:
+                    self.arb_failures.pop(dup, None)
+                    self.arb_next.pop(dup, None)
+                    continue
+                
+                failures = self.arb_failures.get(dup, 0) + 1
+                if failures >= arb_cfg.get("MAX_ATTEMPTS", 4):
+                    # Un nouveau DUPID relancera l'arbitrage depuis zéro
+                    self.radio.dup_ids.discard(dup)
+                    self.arb_failures.pop(dup, None)
+                    self.arb_next.pop(dup, None)
+                    logger.error("Arbitrage DD{}: abandon après {} échecs".format(dup, failures), "app")
+                    self.ui.status("ID DD{} en double: non résolu".format(dup))
+                else:
+                    self.arb_failures[dup] = failures
+                    delay = arb_cfg.get("RETRY_MS", 30000) << (failures - 1)
+                    self.arb_next[dup] = time.ticks_add(time.ticks_ms(), delay)
+                    logger.warning("Arbitrage DD{} incomplet, nouvel essai dans {}s".format(
+                        dup, delay // 1000), "app")
+        except Exception as e:
+            logger.error("_resolve_duplicates erreur: {}".format(e), "app")
+
+    async def _poll_diagnostics(self):
+        """
+        Interroge les stats d'un DD (tour à tour) toutes les DIAG_POLL_LOOPS
+        boucles, hors test en cours : basse priorité par rapport au scan.
+        Écran de diagnostic ouvert : 4 fois plus souvent, jamais à chaque
+        boucle (chaque STATQ peut occuper la radio REPLY_TIMEOUT_MS).
+        """
+        if self.radio.simulate or self.testing_id:
+            return
+        every = max(1, self.diag_every // 4) if self.ui.diag_mode else self.diag_every
+        if (self.loop_count % every) != 0:
+            return
+        
+        try:
+            ids = config.RADIO["GROUP_IDS"]
+            dd_id = ids[self.diag_index % len(ids)]
+            self.diag_index += 1
+            
+            target = config.RADIO.get("CHANNEL_MAP", {}).get(dd_id)
+            result = await self.radio.query_stats("{:02d}".format(target[0] if target else dd_id))
+            if result:
+                self.dd_stats[dd_id] = result
+            
+            if self.ui.diag_mode:
+                self.ui.diagnostics(self.dd_stats)
+        except Exception as e:
+            logger.error("_poll_diagnostics erreur: {}".format(e), "app")
+
+    async def _button_task(self):
+        """
+        Tâche boutons : ▲ long = écran de diagnostic on/off
+        
+        Un appui qui sort l'écran de veille ne fait que le réveiller
+        """
+        waking = False
+        while True:
+            event = self.buttons.check()
+            pressed = self.buttons.is_pressed("up") or self.buttons.is_pressed("down")
+            if self.power and (pressed or event) and self.power.activity():
+                waking = True
+            if waking:
+                event = None
+                waking = pressed
+            if event == "up_long":
+                if self.ui.diag_mode:
+                    self.ui.close_diagnostics()
+                else:
+                    self.ui.diagnostics(self.dd_stats)
+            await asyncio.sleep_ms(30)
+
+    async def _display_task(self):
+        """
+        Rendu et envoi de l'affichage (ASYNC)
+        
+        Le rendu se fait en RAM ; l'envoi à l'écran est découpé en morceaux
+        de UI["FLUSH_CHUNK_BYTES"] avec un yield entre chaque, pour qu'un
+        ACK radio reçu pendant un rafraîchissement soit traité sans attendre
+        """
+        period = config.UI.get("REFRESH_RATE_MS", 100)
+        while True:
+            try:
+                # Écran en veille : l'état est retenu, rendu au réveil
+                if self.power and not self.power.display_on:
+                    await asyncio.sleep_ms(period)
+                    continue
+                if config.UI.get("DIRTY_TRACKING", True):
+                    self.ui.render_dirty()
+                for _ in self.ui.flush_steps():
+                    await asyncio.sleep_ms(0)
+            except Exception as e:
+                logger.error("_display_task erreur: {}".format(e), "app")
+                self.error_count += 1
+            await asyncio.sleep_ms(period)
+
+    async def _power_task(self):
+        """Tâche énergie : atténuation puis veille après inactivité"""
+        while True:
+            try:
+                self.power.tick()
+            except Exception as e:
+                logger.error("_power_task erreur: {}".format(e), "app")
+            await asyncio.sleep_ms(500)
+
     async def _print_stats(self):
         """Tâche périodique pour afficher les statistiques"""
         if not config.MAIN.get("DEBUG_MODE", False):
@@ -205,6 +397,11 @@ class TaApp:
                     radio_stats = self.radio.get_statistics()
                     logger.info("Radio: {}".format(radio_stats), "app")
                 
+                # Énergie
+                if self.power:
+                    logger.info("Énergie: {} (réveils: {})".format(
+                        self.power.state, self.power.wakeups), "app")
+                
                 # Stats logger
                 log_stats = logger.get_stats()
                 logger.info("Logs: {}".format(log_stats), "app")
@@ -220,6 +417,19 @@ class TaApp:
         if config.MAIN.get("DEBUG_MODE", False):
             asyncio.create_task(self._print_stats())
         
+        # Lancer tâche boutons
+        if self.buttons:
+            asyncio.create_task(self._button_task())
+        
+        # Lancer tâche énergie
+        if self.power:
+            asyncio.create_task(self._power_task())
+        
+        # Lancer tâche d'affichage (envoi du canevas par morceaux)
+        if config.UI.get("ASYNC_FLUSH", True) and self.ui.gfx is not self.ui.tft:
+            self.ui.deferred_flush = True
+            asyncio.create_task(self._display_task())
+        
         logger.info("BOUCLE: Entrée dans while True", "app")
         
         # Message initial
@@ -236,8 +446,10 @@ class TaApp:
                 
                 # Traitement principal (TOUT EST ASYNC)
                 await self._update_states()
+                await self._resolve_duplicates()
                 await self._refresh_ui()
                 await self._handle_testing()
+                await self._poll_diagnostics()
                 
                 self.loop_count += 1
                 
@@ -250,4 +462,4 @@ class TaApp:
                 self.ui.status("ERREUR: {}".format(str(e)[:30]))
                 await asyncio.sleep_ms(1000)
 
-logger.info("ta_app.py v2.2.0 chargé (full async support)", "app")
\ No newline at end of file
+logger.info("ta_app.py v2.7.0 chargé (full async support)", "app")
\ No newline at end of file
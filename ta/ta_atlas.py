@@ -0,0 +1,77 @@
+"""
+project : DTD
+Component : TA
+file: ta_atlas.py
+
+Atlas de sprites de l'interface (titre, labels DD), généré sur le PC par
+build_atlas.py et lu depuis la flash au démarrage : plus de rastérisation
+du titre et des labels à chaque boot.
+
+Format (little endian) :
+  en-tête   "DTDA", version (u8), nb couleurs (u8), nb sprites (u16),
+            tag (32 octets : ta_layout.atlas_tag, empreinte des groupes et
+            de la géométrie suivie du titre, pour détecter un atlas périmé)
+  palette   nb couleurs x u16 RGB565
+  index     nb sprites x (nom 8 octets, largeur u16, hauteur u16, offset u32)
+  données   4 bits par pixel (pixel pair dans le quartet haut), lignes
+            de (largeur + 1) // 2 octets
+
+v1.0.0 : 18.10.2026 --> première version (palette 16 couleurs, 4 bits/pixel)
+"""
+
+import struct
+
+__MOD_NAME__ = "ta_atlas.py"
+__VERSION__ = "1.0.0"
+
+MAGIC = b"DTDA"
+VERSION = 1
+MAX_COLORS = 16
+HEADER_FMT = "<4sBBH32s"
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+ENTRY_FMT = "<8sHHI"
+ENTRY_SIZE = struct.calcsize(ENTRY_FMT)
+
+
+def row_bytes(width):
+    """Octets par ligne d'un sprite 4 bits/pixel"""
+    return (width + 1) // 2
+
+
+class Atlas:
+    """Index d'un atlas ; les pixels sont lus dans le fichier à la demande"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: fichier atlas (OSError s'il manque, ValueError s'il est invalide)
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, n_colors, n_sprites, tag = struct.unpack(
+                HEADER_FMT, f.read(HEADER_SIZE))
+            if magic != MAGIC or version != VERSION or n_colors > MAX_COLORS:
+                raise ValueError("atlas invalide: {}".format(path))
+            self.tag = tag.rstrip(b"\0").decode()
+            self.palette = struct.unpack("<{}H".format(n_colors), f.read(2 * n_colors))
+            self.sprites = {}
+            for _ in range(n_sprites):
+                name, w, h, offset = struct.unpack(ENTRY_FMT, f.read(ENTRY_SIZE))
+                self.sprites[name.rstrip(b"\0").decode()] = (w, h, offset)
+
+    def size(self, name):
+        """(largeur, hauteur) du sprite, ou None s'il n'existe pas"""
+        entry = self.sprites.get(name)
+        return entry[:2] if entry else None
+
+    def read(self, name):
+        """Pixels 4 bits du sprite : (buffer, largeur, hauteur) ou None"""
+        entry = self.sprites.get(name)
+        if entry is None:
+            return None
+        w, h, offset = entry
+        buf = bytearray(row_bytes(w) * h)
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            f.readinto(buf)
+        return buf, w, h
@@ -0,0 +1,392 @@
+"""
+project : DTD
+Component : TA
+file: ta_canvas.py
+
+Canevas RGB565 hors écran + suivi des zones modifiées.
+Tout le dessin de ta_ui se fait en RAM ; flush() envoie les rectangles
+modifiés, fusionnés, avec le moins de blit_buffer possible.
+
+v1.0.0 : 18.10.2026 --> première version (framebuf RGB565, fusion des rectangles)
+v1.1.0 : 18.10.2026 --> shift_up() : défilement d'une bande de lignes en RAM
+v1.2.0 : 18.10.2026 --> flush_iter() : envoi par morceaux pour une tâche asyncio
+v1.3.0 : 18.10.2026 --> blit_indexed() : sprites 4 bits/pixel avec palette (atlas)
+v1.4.0 : 18.10.2026 --> IndexedCanvas : canevas 4 bits/pixel (27 Ko), palette
+                        étendue en RGB565 par le driver à l'envoi
+"""
+
+import framebuf
+from array import array
+
+__MOD_NAME__ = "ta_canvas.py"
+__VERSION__ = "1.4.0"
+
+# Coût d'une fenêtre CASET/RASET/RAMWR exprimé en pixels : deux zones
+# sont fusionnées si leur union ne coûte pas plus de pixels que ça en plus
+MERGE_SLACK_PX = 512
+# Au-delà, toutes les zones sont réunies en un seul rectangle englobant
+MAX_DIRTY_RECTS = 8
+# Tampon de recopie pour les zones qui ne couvrent pas toute la largeur
+SCRATCH_BYTES = 8192
+# Couleurs d'un canevas indexé (4 bits/pixel)
+PALETTE_SIZE = 16
+
+
+def swap565(color):
+    """Couleur RGB565 -> ordre des octets du canevas (big endian en RAM)"""
+    return ((color & 0xFF) << 8) | ((color >> 8) & 0xFF)
+
+
+def _area(r):
+    return (r[2] - r[0]) * (r[3] - r[1])
+
+
+class Canvas:
+    """Canevas RGB565 en RAM avec la même API de dessin que le driver"""
+
+    def __init__(self, tft, width, height):
+        """
+        Args:
+            tft: driver st7789s3 (blit_buffer, text_buffer)
+            width, height: taille de l'écran (après rotation)
+        """
+        self.tft = tft
+        self.width = width
+        self.height = height
+        self.stride = width * 2
+        self.buf = bytearray(width * height * 2)
+        self.fb = framebuf.FrameBuffer(self.buf, width, height, framebuf.RGB565)
+        self._scratch = bytearray(SCRATCH_BYTES)
+        self._dirty = []          # [x0, y0, x1, y1] (x1/y1 exclus)
+        self.flushes = 0          # Statistiques : blit_buffer envoyés
+
+    # ------------------------------------------------------------------
+    # Dessin (coordonnées écran, couleurs RGB565 comme le driver)
+    # ------------------------------------------------------------------
+    def _color(self, color):
+        """Couleur RGB565 -> valeur de pixel du framebuf"""
+        return swap565(color)
+
+    def fill(self, color):
+        self.fb.fill(self._color(color))
+        self.invalidate(0, 0, self.width, self.height)
+
+    def fill_rect(self, x, y, w, h, color):
+        self.fb.fill_rect(x, y, w, h, self._color(color))
+        self.invalidate(x, y, w, h)
+
+    def rect(self, x, y, w, h, color):
+        self.fb.rect(x, y, w, h, self._color(color))
+        self.invalidate(x, y, w, h)
+
+    def hline(self, x, y, length, color):
+        self.fb.hline(x, y, length, self._color(color))
+        self.invalidate(x, y, length, 1)
+
+    def vline(self, x, y, length, color):
+        self.fb.vline(x, y, length, self._color(color))
+        self.invalidate(x, y, 1, length)
+
+    def text(self, font, text, x, y, color, background, height=None):
+        """
+        Texte en police bitmap, rastérisé par le driver (cache de glyphes)
+        
+        height limite le nombre de lignes de pixels copiées (haut du texte)
+        """
+        max_chars = (self.width - x) // font.WIDTH
+        if max_chars <= 0 or not text:
+            return
+        buf, w = self.tft.text_buffer(font, text[:max_chars], color, background)
+        if not w:
+            return
+        h = font.HEIGHT if height is None else min(height, font.HEIGHT)
+        self.blit(buf, x, y, w, h)
+
+    def blit(self, buf, x, y, w, h):
+        """Copie un bloc RGB565 big endian (w x h) dans le canevas"""
+        self.fb.blit(framebuf.FrameBuffer(buf, w, h, framebuf.RGB565), x, y)
+        self.invalidate(x, y, w, h)
+
+    def blit_indexed(self, buf, x, y, w, h, palette):
+        """
+        Copie un sprite 4 bits/pixel (lignes de (w + 1) // 2 octets,
+        quartet haut en premier) à travers une palette RGB565
+
+        Args:
+            palette: couleurs RGB565 (16 au plus), indexées par les pixels
+        """
+        pal = bytearray(2 * len(palette))
+        pal_fb = framebuf.FrameBuffer(pal, len(palette), 1, framebuf.RGB565)
+        for i, color in enumerate(palette):
+            pal_fb.pixel(i, 0, swap565(color))
+        src = framebuf.FrameBuffer(buf, w, h, framebuf.GS4_HMSB, (w + 1) & ~1)
+        self.fb.blit(src, x, y, -1, pal_fb)
+        self.invalidate(x, y, w, h)
+
+    def shift_up(self, y, h, dy):
+        """
+        Fait défiler de dy lignes vers le haut la bande [y, y + h[ ;
+        les dy dernières lignes gardent leur ancien contenu
+        """
+        if dy <= 0 or dy >= h:
+            return
+        stride = self.stride
+        mv = memoryview(self.buf)
+        # Ligne par ligne : source et destination ne se chevauchent jamais
+        dst = y * stride
+        src = dst + dy * stride
+        for _ in range(h - dy):
+            mv[dst:dst + stride] = mv[src:src + stride]
+            dst += stride
+            src += stride
+        self.invalidate(0, y, self.width, h)
+
+    # ------------------------------------------------------------------
+    # Zones modifiées
+    # ------------------------------------------------------------------
+    def invalidate(self, x, y, w, h):
+        """Ajoute une zone modifiée, fusionnée avec ses voisines si rentable"""
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(self.width, x + w)
+        y1 = min(self.height, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        r = [x0, y0, x1, y1]
+        merged = True
+        while merged:
+            merged = False
+            for e in self._dirty:
+                u = [min(r[0], e[0]), min(r[1], e[1]), max(r[2], e[2]), max(r[3], e[3])]
+                if _area(u) <= _area(r) + _area(e) + MERGE_SLACK_PX:
+                    self._dirty.remove(e)
+                    r = u
+                    merged = True
+                    break
+        self._dirty.append(r)
+
+        if len(self._dirty) > MAX_DIRTY_RECTS:
+            d = self._dirty
+            self._dirty = [[min(e[0] for e in d), min(e[1] for e in d),
+                            max(e[2] for e in d), max(e[3] for e in d)]]
+
+    def is_dirty(self):
+        return bool(self._dirty)
+
+    def flush(self):
+        """Envoie toutes les zones modifiées à l'écran"""
+        for _ in self.flush_iter():
+            pass
+
+    def flush_iter(self, chunk_bytes=0):
+        """
+        Envoie les zones modifiées par morceaux (générateur)
+
+        Rend la main après chaque blit_buffer : l'appelant peut céder le
+        CPU entre deux morceaux (tâche asyncio d'affichage).
+
+        Args:
+            chunk_bytes: taille maximale d'un envoi, 0 = sans limite pour
+                les zones pleine largeur (un seul blit_buffer)
+        """
+        dirty = self._dirty
+        self._dirty = []
+        for r in dirty:
+            for _ in self._send(r[0], r[1], r[2] - r[0], r[3] - r[1], chunk_bytes):
+                yield
+
+    def _send(self, x, y, w, h, chunk_bytes):
+        stride = self.stride
+        mv = memoryview(self.buf)
+
+        # Pleine largeur : lignes contiguës, envoyées sans copie
+        if x == 0 and w == self.width:
+            band = h if not chunk_bytes else max(1, chunk_bytes // stride)
+            while h > 0:
+                n = min(band, h)
+                self.tft.blit_buffer(mv[y * stride:(y + n) * stride], 0, y, w, n)
+                self.flushes += 1
+                y += n
+                h -= n
+                yield
+            return
+
+        # Sinon recopie par bandes de lignes dans le tampon de travail
+        row_bytes = w * 2
+        limit = len(self._scratch)
+        if chunk_bytes:
+            limit = min(limit, chunk_bytes)
+        band = max(1, limit // row_bytes)
+        if row_bytes > len(self._scratch):
+            self._scratch = bytearray(row_bytes)
+        scratch = memoryview(self._scratch)
+        while h > 0:
+            n = min(band, h)
+            src = y * stride + x * 2
+            dst = 0
+            for _ in range(n):
+                scratch[dst:dst + row_bytes] = mv[src:src + row_bytes]
+                src += stride
+                dst += row_bytes
+            self.tft.blit_buffer(scratch[:dst], x, y, w, n)
+            self.flushes += 1
+            y += n
+            h -= n
+            yield
+
+
+class IndexedCanvas(Canvas):
+    """
+    Canevas 4 bits/pixel : chaque pixel est un index dans une palette de
+    16 couleurs au plus, étendue en RGB565 par le driver (blit_indexed)
+    au moment de l'envoi. Même API de dessin que Canvas, 4 fois moins de RAM.
+    """
+
+    def __init__(self, tft, width, height):
+        """
+        Args:
+            tft: driver st7789s3 (blit_indexed)
+            width, height: taille de l'écran (après rotation)
+        """
+        self.tft = tft
+        self.width = width
+        self.height = height
+        self.stride = (width + 1) // 2
+        self.buf = bytearray(self.stride * height)
+        self.fb = framebuf.FrameBuffer(self.buf, width, height, framebuf.GS4_HMSB,
+                                       self.stride * 2)
+        self._dirty = []
+        self.flushes = 0
+
+        # Palette remplie à la première utilisation de chaque couleur ;
+        # au-delà de PALETTE_SIZE, la couleur la plus proche est utilisée
+        self.palette = []
+        self._indexes = {}        # RGB565 -> index
+        self.palette_misses = 0   # Couleurs remplacées faute de place
+        # Table du driver : octet -> couleurs (octets inversés) de ses 2 pixels
+        self.lut = array("H", bytes(1024))
+        self._pal = framebuf.FrameBuffer(bytearray(PALETTE_SIZE // 2), PALETTE_SIZE, 1,
+                                         framebuf.GS4_HMSB)
+        self._glyph_fbs = {}      # (font, hauteur) -> (tampon, FrameBuffer)
+        self._color(0)            # Index 0 = noir : tampon neuf = écran noir
+
+    def _color(self, color):
+        index = self._indexes.get(color)
+        if index is None:
+            index = self._allocate(color)
+        return index
+
+    def _allocate(self, color):
+        if len(self.palette) < PALETTE_SIZE:
+            index = len(self.palette)
+            self.palette.append(color)
+            value = swap565(color)
+            for other in range(PALETTE_SIZE):
+                self.lut[(index << 5) | (other << 1)] = value       # pixel pair
+                self.lut[(other << 5) | (index << 1) | 1] = value   # pixel impair
+        else:
+            index = _nearest(self.palette, color)
+            self.palette_misses += 1
+        self._indexes[color] = index
+        return index
+
+    def text(self, font, text, x, y, color, background, height=None):
+        """
+        Texte en police bitmap, copié glyphe par glyphe depuis la font
+        (les glyphes RGB565 du driver ne servent pas ici)
+        """
+        max_chars = (self.width - x) // font.WIDTH
+        if max_chars <= 0 or not text:
+            return
+        h = font.HEIGHT if height is None else min(height, font.HEIGHT)
+        glyph, glyph_fb = self._glyph_fb(font, h)
+        pal = self._pal
+        pal.pixel(0, 0, self._color(background))
+        pal.pixel(1, 0, self._color(color))
+
+        size = font.WIDTH // 8 * font.HEIGHT
+        n = len(glyph)
+        first = font.FIRST
+        last = font.LAST
+        blank = 32 - first if first <= 32 < last else 0
+        data = memoryview(font.FONT)
+        cx = x
+        for ch in text[:max_chars]:
+            code = ord(ch)
+            offset = ((code - first) if first <= code < last else blank) * size
+            glyph[:] = data[offset:offset + n]
+            self.fb.blit(glyph_fb, cx, y, -1, pal)
+            cx += font.WIDTH
+        self.invalidate(x, y, cx - x, h)
+
+    def _glyph_fb(self, font, height):
+        key = (font, height)
+        entry = self._glyph_fbs.get(key)
+        if entry is None:
+            glyph = bytearray(font.WIDTH // 8 * height)
+            entry = (glyph, framebuf.FrameBuffer(glyph, font.WIDTH, height,
+                                                 framebuf.MONO_HLSB))
+            self._glyph_fbs[key] = entry
+        return entry
+
+    def blit(self, buf, x, y, w, h):
+        """
+        Copie un bloc RGB565 big endian (w x h) : chaque pixel prend l'index
+        de sa couleur (la plus proche si la palette est pleine). Lent,
+        pixel par pixel : réservé aux petits blocs
+        """
+        fb = self.fb
+        last = -1
+        index = 0
+        i = 0
+        for row in range(y, y + h):
+            for col in range(x, x + w):
+                color = buf[i] << 8 | buf[i + 1]
+                if color != last:
+                    last = color
+                    index = self._color(color)
+                fb.pixel(col, row, index)
+                i += 2
+        self.invalidate(x, y, w, h)
+
+    def blit_indexed(self, buf, x, y, w, h, palette):
+        """Copie un sprite 4 bits/pixel en traduisant sa palette"""
+        pal = self._pal
+        for i, color in enumerate(palette):
+            pal.pixel(i, 0, self._color(color))
+        src = framebuf.FrameBuffer(buf, w, h, framebuf.GS4_HMSB, (w + 1) & ~1)
+        self.fb.blit(src, x, y, -1, pal)
+        self.invalidate(x, y, w, h)
+
+    def invalidate(self, x, y, w, h):
+        # Zones alignées sur un octet (2 pixels) : l'envoi part d'un pixel pair
+        x1 = (x + w + 1) & ~1
+        x &= ~1
+        super().invalidate(x, y, x1 - x, h)
+
+    def _send(self, x, y, w, h, chunk_bytes):
+        band = h if not chunk_bytes else max(1, chunk_bytes // (w * 2))
+        while h > 0:
+            n = min(band, h)
+            self.tft.blit_indexed(self.buf, x, y, w, n, self.lut,
+                                  y * self.stride + x // 2, self.stride)
+            self.flushes += 1
+            y += n
+            h -= n
+            yield
+
+
+def _nearest(palette, color):
+    """Index de la couleur de la palette la plus proche (distance RGB565)"""
+    r = color >> 11
+    g = (color >> 5) & 0x3F
+    b = color & 0x1F
+    best = 0
+    best_d = -1
+    for i, c in enumerate(palette):
+        d = (2 * ((c >> 11) - r)) ** 2 + ((c >> 5 & 0x3F) - g) ** 2 + (2 * ((c & 0x1F) - b)) ** 2
+        if best_d < 0 or d < best_d:
+            best = i
+            best_d = d
+    return best
@@ -103,12 +103,19 @@ UI = {
     "HEIGHT": 170,          # Hauteur en mode paysage
     "ROTATION": 1,          # Rotation (1 ou 3 pour paysage)
     "DIRTY_TRACKING": True, # Activer le suivi des modifications
+    "GLYPH_CACHE_BYTES": 16384,  # Cache LRU des glyphes rendus (0 = désactivé)
+    "FRAMEBUFFER": True,    # Dessin dans un canevas RAM, envoyé par zones
+    "FRAMEBUFFER_MODE": "palette",  # "palette" : 4 bits/pixel (27 Ko), "rgb565" : 108 Ko
+    "ASYNC_FLUSH": True,    # Envoi du canevas par une tâche asyncio dédiée
+    "FLUSH_CHUNK_BYTES": 4096,  # Taille d'un envoi entre deux yields
+    "ATLAS_FILE": "ui_atlas.bin",  # Sprites titre/labels (build_atlas.py), "" = aucun
     
     # Hauteurs des zones (en pixels)
     "ZONE_TITLE_HEIGHT": 40,      # Titre en haut
     "ZONE_BARS_HEIGHT": 40,       # Barres de statut DD
     "ZONE_LABELS_HEIGHT": 18,     # Noms des DD
     "ZONE_LOG_HEIGHT": 60,        # Zone de log en bas (augmentée)
+    "LOG_LINES": 3,               # Lignes de log visibles (14 px par ligne)
     
     # Marges et espacements
     "MARGIN_LEFT": 10,
@@ -156,6 +163,11 @@ RADIO = {
     # Groupes testés
     "GROUP_IDS": [1, 2, 3, 4, 5,],
 
+    # DD multi-canaux : group_id -> (ID du DD, n° de canal 0-7).
+    # Les groupes d'un même DD sont lus par un seul POLL (réponse ACKM).
+    # ex: {6: (6, 0), 7: (6, 1), 8: (6, 2)}
+    "CHANNEL_MAP": {},
+
     # Temporisations (CORRIGÉES pour fiabilité)
     "POLL_PERIOD_MS": 1100,      # 800ms (était 500ms - éviter saturation)
     "REPLY_TIMEOUT_MS": 1000,    # 500ms (était 250ms - GT38 peut être lent)
@@ -195,19 +207,43 @@ RADIO = {
         "DEFAULT_DEVICE_IDS": [0x1FA1, 0x2FB2, 0x3FC3, 0x4FD4, 0x5FE5],
     },
     
+    # Mise à jour OTA des DD (blocs base64 sur le lien 433 MHz)
+    "OTA": {
+        "BLOCK_SIZE": 96,          # Octets utiles par bloc (128 car. base64)
+        "WINDOW": 8,               # Blocs envoyés avant ACK (fenêtre <= UART_RXBUF du DD)
+        "BLOCK_GAP_MS": 10,        # Pause entre blocs (tampon GT38)
+        "ACK_TIMEOUT_MS": 3000,    # Attente OTAR/OTAK (> fenêtre à 9600 bauds, ~1,3 s)
+        "END_TIMEOUT_MS": 5000,    # Attente OTAD (calcul SHA-256 sur DD)
+        "MAX_RETRIES": 5,          # Fenêtres retransmises sans progrès
+    },
+
+    # Arbitrage des ID en double (ARB -> ARBR avec back-off aléatoire)
+    "ARBITRATION": {
+        "ROUNDS": 3,               # Tours ARB (rattrape les collisions)
+        "WINDOW_MS": 700,          # > ARB_SLOTS * ARB_SLOT_MS côté DD
+        "RETRY_MS": 30000,         # Attente après un arbitrage incomplet (doublée à chaque échec)
+        "MAX_ATTEMPTS": 4,         # Échecs avant abandon (jusqu'au prochain DUPID)
+        "FREE_AFTER_SWEEPS": 10,   # Groupe muet depuis N balayages = ID libre
+    },
+
     # Statistiques
     "STATS_ENABLED": True,
 }
 
 APP = {
     "HEARTBEAT_MS": 750,
-    "AUTO_BRIGHTNESS": 100,
+    "DIAG_POLL_LOOPS": 20,      # Requête STATQ d'un DD toutes les N boucles (basse priorité)
+    "AUTO_BRIGHTNESS": 100,     # Luminosité du rétroéclairage en activité (%)
     
-    # Gestion d'énergie
+    # Gestion d'énergie (ta_power)
     "POWER": {
-        "SLEEP_ENABLED": False,           # Active mode veille
+        "SLEEP_ENABLED": False,           # Active mode veille (écran éteint : à choisir explicitement)
         "SLEEP_TIMEOUT_MS": 60000,        # Délai avant veille (1 min)
         "SLEEP_DURATION_MS": 5000,        # Durée du sleep (5s)
+        "DIM_TIMEOUT_MS": 20000,          # Délai avant atténuation (20s)
+        "DIM_BRIGHTNESS": 15,             # Luminosité atténuée (%)
+        "BACKLIGHT_PWM_FREQ": 1000,       # Fréquence PWM du rétroéclairage (Hz)
+        "FREQ_SWITCHING": True,           # machine.freq selon l'activité
         "CPU_FREQ_NORMAL": 160000000,     # 160MHz normal
         "CPU_FREQ_HIGH": 240000000,       # 240MHz performance
         "CPU_FREQ_LOW": 80000000,         # 80MHz économie
@@ -284,6 +320,14 @@ class ConfigValidator:
             errors.append("Radio: Trop de GROUP_IDS ({}, max 10)".format(
                 len(RADIO["GROUP_IDS"])))
         
+        # Vérifier le mappage des canaux multi-canaux
+        for gid, target in RADIO.get("CHANNEL_MAP", {}).items():
+            if gid not in RADIO["GROUP_IDS"]:
+                errors.append("Radio: CHANNEL_MAP groupe {} absent de GROUP_IDS".format(gid))
+            if not 0 <= target[1] < 8:
+                errors.append("Radio: CHANNEL_MAP canal invalide pour groupe {} ({})".format(
+                    gid, target[1]))
+        
         # Vérifier dimensions écran
         disp = HARDWARE["DISPLAY"]
         if disp["WIDTH"] <= 0 or disp["HEIGHT"] <= 0:
@@ -0,0 +1,68 @@
+"""
+project : DTD
+Component : TA
+file: ta_layout.py
+
+Géométrie de l'écran, partagée par ta_ui (sur la carte) et build_atlas.py
+(sur le PC). Calcul pur : aucun import matériel.
+
+v1.0.0 : 18.10.2026 --> barres DD, labels et titre
+v1.1.0 : 19.10.2026 --> tag d'atlas (titre + empreinte de la géométrie)
+"""
+
+from binascii import crc32
+
+__MOD_NAME__ = "ta_layout.py"
+__VERSION__ = "1.1.0"
+
+MIN_BAR_WIDTH = 8    # En dessous, les groupes suivants ne sont pas affichés
+LABEL_CHAR_W = 8     # Largeur d'un caractère des labels (font 8x16)
+TITLE_CHAR_W = 16    # Largeur d'un caractère du titre (font 16x32)
+
+
+def group_layout(width, margin_left, margin_right, bar_spacing, count):
+    """
+    Répartit count barres sur la largeur utile
+
+    Returns:
+        (n, bar_width, xs, labels) : nombre de barres affichables, largeur
+        commune, X de chaque barre et texte de chaque label
+    """
+    available_width = width - margin_left - margin_right
+
+    # Nombre de barres affichables (largeur minimale par barre)
+    n = count
+    while n > 1 and (available_width - bar_spacing * (n - 1)) // n < MIN_BAR_WIDTH:
+        n -= 1
+    bar_width = (available_width - bar_spacing * (n - 1)) // max(1, n)
+
+    # "DD10" ne tient pas dans une barre étroite : numéros seuls
+    label_fmt = "DD{}"
+    if len(label_fmt.format(n)) * LABEL_CHAR_W > bar_width:
+        label_fmt = "{}"
+
+    xs = [margin_left + i * (bar_width + bar_spacing) for i in range(n)]
+    labels = [label_fmt.format(i + 1) for i in range(n)]
+    return n, bar_width, xs, labels
+
+
+def title_text(config):
+    """Texte du bandeau de titre : nom et version de l'application"""
+    return "{} v{}".format(getattr(config, "APP_NAME", "DTD"),
+                           getattr(config, "APP_VERSION", "1.0.0"))
+
+
+def title_x(width, text):
+    """X du titre centré (font 16 px)"""
+    return (width - len(text) * TITLE_CHAR_W) // 2
+
+
+def atlas_tag(title, width, title_h, margin_left, margin_right, bar_spacing, group_ids):
+    """
+    Tag d'un atlas : crc32 de la géométrie et des groupes suivi du titre,
+    tronqué aux 32 octets de l'en-tête. Un atlas généré pour d'autres
+    GROUP_IDS, marges ou dimensions ne correspond plus.
+    """
+    key = "{}|{}|{}|{}|{}|{}|{}".format(title, width, title_h, margin_left,
+                                        margin_right, bar_spacing, list(group_ids))
+    return "{:08x} {}".format(crc32(key.encode()) & 0xFFFFFFFF, title)[:32]
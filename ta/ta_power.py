@@ -0,0 +1,191 @@
+"""
+project : DTD
+Component : TA
+file: ta_power.py
+
+Gestion d'énergie selon l'activité : rétroéclairage PWM, veille de l'écran
+et fréquence CPU.
+
+  ACTIF  rétroéclairage AUTO_BRIGHTNESS %, CPU_FREQ_NORMAL (CPU_FREQ_HIGH
+         pendant un test DD)
+  ATTÉNUÉ  après DIM_TIMEOUT_MS sans activité : DIM_BRIGHTNESS %, CPU_FREQ_LOW
+  VEILLE   après SLEEP_TIMEOUT_MS, seulement si SLEEP_ENABLED (désactivé
+           par défaut : terminal de surveillance) : rétroéclairage éteint,
+           ST7789 en sleep_mode(True), CPU_FREQ_LOW
+
+Un bouton ou un changement d'état d'un DD ramène immédiatement en ACTIF.
+
+v1.0.0 : 18.10.2026 --> première version (PWM, veille ST7789, machine.freq)
+"""
+
+import time
+import ta_config as config
+from ta_logger import get_logger
+
+try:
+    import machine
+except ImportError:
+    machine = None
+
+logger = get_logger()
+
+__MOD_NAME__ = "ta_power.py"
+__VERSION__ = "1.0.0"
+
+logger.info("{} version {} du {}".format(__MOD_NAME__, __VERSION__, config.MAIN["VERSION_DATE"]), "power")
+
+# États
+ACTIVE = "active"
+DIMMED = "dimmed"
+SLEEPING = "sleeping"
+
+
+class PowerManager:
+    """
+    Rétroéclairage, veille écran et fréquence CPU pilotés par l'activité.
+
+    Usage:
+        power = PowerManager(ui.tft)
+
+        power.activity()        # bouton, changement d'état DD
+        power.set_busy(True)    # test DD en cours : CPU rapide, pas de veille
+        power.tick()            # périodiquement (tâche asyncio)
+    """
+
+    def __init__(self, tft=None):
+        """
+        Args:
+            tft: driver st7789s3 (sleep_mode, backlight) ou None
+        """
+        cfg = config.APP.get("POWER", {})
+        self.tft = tft
+        self.brightness = max(1, min(100, config.APP.get("AUTO_BRIGHTNESS", 100)))
+        self.dim_brightness = max(0, min(self.brightness, cfg.get("DIM_BRIGHTNESS", 15)))
+        self.dim_ms = cfg.get("DIM_TIMEOUT_MS", 20000)
+        self.sleep_enabled = cfg.get("SLEEP_ENABLED", False)
+        self.sleep_ms = max(self.dim_ms, cfg.get("SLEEP_TIMEOUT_MS", 60000))
+        self.freq = {
+            "low": cfg.get("CPU_FREQ_LOW", 80000000),
+            "normal": cfg.get("CPU_FREQ_NORMAL", 160000000),
+            "high": cfg.get("CPU_FREQ_HIGH", 240000000),
+        }
+        self.freq_enabled = cfg.get("FREQ_SWITCHING", True) and machine is not None
+
+        self.state = ACTIVE
+        self.busy = False
+        self.last_activity = time.ticks_ms()
+        self._freq = None
+        self.wakeups = 0          # Statistiques : réveils de l'écran
+
+        # Rétroéclairage : PWM sur la broche du driver, sinon tout ou rien
+        self._backlight = getattr(tft, "backlight", None)
+        self._pwm = None
+        if self._backlight is not None and machine is not None:
+            try:
+                self._pwm = machine.PWM(self._backlight, freq=cfg.get("BACKLIGHT_PWM_FREQ", 1000))
+            except Exception as e:
+                logger.warning("PWM rétroéclairage indisponible: {}".format(e), "power")
+
+        self._apply()
+        logger.info("Énergie: luminosité {}%/{}%, atténuation {}s, veille {}".format(
+            self.brightness, self.dim_brightness, self.dim_ms // 1000,
+            "{}s".format(self.sleep_ms // 1000) if self.sleep_enabled else "non"), "power")
+
+    @property
+    def display_on(self):
+        """False pendant la veille : inutile de rendre ou d'envoyer l'écran"""
+        return self.state != SLEEPING
+
+    def activity(self):
+        """
+        Signale une activité (bouton, changement d'état) : retour immédiat
+        en ACTIF
+
+        Returns:
+            bool: True si l'écran sortait de veille (l'appui ne sert qu'à réveiller)
+        """
+        self.last_activity = time.ticks_ms()
+        if self.state == ACTIVE:
+            return False
+        was_sleeping = self.state == SLEEPING
+        self._set_state(ACTIVE)
+        return was_sleeping
+
+    def set_busy(self, busy):
+        """
+        Test DD en cours : CPU_FREQ_HIGH et écran allumé tant qu'il dure
+
+        Args:
+            busy: True au début du test, False à la fin
+        """
+        busy = bool(busy)
+        if busy == self.busy:
+            return
+        self.busy = busy
+        if busy:
+            self.activity()
+        self._apply_freq()
+
+    def tick(self):
+        """Passe en ATTÉNUÉ puis en VEILLE selon le temps sans activité"""
+        if self.busy:
+            return
+        idle = time.ticks_diff(time.ticks_ms(), self.last_activity)
+        if self.sleep_enabled and idle >= self.sleep_ms:
+            target = SLEEPING
+        elif idle >= self.dim_ms:
+            target = DIMMED
+        else:
+            target = ACTIVE
+        if target != self.state:
+            self._set_state(target)
+
+    def _set_state(self, state):
+        previous = self.state
+        self.state = state
+        if previous == SLEEPING:
+            self.wakeups += 1
+        logger.debug("Énergie: {} -> {}".format(previous, state), "power")
+        self._apply(previous)
+
+    def _apply(self, previous=None):
+        """Applique l'état courant : veille écran, rétroéclairage, CPU"""
+        if self.tft is not None and hasattr(self.tft, "sleep_mode"):
+            try:
+                if self.state == SLEEPING:
+                    self._set_backlight(0)
+                    self.tft.sleep_mode(True)
+                elif previous == SLEEPING:
+                    self.tft.sleep_mode(False)
+            except Exception as e:
+                logger.error("Erreur veille écran: {}".format(e), "power")
+
+        if self.state == ACTIVE:
+            self._set_backlight(self.brightness)
+        elif self.state == DIMMED:
+            self._set_backlight(self.dim_brightness)
+        self._apply_freq()
+
+    def _set_backlight(self, percent):
+        if self._pwm is not None:
+            self._pwm.duty_u16(percent * 65535 // 100)
+        elif self._backlight is not None:
+            self._backlight.value(1 if percent else 0)
+
+    def _apply_freq(self):
+        if not self.freq_enabled:
+            return
+        if self.busy:
+            freq = self.freq["high"]
+        elif self.state == ACTIVE:
+            freq = self.freq["normal"]
+        else:
+            freq = self.freq["low"]
+        if freq == self._freq:
+            return
+        try:
+            machine.freq(freq)
+            self._freq = freq
+        except Exception as e:
+            logger.error("Erreur machine.freq({}): {}".format(freq, e), "power")
+            self.freq_enabled = False
@@ -1,5 +1,22 @@
-# ta_radio_433.py - Module radio 433MHz pour GT38 (v2.4.0 - Corrections UART)
-# Version : 2.4.0 - Corrections majeures communication UART
+# ta_radio_433.py - Module radio 433MHz pour GT38 (v2.10.0 - ID en double)
+# Version : 2.10.0 - Détection et arbitrage des ID en double
+# Changelog v2.10.0:
+#   - Trames DUPID relevées (poll et vidage buffer) -> dup_ids
+#   - arbitrate(): tour ARB/ARBR puis SETIDU pour réattribuer les doublons
+# Changelog v2.9.0:
+#   - Trame STATS v2 : compteurs, uptime, heap, cause reset, premier ACK
+#   - Temps par étape : fenêtre depuis la trame STATS précédente
+# Changelog v2.8.0:
+#   - query_stats(): requête STATQ, décode la trame STATS (temps par étape)
+# Changelog v2.7.0:
+#   - Réponse ACKM:<id>:<n>:<masque> d'un DD multi-canaux
+#   - poll_status(): un seul POLL par DD, canaux répartis via CHANNEL_MAP
+# Changelog v2.6.0:
+#   - ota_update(): envoi d'un firmware DD par blocs CRC32, ACK fenêtrés,
+#     reprise (OTAR) et go-back-N (OTAK)
+# Changelog v2.5.0:
+#   - history(): requête HISTQ, reconstruit les transitions d'état d'un DD
+#     (transitions numérotées par le DD, reprise par numéro)
 # Changelog v2.4.0:
 #   - Timeout UART augmenté à 100ms (était 10ms)
 #   - Buffer UART augmenté à 512 bytes (était 256)
@@ -10,7 +27,10 @@
 #   - Utilisation cohérente de la configuration
 
 from machine import Pin, UART
+import struct
 import time
+from binascii import b2a_base64, crc32, hexlify, unhexlify
+from hashlib import sha256
 
 # Import asyncio
 try:
@@ -18,6 +38,16 @@ try:
 except ImportError:
     import asyncio
 
+# Trames STATS du DD (dd_main.py, STATS_FMT) par version : format, champs
+DD_STATS_FORMATS = {
+    1: ("<BI3I3I", ("version", "n")),
+    2: ("<BIIIHHIIIIBII3I3I", ("version", "loop_count", "ok_count", "nok_count",
+                               "setid_ok", "setid_err", "min_response_us",
+                               "max_response_us", "uptime_s", "mem_free",
+                               "reset_cause", "first_ack_ms", "n")),
+}
+DD_STAGE_NAMES = ("parse", "reply", "total")
+
 class Radio433:
     """Gestion communication radio 433MHz via GT38 - VERSION ASYNC CORRIGÉE"""
     
@@ -42,7 +72,9 @@ class Radio433:
             "uart_errors": 0,
             "blocked_calls": 0,
             "flushed_bytes": 0,
-            "parse_errors": 0
+            "parse_errors": 0,
+            "dupid_count": 0,
+            "arbitrations": 0
         }
         
         # Hardware
@@ -50,6 +82,10 @@ class Radio433:
         self.pin_set = None
         self.uart_config = None
         self.uart_broken = False
+        self._rx_lines = bytearray()
+        
+        # ID signalés en double par les DD (trames DUPID)
+        self.dup_ids = set()
         
         if not self.simulate:
             self._init_hardware()
@@ -180,6 +216,7 @@ class Radio433:
             data = await self._async_uart_read(bytes_avail)
             if data:
                 flushed_bytes += len(data)
+                self._scan_dupid(data)
             
             await asyncio.sleep_ms(2)
         
@@ -189,16 +226,65 @@ class Radio433:
         
         return flushed_bytes
     
+    def _scan_dupid(self, data):
+        """Relève les trames DUPID:<id>:<uid> présentes dans des données reçues"""
+        if b"DUPID:" not in data:
+            return
+        for line in bytes(data).split(b"\n"):
+            idx = line.find(b"DUPID:")
+            if idx == -1:
+                continue
+            parts = line[idx:].decode('utf-8', 'ignore').strip().split(":")
+            if len(parts) >= 2 and parts[1].isdigit():
+                self.stats["dupid_count"] += 1
+                if parts[1] not in self.dup_ids:
+                    self.logger.warning("ID en double signalé: DD{}".format(parts[1]), "radio")
+                self.dup_ids.add(parts[1])
+    
+    def _parse_ackm_response(self, response):
+        """
+        Parse une réponse multi-canaux
+        
+        Args:
+            response: String de la forme "ACKM:ID:N:MASK" (MASK en hexa)
+            
+        Returns:
+            dict ou None: {"detector_id": str, "state": int, "mask": int,
+                           "channels": int, "simulated": bool}
+        """
+        try:
+            parts = response[response.index("ACKM:"):].split(":")
+            if len(parts) != 4 or not parts[1].strip().isdigit():
+                self.stats["parse_errors"] += 1
+                self.logger.warning("ACKM malformé: {}".format(response), "radio")
+                return None
+            
+            mask = int(parts[3].strip(), 16)
+            return {
+                "detector_id": parts[1].strip(),
+                "state": 1 if mask else 0,
+                "mask": mask,
+                "channels": int(parts[2]),
+                "simulated": False
+            }
+        except Exception as e:
+            self.stats["parse_errors"] += 1
+            self.logger.error("Erreur parse ACKM: {}".format(e), "radio")
+            return None
+    
     def _parse_ack_response(self, response):
         """
         Parse une réponse ACK avec validation stricte
         
         Args:
-            response: String de la forme "ACK:ID:STATE"
+            response: String de la forme "ACK:ID:STATE" (ou "ACKM:..." multi-canaux)
             
         Returns:
             dict ou None: {"detector_id": str, "state": int, "simulated": bool}
         """
+        if "ACKM:" in response:
+            return self._parse_ackm_response(response)
+        
         try:
             # Chercher début de trame valide
             if "ACK:" not in response:
@@ -307,6 +393,8 @@ class Radio433:
                         
                         # Chercher fin de trame
                         if b'\n' in response_buffer:
+                            # DUPID possible dans le même buffer qu'un ACK valide
+                            self._scan_dupid(response_buffer)
                             response = response_buffer.decode('utf-8', 'ignore').strip()
                             self.logger.debug("← {}".format(response), "radio")
                             
@@ -332,6 +420,351 @@ class Radio433:
             self.logger.error("Erreur poll DD{}: {}".format(detector_id, e), "radio")
             return None
     
+    async def history(self, detector_id, since=0):
+        """
+        Récupère l'historique des transitions d'un détecteur (ASYNC)
+        
+        Args:
+            detector_id: ID du détecteur (string)
+            since: Numéro de transition à partir duquel lire
+                   (0 = tout l'historique, "next" d'une lecture précédente
+                   = uniquement les nouvelles)
+            
+        Returns:
+            dict ou None: {"detector_id": str, "now": int, "next": int,
+                           "transitions": [(tick, state), ...]}
+            Les ticks sont ceux du DD ; "now" permet de les convertir en âge.
+            "next" < since signale un redémarrage du DD : relire depuis 0.
+        """
+        if self.simulate or self.uart_broken:
+            return None
+        
+        try:
+            await self._flush_uart_buffer(max_time_ms=50)
+            
+            cmd = "HISTQ:{}:{}\n".format(detector_id, since)
+            written = await self._async_uart_write(cmd.encode())
+            if written <= 0:
+                self.logger.warning("Échec écriture HISTQ", "radio")
+                return None
+            self.stats["tx_count"] += 1
+            self.logger.debug("→ {}".format(cmd.strip()), "radio")
+            
+            transitions = []
+            timeout_ms = self.config.get("REPLY_TIMEOUT_MS", 500)
+            timeout_start = time.ticks_ms()
+            response_buffer = bytearray()
+            
+            while time.ticks_diff(time.ticks_ms(), timeout_start) < timeout_ms:
+                bytes_available = await self._async_uart_any()
+                
+                if bytes_available > 0:
+                    data = await self._async_uart_read(bytes_available)
+                    if data:
+                        response_buffer.extend(data)
+                        
+                        while True:
+                            nl = response_buffer.find(b'\n')
+                            if nl == -1:
+                                break
+                            line = bytes(response_buffer[:nl]).decode('utf-8', 'ignore').strip()
+                            response_buffer = response_buffer[nl + 1:]
+                            
+                            parts = line.split(":")
+                            if len(parts) < 3 or parts[1] != detector_id:
+                                continue
+                            try:
+                                if parts[0] == "HIST" and len(parts) == 5:
+                                    transitions.append((int(parts[3]), int(parts[4])))
+                                    # Chaque ligne reçue prolonge le délai
+                                    timeout_start = time.ticks_ms()
+                                elif parts[0] == "HISTEND":
+                                    self.stats["rx_count"] += 1
+                                    return {
+                                        "detector_id": detector_id,
+                                        "now": int(parts[2]),
+                                        "next": int(parts[3]) if len(parts) > 3 else since,
+                                        "transitions": transitions,
+                                    }
+                            except ValueError:
+                                self.stats["parse_errors"] += 1
+                
+                await asyncio.sleep_ms(5)
+            
+            self.stats["timeout_count"] += 1
+            self.logger.debug("Timeout historique DD{}".format(detector_id), "radio")
+            return None
+            
+        except Exception as e:
+            self.stats["error_count"] += 1
+            self.logger.error("Erreur historique DD{}: {}".format(detector_id, e), "radio")
+            return None
+    
+    async def _await_reply(self, kind, detector_id, timeout_ms):
+        """
+        Attend une ligne "<kind>:<detector_id>:<valeur>" (ASYNC)
+        
+        Returns:
+            str ou None: La valeur, None si timeout
+        """
+        prefix = "{}:{}:".format(kind, detector_id).encode()
+        timeout_start = time.ticks_ms()
+        
+        while time.ticks_diff(time.ticks_ms(), timeout_start) < timeout_ms:
+            bytes_available = await self._async_uart_any()
+            
+            if bytes_available > 0:
+                data = await self._async_uart_read(bytes_available)
+                if data:
+                    self._rx_lines.extend(data)
+                    while True:
+                        nl = self._rx_lines.find(b'\n')
+                        if nl == -1:
+                            break
+                        line = bytes(self._rx_lines[:nl]).strip()
+                        self._rx_lines = self._rx_lines[nl + 1:]
+                        if line.startswith(prefix):
+                            return line[len(prefix):].decode()
+            
+            await asyncio.sleep_ms(5)
+        
+        return None
+    
+    async def arbitrate(self, detector_id, free_ids):
+        """
+        Résout un ID en double (ASYNC)
+        
+        Chaque DD portant detector_id répond à ARB après un back-off
+        aléatoire avec son identifiant unique (ARBR:<id>:<uid>). Plusieurs
+        tours sont faits pour rattraper les réponses en collision. Le plus
+        petit uid garde l'ID, les autres reçoivent un ID libre (SETIDU).
+        
+        Args:
+            detector_id: ID en conflit (string)
+            free_ids: Liste d'ID libres (strings) à attribuer
+            
+        Returns:
+            dict: {uid: nouvel_id} pour les DD réattribués
+        """
+        if self.simulate or self.uart_broken:
+            return {}
+        
+        arb_cfg = self.config.get("ARBITRATION", {})
+        rounds = arb_cfg.get("ROUNDS", 3)
+        window_ms = arb_cfg.get("WINDOW_MS", 700)
+        
+        self.stats["arbitrations"] += 1
+        uids = set()
+        self._rx_lines = bytearray()
+        
+        try:
+            for _ in range(rounds):
+                await self._flush_uart_buffer(max_time_ms=50)
+                await self._async_uart_write("ARB:{}\n".format(detector_id).encode())
+                self.stats["tx_count"] += 1
+                
+                start = time.ticks_ms()
+                while True:
+                    remaining = window_ms - time.ticks_diff(time.ticks_ms(), start)
+                    if remaining <= 0:
+                        break
+                    uid = await self._await_reply("ARBR", detector_id, remaining)
+                    if uid:
+                        uids.add(uid)
+            
+            self.logger.info("Arbitrage DD{}: {} DD trouvés".format(
+                detector_id, len(uids)), "radio")
+            
+            reassigned = {}
+            free = list(free_ids)
+            for uid in sorted(uids)[1:]:
+                if not free:
+                    self.logger.error("Arbitrage DD{}: plus d'ID libre pour {}".format(
+                        detector_id, uid), "radio")
+                    break
+                new_id = free.pop(0)
+                await self._async_uart_write("SETIDU:{}:{}\n".format(uid, new_id).encode())
+                self.stats["tx_count"] += 1
+                reply = await self._await_reply("ACKSETID", new_id,
+                                                self.config.get("REPLY_TIMEOUT_MS", 500))
+                if reply == "OK":
+                    reassigned[uid] = new_id
+                    self.logger.info("Arbitrage: DD {} -> ID {}".format(uid, new_id), "radio")
+                else:
+                    self.logger.warning("Arbitrage: SETIDU {} sans réponse".format(uid), "radio")
+                    free.insert(0, new_id)
+            
+            if len(uids) <= 1 or len(reassigned) == len(uids) - 1:
+                self.dup_ids.discard(detector_id)
+            return reassigned
+            
+        except Exception as e:
+            self.stats["error_count"] += 1
+            self.logger.error("Erreur arbitrage DD{}: {}".format(detector_id, e), "radio")
+            return {}
+    
+    async def query_stats(self, detector_id):
+        """
+        Lit l'instrumentation d'un détecteur (ASYNC)
+        
+        Args:
+            detector_id: ID du détecteur (string)
+            
+        Returns:
+            dict ou None: {"detector_id": str, "n": int, "ok_count": int,
+                           "uptime_s": int, "mem_free": int, "reset_cause": int,
+                           "<étape>_avg_us": int, "<étape>_max_us": int, ...}
+            Les temps par étape couvrent la fenêtre depuis la requête
+            précédente (le DD les remet à zéro à chaque trame STATS).
+        """
+        if self.simulate or self.uart_broken:
+            return None
+        
+        self._rx_lines = bytearray()
+        try:
+            await self._flush_uart_buffer(max_time_ms=50)
+            written = await self._async_uart_write("STATQ:{}\n".format(detector_id).encode())
+            if written <= 0:
+                return None
+            self.stats["tx_count"] += 1
+            
+            reply = await self._await_reply("STATS", detector_id,
+                                            self.config.get("REPLY_TIMEOUT_MS", 500))
+            if reply is None:
+                self.stats["timeout_count"] += 1
+                return None
+            
+            raw = unhexlify(reply)
+            fmt = DD_STATS_FORMATS.get(raw[0]) if raw else None
+            if fmt is None or len(raw) != struct.calcsize(fmt[0]):
+                self.stats["parse_errors"] += 1
+                self.logger.warning("STATS DD{} trame inattendue".format(detector_id), "radio")
+                return None
+            values = struct.unpack(fmt[0], raw)
+            fields = fmt[1]
+            result = {"detector_id": detector_id}
+            for i, name in enumerate(fields):
+                result[name] = values[i]
+            n = result["n"]
+            base = len(fields)
+            for i, name in enumerate(DD_STAGE_NAMES):
+                result[name + "_avg_us"] = values[base + i] // n if n else 0
+                result[name + "_max_us"] = values[base + 3 + i]
+            self.stats["rx_count"] += 1
+            return result
+            
+        except Exception as e:
+            self.stats["error_count"] += 1
+            self.logger.error("Erreur STATS DD{}: {}".format(detector_id, e), "radio")
+            return None
+    
+    async def ota_update(self, detector_id, path, name="dd_main.py"):
+        """
+        Transfère un firmware vers un DD (ASYNC)
+        
+        Protocole (lignes texte, comme POLL/ACK):
+            → OTAS:<id>:<taille>:<bloc>:<fenêtre>:<sha256>:<nom>
+            ← OTAR:<id>:<prochain bloc>      (0 ou reprise)
+            → OTAB:<id>:<n>:<crc32>:<base64>  (fenêtre de blocs)
+            ← OTAK:<id>:<prochain bloc>      (ACK cumulatif / reprise)
+            → OTAE:<id>
+            ← OTAD:<id>:OK|ERR               (DD redémarre et installe)
+        
+        Args:
+            detector_id: ID du détecteur (string)
+            path: Fichier local à envoyer (.py ou .mpy)
+            name: Nom cible sur le DD ("dd_main.py" ou "dd_main.mpy")
+            
+        Returns:
+            bool: True si le DD a vérifié et accepté l'image
+        """
+        if self.simulate or self.uart_broken:
+            return False
+        
+        import os
+        ota_cfg = self.config.get("OTA", {})
+        block = ota_cfg.get("BLOCK_SIZE", 96)
+        window = ota_cfg.get("WINDOW", 8)
+        gap_ms = ota_cfg.get("BLOCK_GAP_MS", 10)
+        ack_timeout = ota_cfg.get("ACK_TIMEOUT_MS", 3000)
+        max_retries = ota_cfg.get("MAX_RETRIES", 5)
+        
+        try:
+            size = os.stat(path)[6]
+            h = sha256()
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(512)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+            digest = hexlify(h.digest()).decode()
+        except OSError as e:
+            self.logger.error("OTA: fichier {} illisible: {}".format(path, e), "radio")
+            return False
+        
+        count = (size + block - 1) // block
+        self._rx_lines = bytearray()
+        
+        try:
+            await self._flush_uart_buffer(max_time_ms=50)
+            await self._async_uart_write("OTAS:{}:{}:{}:{}:{}:{}\n".format(
+                detector_id, size, block, window, digest, name).encode())
+            reply = await self._await_reply("OTAR", detector_id, ack_timeout)
+            if reply is None or not reply.isdigit():
+                self.logger.warning("OTA DD{}: refusé ({})".format(detector_id, reply), "radio")
+                return False
+            
+            acked = int(reply)
+            self.logger.info("OTA DD{}: {} ({} o, {} blocs) depuis bloc {}".format(
+                detector_id, name, size, count, acked), "radio")
+            
+            retries = 0
+            with open(path, "rb") as f:
+                while acked < count:
+                    end = min(acked + window, count)
+                    f.seek(acked * block)
+                    for seq in range(acked, end):
+                        data = f.read(block)
+                        line = "OTAB:{}:{}:{:08x}:".format(
+                            detector_id, seq, crc32(data) & 0xFFFFFFFF).encode()
+                        # b2a_base64 ajoute déjà le '\n' final
+                        await self._async_uart_write(line + b2a_base64(data))
+                        self.stats["tx_count"] += 1
+                        await asyncio.sleep_ms(gap_ms)
+                    
+                    reply = await self._await_reply("OTAK", detector_id, ack_timeout)
+                    if reply is not None and reply.isdigit() and int(reply) > acked:
+                        acked = int(reply)
+                        retries = 0
+                        self.logger.debug("OTA DD{}: {}/{}".format(detector_id, acked, count), "radio")
+                    else:
+                        if reply is not None and reply.isdigit():
+                            acked = int(reply)
+                        retries += 1
+                        self.stats["timeout_count"] += 1
+                        if retries > max_retries:
+                            self.logger.error("OTA DD{}: abandon au bloc {}".format(
+                                detector_id, acked), "radio")
+                            return False
+            
+            await self._async_uart_write("OTAE:{}\n".format(detector_id).encode())
+            reply = await self._await_reply("OTAD", detector_id,
+                                            ota_cfg.get("END_TIMEOUT_MS", 5000))
+            ok = reply == "OK"
+            if ok:
+                self.stats["rx_count"] += 1
+                self.logger.info("OTA DD{}: image vérifiée, redémarrage".format(detector_id), "radio")
+            else:
+                self.logger.error("OTA DD{}: vérification échouée ({})".format(
+                    detector_id, reply), "radio")
+            return ok
+            
+        except Exception as e:
+            self.stats["error_count"] += 1
+            self.logger.error("Erreur OTA DD{}: {}".format(detector_id, e), "radio")
+            return False
+    
     def get_statistics(self):
         """Retourne statistiques"""
         return dict(self.stats)
@@ -339,7 +772,8 @@ class Radio433:
     async def poll_status(self):
         """
         Interroge tous les détecteurs (ASYNC - retourne une liste)
-        Avec délai inter-poll pour éviter collisions
+        Avec délai inter-poll pour éviter collisions.
+        Les groupes de CHANNEL_MAP sont lus par un seul POLL par DD.
         """
         import ta_config
         
@@ -348,19 +782,46 @@ class Radio433:
                 self.dd_id = dd_id
                 self.state = state
         
+        radio_cfg = ta_config.RADIO
+        channel_map = radio_cfg.get("CHANNEL_MAP", {})
+        
+        # Une requête par DD physique : (dd_id, [(group_id, canal), ...])
+        requests = []
+        multi = {}
+        for gid in radio_cfg["GROUP_IDS"]:
+            if gid in channel_map:
+                dd_id, channel = channel_map[gid]
+                if dd_id not in multi:
+                    multi[dd_id] = []
+                    requests.append((dd_id, multi[dd_id]))
+                multi[dd_id].append((gid, channel))
+            else:
+                requests.append((gid, None))
+        
         results = []
         inter_poll_delay = 150  # 150ms entre chaque poll
         
-        for dd_id in ta_config.RADIO["GROUP_IDS"]:
+        for dd_id, channels in requests:
             result = await self.poll("{:02d}".format(dd_id))
             
-            if result:
-                state = (ta_config.RADIO["STATE_PRESENT"] 
-                        if result["state"] == 1 
-                        else ta_config.RADIO["STATE_ABSENT"])
-                results.append(DDStatus(dd_id, state))
+            if channels is None:
+                if result:
+                    state = (radio_cfg["STATE_PRESENT"]
+                            if result["state"] == 1
+                            else radio_cfg["STATE_ABSENT"])
+                    results.append(DDStatus(dd_id, state))
+                else:
+                    results.append(DDStatus(dd_id, radio_cfg["STATE_UNKNOWN"]))
             else:
-                results.append(DDStatus(dd_id, ta_config.RADIO["STATE_UNKNOWN"]))
+                mask = result.get("mask") if result else None
+                for gid, channel in channels:
+                    if mask is None:
+                        state = radio_cfg["STATE_UNKNOWN"]
+                    elif mask & (1 << channel):
+                        state = radio_cfg["STATE_PRESENT"]
+                    else:
+                        state = radio_cfg["STATE_ABSENT"]
+                    results.append(DDStatus(gid, state))
             
             # Délai important entre polls pour laisser le GT38 respirer
             await asyncio.sleep_ms(inter_poll_delay)
@@ -368,5 +829,9 @@ class Radio433:
         return results
     
     async def request_status(self, dd_id):
-        """Demande l'état d'un détecteur (ASYNC)"""
+        """Demande l'état d'un détecteur (ASYNC) - groupe multi-canaux: DD parent"""
+        import ta_config
+        target = ta_config.RADIO.get("CHANNEL_MAP", {}).get(dd_id)
+        if target:
+            dd_id = target[0]
         return await self.poll("{:02d}".format(dd_id))
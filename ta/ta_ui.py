@@ -1,13 +1,25 @@
 """
-Project: DTD - ta_ui.py v2.2.0
+Project: DTD - ta_ui.py v2.10.0
 Interface utilisateur pour LilyGO T-Display S3 (mode parallèle 8-bit)
 Adapté pour st7789s3 (driver russhughes)
-Layout paysage: Titre (DTD + version) | Barres DD (1-5) | Noms DD | Log
+Layout paysage: Titre (DTD + version) | Barres DD (1-10) | Noms DD | Log
 Hauteurs configurables via ta_config.py
+v2.3.0 : dessin dans un canevas RAM (ta_canvas), envoi des zones modifiées
+v2.4.0 : log défilant (décalage en RAM + une seule ligne dessinée par message)
+v2.5.0 : rendu retenu : status/progress mémorisés, render_dirty regroupe par trame
+v2.6.0 : géométrie précalculée (UI.geo), jusqu'à 10 groupes
+v2.7.0 : bordures et labels dessinés une fois, un changement d'état = un fill
+v2.8.0 : flush_steps() : envoi du canevas par morceaux depuis une tâche asyncio
+v2.9.0 : titre et labels DD copiés depuis un atlas de sprites précalculé (ta_atlas),
+         rejeté si les groupes ou la géométrie ont changé depuis sa génération
+v2.10.0 : canevas 4 bits/pixel à palette (FRAMEBUFFER_MODE), 27 Ko au lieu de 108
 """
 
+import time
+from array import array
 import ta_config as config
 from ta_logger import get_logger
+import ta_layout
 
 try:
     import st7789s3 as st7789
@@ -22,8 +34,26 @@ except ImportError:
     font_small = None
     font_large = None
 
+try:
+    from ta_canvas import Canvas, IndexedCanvas
+except ImportError:
+    Canvas = None
+    IndexedCanvas = None
+
+try:
+    from ta_atlas import Atlas
+except ImportError:
+    Atlas = None
+
 logger = get_logger()
 
+# Géométrie d'un groupe DD dans UI.geo (un enregistrement par groupe)
+_G_X = 0        # X de la barre (et de la barre de progression)
+_G_W = 1        # Largeur de la barre
+_G_TEXT_X = 2   # X du label centré (font 8 px)
+_G_FB_X = 3     # X du label de secours (rectangles 6 px)
+_G_STRIDE = 4
+
 class UI:
     """Interface utilisateur TFT"""
     
@@ -57,20 +87,41 @@ class UI:
         self.margin_right = config.UI.get("MARGIN_RIGHT", 10)
         self.bar_spacing = config.UI.get("BAR_SPACING", 5)
         
+        # Géométrie de tous les widgets, calculée une seule fois
+        self._compute_layout(len(config.RADIO["GROUP_IDS"]))
+        
         # États des groupes
         self.group_states = [None] * len(config.RADIO["GROUP_IDS"])
         self.testing_id = None
         self.log_text = ""
         
-        # Historique de log (3 lignes qui défilent)
+        # Historique de log (lignes qui défilent)
         self.log_history = []
-        self.max_log_lines = 3
+        self.log_line_height = 14  # Compact : 3 lignes en 8x16
+        fit = (self.zone_log_height - 5 - 12) // self.log_line_height + 1
+        self.max_log_lines = max(1, min(config.UI.get("LOG_LINES", 3), fit))
+        self._log_drawn = False    # Zone de log conforme à l'historique
+        
+        # Écran de diagnostic (stats DD)
+        self.diag_mode = False
         
-        # Dirty tracking
+        # Barre de progression (état retenu, dessinée par render_dirty)
+        self.progress_color = None
+        
+        # Dirty tracking : chaque widget garde son état, render_dirty ne
+        # repeint que ce qui a changé, au plus une fois par REFRESH_RATE_MS
         self.dirty_groups = set()
-        self.dirty_status = False
         self.dirty_progress = False
         self.dirty_log = False
+        self._log_new = 0            # Lignes ajoutées depuis le dernier rendu
+        self._log_scrolled = False   # Historique plein lors de l'ajout
+        self.refresh_ms = config.UI.get("REFRESH_RATE_MS", 100)
+        self.immediate = not config.UI.get("DIRTY_TRACKING", True)
+        self._last_render = time.ticks_add(time.ticks_ms(), -self.refresh_ms)
+        
+        # Envoi du canevas confié à une tâche asyncio (TaApp._display_task)
+        self.deferred_flush = False
+        self.flush_chunk = config.UI.get("FLUSH_CHUNK_BYTES", 4096)
         
         # Initialiser TFT si pas fourni
         if self.tft is None and tft_config is not None:
@@ -82,6 +133,21 @@ class UI:
                 logger.error("Erreur init TFT: {}".format(e), "ui")
                 self.tft = None
         
+        # Cible de dessin : canevas RAM (envoi par zones) ou écran direct
+        self.gfx = self.tft
+        if self.tft and Canvas is not None and config.UI.get("FRAMEBUFFER", True):
+            self._create_canvas(config.UI.get("FRAMEBUFFER_MODE", "palette"))
+        
+        # Le canevas indexé copie les glyphes depuis la font : pas de cache
+        if self.tft and hasattr(self.tft, "glyph_cache"):
+            indexed = IndexedCanvas is not None and isinstance(self.gfx, IndexedCanvas)
+            self.tft.glyph_cache(0 if indexed else config.UI.get("GLYPH_CACHE_BYTES", 16384))
+        
+        # Atlas de sprites (titre, labels) : copié dans le canevas seulement
+        self.atlas = None
+        if self.gfx is not self.tft:
+            self._load_atlas(config.UI.get("ATLAS_FILE", ""))
+        
         if self.tft:
             self._init_display()
         else:
@@ -89,6 +155,102 @@ class UI:
         
         logger.info("UI initialisée ({}x{}) - Layout paysage".format(self.width, self.height), "ui")
     
+    def _create_canvas(self, mode):
+        """
+        Alloue le canevas RAM ; self.gfx reste l'écran si la mémoire manque
+        
+        Args:
+            mode: "palette" (4 bits/pixel, 27 Ko) ou "rgb565" (108 Ko, repli
+                sur "palette" si la mémoire manque)
+        """
+        # Le mode palette demande l'extension RGB565 du driver à l'envoi
+        kinds = []
+        if mode != "palette":
+            kinds.append((Canvas, "RGB565"))
+        if hasattr(self.tft, "blit_indexed"):
+            kinds.append((IndexedCanvas, "palette 16 couleurs"))
+        elif mode == "palette":
+            kinds.append((Canvas, "RGB565"))
+        
+        for kind, name in kinds:
+            try:
+                self.gfx = kind(self.tft, self.width, self.height)
+                logger.info("Canevas {}x{} {} alloué".format(self.width, self.height, name), "ui")
+                return
+            except MemoryError:
+                logger.warning("Mémoire insuffisante pour le canevas {}".format(name), "ui")
+        logger.warning("Pas de canevas - dessin direct", "ui")
+    
+    def _load_atlas(self, path):
+        """
+        Charge l'index de l'atlas de sprites ; ignoré s'il manque ou s'il a
+        été généré pour un autre titre (APP_NAME/APP_VERSION), d'autres
+        GROUP_IDS ou une autre géométrie (tag ta_layout.atlas_tag)
+        
+        Args:
+            path: fichier généré par build_atlas.py ("" = pas d'atlas)
+        """
+        if not path or Atlas is None:
+            return
+        try:
+            atlas = Atlas(path)
+        except (OSError, ValueError) as e:
+            logger.info("Pas d'atlas de sprites ({}) - dessin classique".format(e), "ui")
+            return
+        tag = ta_layout.atlas_tag(
+            ta_layout.title_text(config), self.width, self.zone_title_height,
+            self.margin_left, self.margin_right, self.bar_spacing,
+            config.RADIO["GROUP_IDS"])
+        if atlas.tag != tag:
+            logger.warning("Atlas {} périmé ({}) - dessin classique".format(path, atlas.tag), "ui")
+            return
+        self.atlas = atlas
+        logger.info("Atlas {} chargé ({} sprites)".format(path, len(atlas.sprites)), "ui")
+    
+    def _blit_sprite(self, name, x, y, w, h):
+        """
+        Copie un sprite de l'atlas s'il a exactement la taille attendue
+        
+        Returns:
+            True si le sprite a été copié, False pour dessiner sans atlas
+        """
+        if self.atlas is None or self.atlas.size(name) != (w, h):
+            return False
+        buf, w, h = self.atlas.read(name)
+        self.gfx.blit_indexed(buf, x, y, w, h, self.atlas.palette)
+        return True
+    
+    def _compute_layout(self, count):
+        """
+        Calcule la géométrie des barres, labels et progression pour count
+        groupes (répartis sur la largeur utile) ; rangée dans self.geo
+        
+        Args:
+            count: nombre de groupes (GROUP_IDS)
+        """
+        n, bar_width, xs, self.labels = ta_layout.group_layout(
+            self.width, self.margin_left, self.margin_right, self.bar_spacing, count)
+        if n < count:
+            logger.warning("{} groupes, {} affichables".format(count, n), "ui")
+        self.group_count = n
+        self.bar_width = bar_width
+        
+        # Bandes horizontales communes à tous les groupes
+        self.bar_y = self.y_bars + 3
+        self.bar_height = self.zone_bars_height - 6
+        self.label_y = self.y_labels + 2
+        self.label_height = self.zone_labels_height - 4
+        
+        self.geo = array("h", bytes(2 * _G_STRIDE * n))
+        for i in range(n):
+            x = xs[i]
+            text = self.labels[i]
+            g = i * _G_STRIDE
+            self.geo[g + _G_X] = x
+            self.geo[g + _G_W] = bar_width
+            self.geo[g + _G_TEXT_X] = x + (bar_width - len(text) * 8) // 2
+            self.geo[g + _G_FB_X] = x + (bar_width - len(text) * 6) // 2
+    
     def _init_display(self):
         """Initialise l'affichage"""
         if not self.tft:
@@ -96,74 +258,110 @@ class UI:
         
         try:
             # Remplir fond noir
-            self.tft.fill(st7789.BLACK)
+            self.gfx.fill(st7789.BLACK)
             
             # Dessiner le titre
             self._draw_title()
             
-            # Dessiner les 5 groupes DD
-            for i in range(len(config.RADIO["GROUP_IDS"])):
-                self._draw_group(i, None)
+            # Dessiner les groupes DD (partie fixe puis état)
+            for i in range(self.group_count):
+                self._draw_group_chrome(i)
+                self._draw_group(i, self.group_states[i])
             
             # Dessiner zone de log
             self._draw_log_zone()
+            self._flush()
         
         except Exception as e:
             logger.error("Erreur init display: {}".format(e), "ui")
     
+    def _flush(self):
+        """Envoie à l'écran les zones modifiées du canevas"""
+        if self.gfx is not self.tft and not self.deferred_flush:
+            self.gfx.flush()
+    
+    def flush_steps(self):
+        """
+        Envoi par morceaux des zones modifiées (tâche d'affichage de TaApp)
+        
+        Returns:
+            itérable : un élément par blit_buffer envoyé
+        """
+        if self.gfx is self.tft or not self.gfx.is_dirty():
+            return ()
+        return self.gfx.flush_iter(self.flush_chunk)
+    
     def _draw_title(self):
         """Dessine le titre en haut avec nom et version"""
         if not self.tft:
             return
         
         try:
+            # Sprite précalculé (fond + texte) si l'atlas le fournit
+            if self._blit_sprite("title", 0, self.y_title, self.width, self.zone_title_height):
+                return
+            
             # Fond bleu pour le titre
-            self.tft.fill_rect(0, self.y_title, self.width, self.zone_title_height, st7789.BLUE)
+            self.gfx.fill_rect(0, self.y_title, self.width, self.zone_title_height, st7789.BLUE)
             
             # Construire le texte du titre
-            app_name = getattr(config, "APP_NAME", "DTD")
-            app_version = getattr(config, "APP_VERSION", "1.0.0")
-            title_text = "{} v{}".format(app_name, app_version)
+            title_text = ta_layout.title_text(config)
             
             # Afficher le texte avec font si disponible
             if font_large:
                 # Calculer position centrée
-                text_width = len(title_text) * 16  # 16 pixels par caractère
-                text_x = (self.width - text_width) // 2
+                text_x = ta_layout.title_x(self.width, title_text)
                 text_y = self.y_title + 2
                 
                 # Afficher le texte en blanc
-                self.tft.text(font_large, title_text, text_x, text_y, st7789.WHITE, st7789.BLUE)
+                self.gfx.text(font_large, title_text, text_x, text_y, st7789.WHITE, st7789.BLUE)
             else:
                 # Fallback: barre blanche
                 text_width = len(title_text) * 6
                 text_x = (self.width - text_width) // 2
                 if text_x < 5:
                     text_x = 5
-                self.tft.fill_rect(text_x, self.y_title + 6, 
+                self.gfx.fill_rect(text_x, self.y_title + 6, 
                                  min(text_width, self.width - 10), 8, st7789.WHITE)
             
         except Exception as e:
             logger.error("Erreur draw title: {}".format(e), "ui")
     
-    def _draw_group(self, index, state):
+    def _draw_group_chrome(self, index):
         """
-        Dessine un groupe de détecteur (barre + label)
+        Dessine la partie fixe d'un groupe (bordure + label), une seule fois
         
         Args:
-            index: Index du groupe (0-4) pour DD1 à DD5
-            state: True (présent), False (absent), None (inconnu)
+            index: Index du groupe (0 = DD1)
         """
-        if not self.tft:
+        if not self.tft or index >= self.group_count:
             return
         
         try:
-            # Calcul positions horizontales pour 5 DD
-            available_width = self.width - self.margin_left - self.margin_right
-            bar_width = (available_width - (self.bar_spacing * 4)) // 5  # 5 barres avec 4 espacements
+            g = index * _G_STRIDE
+            # Bordure noire
+            self.gfx.rect(self.geo[g + _G_X], self.bar_y, self.geo[g + _G_W],
+                          self.bar_height, st7789.BLACK)
             
-            x_start = self.margin_left + (index * (bar_width + self.bar_spacing))
+            # === LABEL DD ===
+            self._draw_dd_label(index)
             
+        except Exception as e:
+            logger.error("Erreur draw chrome {}: {}".format(index, e), "ui")
+    
+    def _draw_group(self, index, state):
+        """
+        Remplit l'intérieur de la barre d'un groupe selon son état
+        (bordure et label ne sont pas redessinés)
+        
+        Args:
+            index: Index du groupe (0 = DD1)
+            state: True (présent), False (absent), None (inconnu)
+        """
+        if not self.tft or index >= self.group_count:
+            return
+        
+        try:
             # Couleur selon l'état
             if state is True:
                 color = st7789.GREEN  # Présent
@@ -172,63 +370,49 @@ class UI:
             else:
                 color = st7789.color565(100, 100, 100)  # Inconnu (gris)
             
-            # === BARRE DE STATUT ===
-            bar_y = self.y_bars + 3
-            bar_height = self.zone_bars_height - 6
-            
-            # Dessiner rectangle de statut
-            self.tft.fill_rect(x_start, bar_y, bar_width, bar_height, color)
-            
-            # Bordure noire
-            self.tft.rect(x_start, bar_y, bar_width, bar_height, st7789.BLACK)
-            
-            # === LABEL DD ===
-            self._draw_dd_label(index, x_start, bar_width)
+            # === BARRE DE STATUT (intérieur de la bordure) ===
+            g = index * _G_STRIDE
+            self.gfx.fill_rect(self.geo[g + _G_X] + 1, self.bar_y + 1,
+                               self.geo[g + _G_W] - 2, self.bar_height - 2, color)
             
         except Exception as e:
             logger.error("Erreur draw group {}: {}".format(index, e), "ui")
     
-    def _draw_dd_label(self, index, x_start, bar_width):
+    def _draw_dd_label(self, index):
         """
         Dessine le label d'un DD (DD1, DD2, etc.)
         
         Args:
-            index: Index du groupe (0-4)
-            x_start: Position X de début
-            bar_width: Largeur de la barre
+            index: Index du groupe (0 = DD1)
         """
         if not self.tft:
             return
         
         try:
-            label_y = self.y_labels + 2
-            dd_number = index + 1
+            g = index * _G_STRIDE
+            text = self.labels[index]
             
-            # Effacer zone label
-            self.tft.fill_rect(x_start, label_y, bar_width, self.zone_labels_height - 4, st7789.BLACK)
+            # Sprite précalculé (fond + texte) si l'atlas le fournit
+            if font_small and self._blit_sprite("lbl{}".format(index), self.geo[g + _G_X],
+                                                self.label_y, self.geo[g + _G_W],
+                                                font_small.HEIGHT):
+                return
             
-            # Texte "DD" + numéro
-            text = "DD{}".format(dd_number)
+            # Effacer zone label
+            self.gfx.fill_rect(self.geo[g + _G_X], self.label_y, self.geo[g + _G_W],
+                               self.label_height, st7789.BLACK)
             
             # Afficher avec font si disponible
             if font_small:
-                # Calculer position centrée
-                text_width = len(text) * 8  # 8 pixels par caractère
-                text_x = x_start + (bar_width - text_width) // 2
-                text_y = label_y
-                
-                # Afficher en blanc sur fond noir
-                self.tft.text(font_small, text, text_x, text_y, st7789.WHITE, st7789.BLACK)
+                # Afficher en blanc sur fond noir, centré
+                self.gfx.text(font_small, text, self.geo[g + _G_TEXT_X], self.label_y,
+                              st7789.WHITE, st7789.BLACK)
             else:
                 # Fallback: rectangles blancs
-                char_width = 6
-                text_width = len(text) * char_width
-                text_x = x_start + (bar_width - text_width) // 2
-                text_y = label_y + 3
-                
-                for i, char in enumerate(text):
-                    char_x = text_x + (i * char_width)
-                    self.tft.fill_rect(char_x, text_y, 5, 7, st7789.WHITE)
+                char_x = self.geo[g + _G_FB_X]
+                for _ in text:
+                    self.gfx.fill_rect(char_x, self.label_y + 3, 5, 7, st7789.WHITE)
+                    char_x += 6
             
         except Exception as e:
             logger.error("Erreur draw DD label {}: {}".format(index, e), "ui")
@@ -240,10 +424,10 @@ class UI:
         
         try:
             # Fond noir pour la zone de log
-            self.tft.fill_rect(0, self.y_log, self.width, self.zone_log_height, st7789.BLACK)
+            self.gfx.fill_rect(0, self.y_log, self.width, self.zone_log_height, st7789.BLACK)
             
             # Bordure supérieure grise
-            self.tft.hline(0, self.y_log, self.width, st7789.color565(80, 80, 80))
+            self.gfx.hline(0, self.y_log, self.width, st7789.color565(80, 80, 80))
             
         except Exception as e:
             logger.error("Erreur draw log zone: {}".format(e), "ui")
@@ -253,7 +437,7 @@ class UI:
         Met à jour un groupe DD
         
         Args:
-            index: Index du groupe (0-4) pour DD1 à DD5
+            index: Index du groupe (0 = DD1)
             state: True (présent), False (absent), None (inconnu)
             label: Texte optionnel (non utilisé pour l'instant)
         """
@@ -266,83 +450,119 @@ class UI:
             self.dirty_groups.add(index)
             
             # Redessiner immédiatement si pas de dirty tracking
-            if not config.UI.get("DIRTY_TRACKING", True):
-                available_width = self.width - self.margin_left - self.margin_right
-                bar_width = (available_width - (self.bar_spacing * 4)) // 5
-                x_start = self.margin_left + (index * (bar_width + self.bar_spacing))
-                self._draw_group(index, state)
+            if self.immediate:
+                self.render_dirty(force=True)
     
     def status(self, text):
         """
-        Affiche un message dans la zone de log en bas (historique de 3 lignes)
+        Ajoute un message au log en bas (historique qui défile)
+        
+        Le message est seulement mémorisé ; render_dirty() le dessine au
+        prochain rafraîchissement. Avec le canevas, un seul nouveau message
+        fait défiler les lignes affichées et ne dessine que la nouvelle
+        (plus la ligne devenue la plus ancienne, passée en gris)
         
         Args:
             text: Texte à afficher dans le log
         """
-        if not self.tft:
+        if not text or not text.strip():
             return
         
-        try:
-            # Ajouter le nouveau texte à l'historique
-            if text and text.strip():
-                self.log_history.append(text.strip())
+        self.log_history.append(text.strip())
+        self._log_new += 1
+        
+        # Garder seulement les dernières lignes
+        self._log_scrolled = len(self.log_history) > self.max_log_lines
+        if self._log_scrolled:
+            self.log_history.pop(0)  # Retirer la plus ancienne
+        
+        self.dirty_log = True
+        if self.immediate:
+            self.render_dirty(force=True)
+    
+    def _render_log(self):
+        """Dessine le log : défilement d'une ligne ou repeint complet"""
+        if (self._log_new == 1 and self._log_drawn and font_small
+                and self.gfx is not self.tft):
+            self._scroll_log(self._log_scrolled)
+        else:
+            self._draw_log_lines()
+        self._log_new = 0
+    
+    def _log_line_y(self, i):
+        return self.y_log + 5 + i * self.log_line_height
+    
+    def _draw_log_line(self, i, clip=False):
+        """
+        Dessine la ligne i de l'historique (fond effacé sur toute la largeur)
+        
+        clip=True (canevas seulement) limite le dessin à la hauteur de ligne
+        pour ne pas écraser le haut de la ligne suivante
+        """
+        log_line = self.log_history[i]
+        y = self._log_line_y(i)
+        
+        # Tronquer la ligne si trop longue
+        max_chars_per_line = (self.width - 15) // 8
+        if len(log_line) > max_chars_per_line:
+            log_line = log_line[:max_chars_per_line - 3] + "..."
+        
+        # Ligne la plus ancienne en gris (historique plein), les autres en cyan
+        if i == 0 and len(self.log_history) == self.max_log_lines:
+            color = st7789.color565(80, 80, 80)
+        else:
+            color = st7789.CYAN
+        
+        if clip:
+            self.gfx.fill_rect(5, y, self.width - 10, self.log_line_height, st7789.BLACK)
+            self.gfx.text(font_small, log_line, 8, y, color, st7789.BLACK,
+                          self.log_line_height)
+            return
+        self.gfx.fill_rect(5, y, self.width - 10, font_small.HEIGHT, st7789.BLACK)
+        self.gfx.text(font_small, log_line, 8, y, color, st7789.BLACK)
+    
+    def _scroll_log(self, scrolled):
+        """Ajoute la dernière ligne de l'historique sans repeindre la zone"""
+        last = len(self.log_history) - 1
+        if scrolled:
+            # Bande des lignes affichées, remontée d'une ligne en RAM
+            y0 = self._log_line_y(0)
+            h = self._log_line_y(last) + font_small.HEIGHT - y0
+            self.gfx.shift_up(y0, h, self.log_line_height)
+        self._draw_log_line(last)
+        if last and last == self.max_log_lines - 1:
+            self._draw_log_line(0, clip=True)
+    
+    def _draw_log_lines(self):
+        """Repeint toute la zone de log depuis l'historique"""
+        # Effacer complètement la zone de log
+        self.gfx.fill_rect(5, self.y_log + 2, self.width - 10, self.zone_log_height - 4, st7789.BLACK)
+        
+        # Afficher les lignes de l'historique avec font si disponible
+        if font_small and self.log_history:
+            for i in range(len(self.log_history)):
+                # Vérifier qu'on a assez d'espace
+                if self._log_line_y(i) + 12 > self.y_log + self.zone_log_height:
+                    break
+                self._draw_log_line(i)
+            self._log_drawn = True
                 
-                # Garder seulement les 3 dernières lignes
-                if len(self.log_history) > self.max_log_lines:
-                    self.log_history.pop(0)  # Retirer la plus ancienne
-            
-            self.dirty_log = True
+        elif self.log_history:
+            # Fallback: barres colorées pour chaque ligne
+            y_offset = self.y_log + 8
+            line_height = 10
             
-            # Effacer complètement la zone de log
-            self.tft.fill_rect(5, self.y_log + 2, self.width - 10, self.zone_log_height - 4, st7789.BLACK)
-            
-            # Afficher les lignes de l'historique avec font si disponible
-            if font_small and self.log_history:
-                max_chars_per_line = (self.width - 15) // 8
-                
-                y_offset = self.y_log + 5
-                line_height = 14  # Hauteur par ligne (compact pour afficher 3 lignes)
+            for i, log_line in enumerate(self.log_history):
+                if y_offset + line_height > self.y_log + self.zone_log_height:
+                    break
                 
-                # Afficher chaque ligne de l'historique
-                for i, log_line in enumerate(self.log_history):
-                    if i >= self.max_log_lines:
-                        break
-                    
-                    # Vérifier qu'on a assez d'espace
-                    if y_offset + 12 > self.y_log + self.zone_log_height:
-                        break
-                    
-                    # Tronquer la ligne si trop longue
-                    display_line = log_line
-                    if len(display_line) > max_chars_per_line:
-                        display_line = display_line[:max_chars_per_line - 3] + "..."
-                    
-                    # Afficher la ligne
-                    # Ligne la plus ancienne en gris, les autres en cyan
-                    color = st7789.color565(80, 80, 80) if i == 0 and len(self.log_history) == 3 else st7789.CYAN
-                    
-                    self.tft.text(font_small, display_line, 8, y_offset, color, st7789.BLACK)
-                    y_offset += line_height
-                    
-            elif self.log_history:
-                # Fallback: barres colorées pour chaque ligne
-                y_offset = self.y_log + 8
-                line_height = 10
-                
-                for i, log_line in enumerate(self.log_history):
-                    if i >= self.max_log_lines:
-                        break
-                    
-                    if y_offset + line_height > self.y_log + self.zone_log_height:
-                        break
-                    
-                    bar_width = min(len(log_line) * 6, self.width - 20)
-                    color = st7789.color565(80, 80, 80) if i == 0 and len(self.log_history) == 3 else st7789.CYAN
-                    self.tft.fill_rect(10, y_offset, bar_width, 6, color)
-                    y_offset += line_height
-            
-        except Exception as e:
-            logger.error("Erreur status: {}".format(e), "ui")
+                bar_width = min(len(log_line) * 6, self.width - 20)
+                color = st7789.color565(80, 80, 80) if i == 0 and len(self.log_history) == self.max_log_lines else st7789.CYAN
+                self.gfx.fill_rect(10, y_offset, bar_width, 6, color)
+                y_offset += line_height
+        
+        else:
+            self._log_drawn = True
     
     def progress(self, dd_id, color=None):
         """
@@ -352,50 +572,137 @@ class UI:
             dd_id: ID du détecteur (1-5) ou None pour masquer
             color: Couleur de la barre (optionnel)
         """
+        if dd_id == self.testing_id and color == self.progress_color:
+            return
         self.testing_id = dd_id
+        self.progress_color = color
         self.dirty_progress = True
+        if self.immediate:
+            self.render_dirty(force=True)
+    
+    def _render_progress(self):
+        """Efface la bande de progression et dessine celle du DD en test"""
+        # Effacer toutes les barres de progression
+        self.gfx.fill_rect(0, self.y_bars, self.width, 3, st7789.BLACK)
+        if self.testing_id is None:
+            return
         
+        # Afficher barre de progression au-dessus du DD concerné
+        index = self.testing_id - 1
+        if 0 <= index < self.group_count:
+            g = index * _G_STRIDE
+            bar_color = self.progress_color if self.progress_color else st7789.YELLOW
+            
+            # Barre horizontale au-dessus de la barre de statut
+            self.gfx.fill_rect(self.geo[g + _G_X], self.y_bars, self.geo[g + _G_W], 3, bar_color)
+    
+    def diagnostics(self, dd_stats):
+        """
+        Affiche l'écran de diagnostic (une ligne par DD) sous le titre
+        
+        Args:
+            dd_stats: dict {dd_id: résultat de Radio433.query_stats() ou None}
+        """
+        self.diag_mode = True
+        self._log_drawn = False
         if not self.tft:
             return
         
         try:
-            if dd_id is None:
-                # Effacer toutes les barres de progression
-                self.tft.fill_rect(0, self.y_bars, self.width, 3, st7789.BLACK)
-            else:
-                # Afficher barre de progression au-dessus du DD concerné
-                index = dd_id - 1
-                if 0 <= index < len(config.RADIO["GROUP_IDS"]):
-                    # Calcul position X (même logique que _draw_group)
-                    available_width = self.width - self.margin_left - self.margin_right
-                    bar_width = (available_width - (self.bar_spacing * 4)) // 5
-                    x_pos = self.margin_left + (index * (bar_width + self.bar_spacing))
-                    
-                    bar_color = color if color else st7789.YELLOW
-                    
-                    # Barre horizontale au-dessus de la barre de statut
-                    self.tft.fill_rect(x_pos, self.y_bars, bar_width, 3, bar_color)
+            self.gfx.fill_rect(0, self.y_bars, self.width, self.height - self.y_bars, st7789.BLACK)
+            if not font_small:
+                self._flush()
+                return
+            
+            max_chars = (self.width - 8) // 8
+            y = self.y_bars + 2
+            self.gfx.text(font_small, "DD  OK/NOK  rt us  up  heap rst ack"[:max_chars],
+                          4, y, st7789.YELLOW, st7789.BLACK)
+            y += 16
+            
+            for dd_id in config.RADIO["GROUP_IDS"]:
+                if y + 16 > self.height:
+                    break
+                st = dd_stats.get(dd_id)
+                if st and "ok_count" in st:
+                    line = "{:<3} {}/{} {}-{} {}m {}k R{} A{}ms".format(
+                        dd_id, st["ok_count"], st["nok_count"],
+                        st["min_response_us"], st["max_response_us"],
+                        st["uptime_s"] // 60, st["mem_free"] // 1024,
+                        st["reset_cause"], st["first_ack_ms"])
+                    color = st7789.CYAN
+                else:
+                    line = "{:<3} --".format(dd_id)
+                    color = st7789.color565(80, 80, 80)
+                self.gfx.text(font_small, line[:max_chars], 4, y, color, st7789.BLACK)
+                y += 16
+            
+            self._flush()
         
         except Exception as e:
-            logger.error("Erreur progress: {}".format(e), "ui")
+            logger.error("Erreur diagnostics: {}".format(e), "ui")
     
-    def render_dirty(self):
-        """Redessine seulement les éléments modifiés (dirty tracking)"""
+    def close_diagnostics(self):
+        """Quitte l'écran de diagnostic et redessine barres, labels et log"""
+        self.diag_mode = False
         if not self.tft:
             return
         
+        try:
+            self.gfx.fill_rect(0, self.y_bars, self.width, self.height - self.y_bars, st7789.BLACK)
+            for i in range(self.group_count):
+                self._draw_group_chrome(i)
+            self._draw_log_zone()
+            self.dirty_groups.update(range(len(self.group_states)))
+            self.dirty_progress = True
+            self.dirty_log = True
+            self._log_drawn = False
+            self.render_dirty(force=True)
+        except Exception as e:
+            logger.error("Erreur close diagnostics: {}".format(e), "ui")
+    
+    def render_dirty(self, force=False):
+        """
+        Redessine seulement les éléments modifiés (dirty tracking)
+        
+        Au plus un rendu par UI["REFRESH_RATE_MS"] : les changements
+        arrivés entre deux rendus sont regroupés en un seul envoi
+        
+        Args:
+            force: True pour rendre immédiatement (sans attendre la période)
+        
+        Returns:
+            True si un rendu a été fait
+        """
+        if not self.tft or self.diag_mode:
+            return False
+        if not (self.dirty_groups or self.dirty_progress or self.dirty_log):
+            return False
+        
+        now = time.ticks_ms()
+        if not force and time.ticks_diff(now, self._last_render) < self.refresh_ms:
+            return False
+        self._last_render = now
+        
         try:
             # Redessiner groupes modifiés
             for index in self.dirty_groups:
                 if index < len(self.group_states):
                     self._draw_group(index, self.group_states[index])
-            
             self.dirty_groups.clear()
-            self.dirty_status = False
-            self.dirty_progress = False
-            self.dirty_log = False
+            
+            if self.dirty_progress:
+                self._render_progress()
+                self.dirty_progress = False
+            
+            if self.dirty_log:
+                self._render_log()
+                self.dirty_log = False
+            
+            self._flush()
             
         except Exception as e:
             logger.error("Erreur render_dirty: {}".format(e), "ui")
+        return True
 
-logger.info("ta_ui.py v2.2.0 chargé (st7789s3 - layout paysage + fonts lisibles)", "ui")
\ No newline at end of file
+logger.info("ta_ui.py v2.10.0 chargé (st7789s3 - layout paysage + fonts lisibles)", "ui")
\ No newline at end of file
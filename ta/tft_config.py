@@ -1,4 +1,4 @@
-""" LilyGo T-DISPLAY-S3 170x320 ST7789 display """
+""" LilyGO T-DISPLAY-S3 170x320 ST7789 display """
 
 from machine import Pin
 import st7789s3 as st7789
@@ -6,8 +6,18 @@ import st7789s3 as st7789
 TFA = 0
 BFA = 0
 
+# Display bus: "auto" (i80/LCD_CAM if lcd_bus is available, else GPIO),
+# "i80" or "gpio"
+BUS = "auto"
+I80_FREQ = 20000000
+
 def config(rotation=1):
-    return st7789.ST7789(
+    driver = st7789.ST7789
+    options = {}
+    if BUS == "i80" or (BUS == "auto" and st7789.ST7789I80.available()):
+        driver = st7789.ST7789I80
+        options["freq"] = I80_FREQ
+    return driver(
         Pin(48, Pin.OUT),
         Pin(47, Pin.OUT),
         Pin(46, Pin.OUT),
@@ -24,4 +34,5 @@ def config(rotation=1):
         cs=Pin(6, Pin.OUT),
         dc=Pin(7, Pin.OUT),
         backlight=Pin(38, Pin.OUT),
-        rotation=rotation)
\ No newline at end of file
+        rotation=rotation,
+        **options)
\ No newline at end of file